@@ -3,19 +3,42 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from config import get_config
 from flasgger import Swagger
+from app import compression
+from app.cache import cache
+from app.instrumentation import instrumentation
+from app.json_provider import make_json_provider
+from app.pool import instrument_engine_options
+from app.profiling import profiler
+from app.replicas import RoutingSession, replicas
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
-def create_app():
+def create_app(config_object=None):
     app = Flask(__name__)
 
     # Load configuration from config.py based on environment
-    app.config.from_object(get_config())
+    app.config.from_object(config_object or get_config())
+    app.json = make_json_provider(app)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = instrument_engine_options(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
 
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
+    cache.init_app(app)
+    replicas.init_app(app)
+    with app.app_context():
+        engines = list(db.engines.values()) + list(replicas.engines().values())
+    instrumentation.init_app(app, engines)
+    profiler.init_app(app, engines)
+    # Registered after instrumentation so its hook runs first and gets timed
+    compression.init_app(app)
+
+    # Request-scoped batching loaders and Idempotency-Key handling (import the models)
+    from app.idempotency import idempotency
+    from app.loaders import reset_loaders
+    app.teardown_request(reset_loaders)
+    idempotency.init_app(app)
 
     #swager UI
     swagger = Swagger(app)
@@ -23,7 +46,17 @@ def create_app():
     # Register Blueprints
     from app.authors import authors_bp
     from app.books import books_bp
+    from app.metrics import metrics_bp
+    from app.search import search_bp
+    from app.stats import stats_bp
     app.register_blueprint(authors_bp, url_prefix='/authors')
     app.register_blueprint(books_bp, url_prefix='/books')
+    app.register_blueprint(metrics_bp, url_prefix='/metrics')
+    app.register_blueprint(search_bp, url_prefix='/search')
+    app.register_blueprint(stats_bp, url_prefix='/stats')
+
+    # CLI commands (flask catalog ...)
+    from app.catalog import catalog_cli
+    app.cli.add_command(catalog_cli)
 
     return app
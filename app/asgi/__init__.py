@@ -0,0 +1,116 @@
+"""
+ASGI serving mode: ``uvicorn asgi:app`` (needs quart, uvicorn, and asyncpg
+or aiosqlite).
+
+The read endpoints of /authors and /books are async Quart views on an
+AsyncSession, so a worker keeps serving other requests while one waits on
+the database. Everything else is handed to the regular Flask app, which
+runs in a thread pool: writes, bulk loads, NDJSON streams, multi-gets,
+search, metrics and the Swagger UI. That way every write path (version
+bumps, cache invalidation) still has exactly one implementation.
+
+The async views compress their responses with the same negotiation as the
+Flask app (app.compression), without the precompressed bodies, which live in
+the Flask app's compression cache.
+"""
+from urllib.parse import parse_qsl
+
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, current_app, request
+from werkzeug.datastructures import Headers, MIMEAccept, MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_accept_header
+
+from app import create_app
+from app.compression import available_encodings, compress, compressible, encode_response, negotiate
+from app.json_provider import make_json_provider
+from app.streaming import wants_stream
+from config import get_config
+
+
+def create_async_app(config_object=None):
+    from app.asgi.authors import authors_bp
+    from app.asgi.books import books_bp
+    from app.asgi.db import init_async_db
+
+    app = Quart(__name__)
+    app.config.from_object(config_object or get_config())
+    app.json = make_json_provider(app)
+    init_async_db(app)
+    if app.config['COMPRESSION_ENABLED']:
+        app.after_request(compress_response)
+    app.register_blueprint(authors_bp, url_prefix='/authors')
+    app.register_blueprint(books_bp, url_prefix='/books')
+    return app
+
+
+async def compress_response(response):
+    config = current_app.config
+    if not compressible(response, config):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings, available_encodings(config))
+    data = await response.get_data()
+    if encoding is None or len(data) < config['COMPRESSION_MIN_SIZE']:
+        return response
+    return encode_response(response, compress(data, encoding, config), encoding, len(data))
+
+
+def nonempty_body(wsgi_app):
+    """
+    hypercorn's WSGI bridge sends the status line along with the first body
+    chunk, so a response without one (204, 304) would never start. Yield an
+    empty chunk for those.
+    """
+    def app(environ, start_response):
+        iterable = wsgi_app(environ, start_response)
+        try:
+            empty = True
+            for chunk in iterable:
+                empty = False
+                yield chunk
+            if empty:
+                yield b''
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+    return app
+
+
+class AsyncDispatcher:
+    """ASGI app sending the requests ``async_app`` can route to it, the rest to ``wsgi_app``."""
+
+    def __init__(self, async_app, wsgi_app, max_body_size):
+        self.async_app = async_app
+        self.flask_app = wsgi_app
+        self.wsgi_app = AsyncioWSGIMiddleware(nonempty_body(wsgi_app), max_body_size=max_body_size)
+        self._urls = async_app.url_map.bind('localhost')
+
+    def handles(self, scope):
+        if scope['method'] not in ('GET', 'HEAD'):
+            return False
+        headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+        args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        if wants_stream(args, parse_accept_header(headers.get('Accept'), MIMEAccept)):
+            return False
+        if 'ids' in args:  # multi-get reads through the response cache of the WSGI app
+            return False
+        try:
+            self._urls.match(scope['path'], method=scope['method'])
+        except HTTPException:  # no async view, wrong method or a slash redirect
+            return False
+        return True
+
+    async def __call__(self, scope, receive, send):
+        # Lifespan events go to Quart, which owns the async engine
+        if scope['type'] != 'http' or self.handles(scope):
+            await self.async_app(scope, receive, send)
+        else:
+            await self.wsgi_app(scope, receive, send)
+
+
+def create_asgi_app(config_object=None):
+    config_object = config_object or get_config()
+    wsgi_app = create_app(config_object)
+    return AsyncDispatcher(create_async_app(config_object), wsgi_app,
+                           wsgi_app.config['ASGI_MAX_BODY_SIZE'])
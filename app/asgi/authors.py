@@ -0,0 +1,75 @@
+from quart import Blueprint, abort, current_app, jsonify, request
+from sqlalchemy import select
+from sqlalchemy.orm import load_only, selectinload
+
+from app.asgi.db import not_modified, paginated_response, session, table_versions
+from app.authors.services import author_serializer
+from app.conditional import is_not_modified, make_etag
+from app.models import Author, Book
+from app.pagination import get_limit, keyset_query, split_page
+from app.serializers import AUTHOR_FIELDS, BOOK_FIELDS, BOOK_SUMMARY_FIELDS, columns, serialize_rows
+from app.utils import parse_fields, parse_include
+
+authors_bp = Blueprint('authors', __name__)
+
+def authors_select(include=(), fields=AUTHOR_FIELDS):
+    # Same shape as authors_query(): column tuples, or ORM rows plus one SELECT ... IN for books
+    if 'books' in include:
+        return select(Author).options(
+            load_only(*columns(Author, fields)),
+            selectinload(Author.books).load_only(*columns(Book, BOOK_SUMMARY_FIELDS)),
+        )
+    return select(*columns(Author, fields))
+
+async def fetch_authors(db_session, stmt, include):
+    result = await db_session.execute(stmt)
+    return result.scalars().all() if 'books' in include else result.all()
+
+# GET /authors - Retrieve a page of authors
+@authors_bp.route('/', methods=['GET'])
+async def get_authors():
+    args = request.args
+    include = parse_include(['books'], args=args)
+    fields = parse_fields(AUTHOR_FIELDS, AUTHOR_FIELDS, args=args)
+    limit = get_limit(args, current_app.config)
+    tables = ['author'] + (['book'] if 'books' in include else [])
+    async with session() as db_session:
+        etag = make_etag(*tables, *await table_versions(db_session, *tables), req=request)
+        if is_not_modified(etag, req=request):
+            return not_modified(etag)
+        stmt = keyset_query(authors_select(include, fields), limit, args.get('after'), Author.id)
+        authors, next_cursor = split_page(await fetch_authors(db_session, stmt, include), limit)
+        serialize = author_serializer(include, fields)
+        items = [serialize(author) for author in authors]
+    response = paginated_response(items, next_cursor)
+    response.set_etag(etag)
+    return response
+
+# GET /authors/{id} - Retrieve a specific author by ID
+@authors_bp.route('/<int:id>', methods=['GET'])
+async def get_author(id):
+    include = parse_include(['books'], args=request.args)
+    fields = parse_fields(AUTHOR_FIELDS, AUTHOR_FIELDS, required=('id', 'updated_at'), args=request.args)
+    async with session() as db_session:
+        authors = await fetch_authors(db_session, authors_select(include, fields).where(Author.id == id), include)
+        if not authors:
+            abort(404)
+        author = author_serializer(include, fields)(authors[0])
+        versions = await table_versions(db_session, 'book') if 'books' in include else []
+    etag = make_etag('author', id, author['updated_at'], *versions, req=request)
+    if is_not_modified(etag, req=request):
+        return not_modified(etag)
+    response = jsonify(author)
+    response.set_etag(etag)
+    return response
+
+# GET /authors/{id}/books - Retrieve all books by a specific author
+@authors_bp.route('/<int:id>/books', methods=['GET'])
+async def get_books_by_author(id):
+    fields = parse_fields(BOOK_FIELDS, BOOK_SUMMARY_FIELDS, args=request.args)
+    async with session() as db_session:
+        if await db_session.get(Author, id) is None:
+            abort(404)
+        stmt = select(*columns(Book, fields)).where(Book.author_id == id).order_by(Book.id)
+        books = (await db_session.execute(stmt)).all()
+    return jsonify(serialize_rows(books, fields))
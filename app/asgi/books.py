@@ -0,0 +1,47 @@
+from quart import Blueprint, abort, current_app, jsonify, request
+from sqlalchemy import select
+
+from app.asgi.db import not_modified, paginated_response, session, table_versions
+from app.books.services import default_sort, filter_books
+from app.conditional import is_not_modified, make_etag
+from app.models import Book
+from app.pagination import get_limit, keyset_query, split_page
+from app.serializers import BOOK_DETAIL_FIELDS, BOOK_FIELDS, columns, serialize_row, serialize_rows
+from app.utils import parse_fields, parse_sort
+
+books_bp = Blueprint('books', __name__)
+
+# GET /books - Retrieve a page of books
+@books_bp.route('/', methods=['GET'])
+async def get_books():
+    args = request.args
+    sort, descending = parse_sort(['id', 'title', 'publish_date'], default_sort(args), args=args)
+    fields = parse_fields(BOOK_FIELDS, BOOK_FIELDS, required=('id', sort), args=args)
+    limit = get_limit(args, current_app.config)
+    sort_column = None if sort == 'id' else getattr(Book, sort)
+    async with session() as db_session:
+        etag = make_etag('book', *await table_versions(db_session, 'book'), req=request)
+        if is_not_modified(etag, req=request):
+            return not_modified(etag)
+        query = filter_books(select(*columns(Book, fields)), args, dialect=db_session.bind.dialect.name)
+        result = await db_session.execute(keyset_query(query, limit, args.get('after'), Book.id, sort_column, descending))
+        books, next_cursor = split_page(result.all(), limit, sort_column)
+    response = paginated_response(serialize_rows(books, fields), next_cursor)
+    response.set_etag(etag)
+    return response
+
+# GET /books/{id} - Retrieve a specific book by ID
+@books_bp.route('/<int:id>', methods=['GET'])
+async def get_book(id):
+    fields = parse_fields(BOOK_FIELDS, BOOK_DETAIL_FIELDS, required=('id', 'updated_at'), args=request.args)
+    async with session() as db_session:
+        row = (await db_session.execute(select(*columns(Book, fields)).where(Book.id == id))).first()
+    if row is None:
+        abort(404)
+    book = serialize_row(row, fields)
+    etag = make_etag('book', id, book['updated_at'], req=request)
+    if is_not_modified(etag, req=request):
+        return not_modified(etag)
+    response = jsonify(book)
+    response.set_etag(etag)
+    return response
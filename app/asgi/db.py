@@ -0,0 +1,73 @@
+import shlex
+
+from quart import current_app, jsonify, request, url_for
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.conditional import matching_etag, ordered_versions, versions_query
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_url(uri):
+    """The async driver URL for a configured database URI (asyncpg / aiosqlite)."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError('No async driver configured for {}'.format(backend))
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def async_engine_options(options):
+    """
+    Translate SQLALCHEMY_ENGINE_OPTIONS for an async engine. libpq's
+    ``-c name=value`` startup options become asyncpg server settings.
+    """
+    options = dict(options)
+    connect_args = dict(options.pop('connect_args', {}))
+    startup = connect_args.pop('options', None)
+    if startup:
+        words = shlex.split(startup)
+        settings = dict(word.split('=', 1) for flag, word in zip(words, words[1:]) if flag == '-c')
+        connect_args['server_settings'] = settings
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+def init_async_db(app):
+    engine = create_async_engine(async_url(app.config['SQLALCHEMY_DATABASE_URI']),
+                                 **async_engine_options(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})))
+    app.extensions['async_db'] = async_sessionmaker(engine, expire_on_commit=False)
+
+    @app.after_serving
+    async def dispose_engine():
+        await engine.dispose()
+
+
+def session():
+    """New AsyncSession; use as ``async with session() as s:``."""
+    return current_app.extensions['async_db']()
+
+
+async def table_versions(db_session, *tables):
+    result = await db_session.execute(versions_query(*tables))
+    return ordered_versions(result.all(), tables)
+
+
+def not_modified(etag):
+    response = current_app.response_class('', status=304)
+    response.set_etag(matching_etag(etag, req=request) or etag)
+    return response
+
+
+def paginated_response(items, next_cursor):
+    """Quart twin of ``app.pagination.paginated_response``."""
+    response = jsonify(items)
+    if next_cursor:
+        args = request.args.to_dict()
+        args['after'] = next_cursor
+        args.update(request.view_args or {})
+        response.headers['Link'] = '<{}>; rel="next"'.format(url_for(request.endpoint, **args))
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -1,16 +1,72 @@
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 from . import authors_bp
-from .services import get_all_authors, create_author, update_author, delete_author, get_authors_byid
+from .services import author_serializer, authors_query, create_author, create_authors_bulk, update_author, delete_author, get_authors_by_ids, get_authors_byid, get_books_by_author_id
+from app.conditional import collection_etag, is_not_modified, make_etag, not_modified, table_versions
+from app.idempotency import idempotent
 from app.models import Author, db
+from app.pagination import paginate, paginated_response
+from app.serializers import AUTHOR_FIELDS, BOOK_FIELDS, BOOK_SUMMARY_FIELDS, serialize_object
+from app.stats.services import author_stats
+from app.streaming import stream_ndjson, wants_stream
+from app.utils import ordered_results, parse_fields, parse_ids, parse_include, read_bulk_payload
 
 @authors_bp.route('/', methods=['GET'])
 def get_authors():
     """
-    Retrieve a list of all authors
+    Retrieve a list of authors, one page at a time
     ---
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Page size (capped by the server)
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Opaque cursor taken from the previous page
+      - name: stream
+        in: query
+        type: boolean
+        required: false
+        description: Stream the whole collection as NDJSON (same as Accept application/x-ndjson)
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: Comma-separated ids to fetch in one request, returned in this order as GET /authors/{id} records; unknown ids come back as {"id", "found":false} (paging is ignored)
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return, e.g. id,title (id always included)
+      - name: include
+        in: query
+        type: string
+        required: false
+        enum: [books]
+        description: Embed related records (books) loaded in a single extra query
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag from a previous response; answered with 304 if unchanged
+    produces:
+      - application/json
+      - application/x-ndjson
     responses:
       200:
-        description: A list of authors
+        description: A page of authors ordered by id
+        headers:
+          ETag:
+            type: string
+          Link:
+            type: string
+            description: URL of the next page (rel="next"), absent on the last page
+          X-Next-Cursor:
+            type: string
+            description: Cursor for the next page, absent on the last page
         schema:
           type: array
           items:
@@ -25,12 +81,107 @@ def get_authors():
               birth_date:
                 type: string
                 format: date
+              books:
+                type: array
+                description: Only present with include=books
+                items:
+                  type: object
+                  properties:
+                    id:
+                      type: integer
+                    title:
+                      type: string
+              updated_at:
+                type: string
+                format: date-time
+      304:
+        description: Not modified since the ETag sent in If-None-Match
     """
-    authors = Author.query.all()
-    return jsonify([{'id': author.id, 'name': author.name, 'bio': author.bio, 'birth_date': author.birth_date} for author in authors])
+    include = parse_include(['books'])
+    fields = parse_fields(AUTHOR_FIELDS, AUTHOR_FIELDS)
+    etag = collection_etag('author', *(['book'] if 'books' in include else []))
+    if is_not_modified(etag):
+        return not_modified(etag)
+    query = authors_query(include, fields)
+    serialize = author_serializer(include, fields)
+    if 'ids' in request.args:
+        response = mget_response(request.args['ids'])
+    elif wants_stream():
+        response = stream_ndjson(query, Author.id, serialize)
+    else:
+        authors, next_cursor = paginate(query, Author.id)
+        response = paginated_response([serialize(author) for author in authors], next_cursor)
+    response.set_etag(etag)
+    return response
+
+def mget_response(raw_ids):
+    ids = parse_ids(raw_ids, current_app.config['MGET_MAX_IDS'])
+    include = parse_include(['books'])
+    fields = parse_fields(AUTHOR_FIELDS, AUTHOR_FIELDS, required=('id', 'updated_at'))
+    return jsonify(ordered_results(ids, get_authors_by_ids(ids, include, fields)))
+
+# POST /authors/_mget - Retrieve many authors by id in one request
+@authors_bp.route('/_mget', methods=['POST'])
+def mget_authors():
+    """
+    Retrieve many authors by id, in request order
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - ids
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+      - name: include
+        in: query
+        type: string
+        required: false
+        enum: [books]
+        description: Embed related records (books) loaded in a single extra query per chunk
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return, e.g. id,name (id and updated_at always included)
+    responses:
+      200:
+        description: One entry per requested id, in order; unknown ids are {"id", "found":false}
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: integer
+              name:
+                type: string
+              bio:
+                type: string
+              birth_date:
+                type: string
+                format: date
+              updated_at:
+                type: string
+                format: date-time
+              found:
+                type: boolean
+                description: Only present (false) for ids without an author
+      400:
+        description: Invalid or too many ids
+    """
+    data = request.get_json(silent=True)
+    return mget_response(data.get('ids') if isinstance(data, dict) else None)
 
 # POST /authors - Create a new author
 @authors_bp.route('/', methods=['POST'])
+@idempotent
 def add_author():
     """
     Create a new author
@@ -52,6 +203,11 @@ def add_author():
               type: string
               format: date
               example: 1965-07-31
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key per logical request; a retry with the same key returns the first response
     responses:
       201:
         description: The created author
@@ -67,10 +223,72 @@ def add_author():
             birth_date:
               type: string
               format: date
+      409:
+        description: A request with the same Idempotency-Key is still in progress
+      422:
+        description: The Idempotency-Key was already used with a different body
     """
     data = request.json
-    new_author = create_author(data)
-    return jsonify({'id': new_author.id, 'name': new_author.name}), 201
+    return jsonify(create_author(data)), 201
+
+# POST /authors/bulk - Create many authors in one transaction
+@authors_bp.route('/bulk', methods=['POST'])
+def add_authors_bulk():
+    """
+    Create many authors in a single transaction
+    ---
+    consumes:
+      - application/json
+      - application/x-ndjson
+    parameters:
+      - name: body
+        in: body
+        required: true
+        description: A JSON array of authors, or one author per line as application/x-ndjson
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              name:
+                type: string
+              bio:
+                type: string
+              birth_date:
+                type: string
+                format: date
+    responses:
+      201:
+        description: All authors were created
+        schema:
+          type: object
+          properties:
+            count:
+              type: integer
+            ids:
+              type: array
+              items:
+                type: integer
+      400:
+        description: Nothing was created; errors are reported per item
+        schema:
+          type: object
+          properties:
+            errors:
+              type: array
+              items:
+                type: object
+                properties:
+                  index:
+                    type: integer
+                  errors:
+                    type: object
+    """
+    items, errors = read_bulk_payload()
+    ids, errors = create_authors_bulk(items, errors)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    return jsonify({'count': len(ids), 'ids': ids}), 201
 
 # GET /authors/{id} - Retrieve details of a specific author
 @authors_bp.route('/<int:id>', methods=['GET'])
@@ -84,6 +302,22 @@ def get_author(id):
         type: integer
         required: true
         description: The ID of the author
+      - name: include
+        in: query
+        type: string
+        required: false
+        enum: [books]
+        description: Embed related records (books) loaded in a single extra query
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return, e.g. id,title (id and updated_at always included)
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag from a previous response; answered with 304 if unchanged
     responses:
       200:
         description: Author found
@@ -99,14 +333,35 @@ def get_author(id):
             birth_date:
               type: string
               format: date
+            books:
+              type: array
+              description: Only present with include=books
+              items:
+                type: object
+                properties:
+                  id:
+                    type: integer
+                  title:
+                    type: string
+            updated_at:
+              type: string
+              format: date-time
+      304:
+        description: Not modified since the ETag sent in If-None-Match
       404:
         description: Author not found
     """
-    author = get_authors_byid(id)
-    return jsonify(author)
+    include = parse_include(['books'])
+    author = get_authors_byid(id, include, parse_fields(AUTHOR_FIELDS, AUTHOR_FIELDS, required=('id', 'updated_at')))
+    etag = make_etag('author', id, author['updated_at'], *(table_versions('book') if 'books' in include else []))
+    if is_not_modified(etag):
+        return not_modified(etag)
+    response = jsonify(author)
+    response.set_etag(etag)
+    return response
 
 # PUT /authors/{id} - Update an existing author
-@authors_bp.route('/authors/<int:id>', methods=['PUT'])
+@authors_bp.route('/<int:id>', methods=['PUT'])
 def edit_author(id):
     """
     Update an existing author
@@ -143,13 +398,21 @@ def edit_author(id):
               type: integer
             name:
               type: string
+            bio:
+              type: string
+            birth_date:
+              type: string
+              format: date
+            updated_at:
+              type: string
+              format: date-time
     """
     data = request.json
     author = update_author(id, data)
-    return jsonify({'id': author.id, 'name': author.name})
+    return jsonify(serialize_object(author, AUTHOR_FIELDS))
 
 # DELETE /authors/{id} - Delete an author
-@authors_bp.route('/authors/<int:id>', methods=['DELETE'])
+@authors_bp.route('/<int:id>', methods=['DELETE'])
 def remove_author(id):
     """
     Delete a specific author
@@ -170,7 +433,7 @@ def remove_author(id):
     return jsonify({'message': 'Author deleted successfully'}), 204
 
 # GET /authors/{id}/books - Retrieve all books by a specific author
-@authors_bp.route('/authors/<int:id>/books', methods=['GET'])
+@authors_bp.route('/<int:id>/books', methods=['GET'])
 def get_books_by_author(id):
     """
     Retrieve all books by a specific author
@@ -181,6 +444,11 @@ def get_books_by_author(id):
         type: integer
         required: true
         description: The ID of the author
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return, e.g. id,title (id always included)
     responses:
       200:
         description: List of books by the author
@@ -196,6 +464,57 @@ def get_books_by_author(id):
       404:
         description: Author not found
     """
-    author = Author.query.get_or_404(id)
-    books = [{'id': book.id, 'title': book.title} for book in author.books]
-    return jsonify(books)
\ No newline at end of file
+    return jsonify(get_books_by_author_id(id, parse_fields(BOOK_FIELDS, BOOK_SUMMARY_FIELDS)))
+
+# GET /authors/{id}/stats - Book count and books per year for one author
+@authors_bp.route('/<int:id>/stats', methods=['GET'])
+def get_author_stats(id):
+    """
+    Book count and books per publication year for a specific author
+    ---
+    parameters:
+      - name: id
+        in: path
+        type: integer
+        required: true
+        description: The ID of the author
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag from a previous response; answered with 304 if unchanged
+    responses:
+      200:
+        description: Author statistics
+        schema:
+          type: object
+          properties:
+            id:
+              type: integer
+            name:
+              type: string
+            book_count:
+              type: integer
+            books_per_year:
+              type: array
+              items:
+                type: object
+                properties:
+                  year:
+                    type: integer
+                  count:
+                    type: integer
+            undated:
+              type: integer
+              description: Books without a publish_date
+      304:
+        description: Not modified since the ETag sent in If-None-Match
+      404:
+        description: Author not found
+    """
+    etag = make_etag('author-stats', id, *table_versions('author', 'book'))
+    if is_not_modified(etag):
+        return not_modified(etag)
+    response = jsonify(author_stats(id))
+    response.set_etag(etag)
+    return response
@@ -1,29 +1,137 @@
-from app.models import Author, db
+from flask import current_app
+from sqlalchemy.orm import load_only, selectinload
+from app.cache import cache, primary_loader
+from app.conditional import bump_versions
+from app.loaders import author_loader
+from app.models import Author, Book, db
+from app.serializers import AUTHOR_FIELDS, BOOK_SUMMARY_FIELDS, columns, row_serializer, serialize_object, serialize_rows
+from app.utils import chunked, insert_returning_ids, parse_date
 
-def get_all_authors():
-    authors = Author.query.all()
-    return [{'id': author.id, 'name': author.name} for author in authors]
+def author_to_dict(author, include=(), fields=AUTHOR_FIELDS):
+    data = serialize_object(author, fields)
+    if 'books' in include:
+        data['books'] = [serialize_object(book, BOOK_SUMMARY_FIELDS) for book in author.books]
+    return data
+
+def authors_query(include=(), fields=AUTHOR_FIELDS):
+    # Expansions are loaded with one extra SELECT ... IN per relation, so a
+    # page of authors with their books costs two queries however long it is.
+    if 'books' in include:
+        return Author.query.options(
+            load_only(*columns(Author, fields)),
+            selectinload(Author.books).load_only(*columns(Book, BOOK_SUMMARY_FIELDS)),
+        )
+    return Author.query.with_entities(*columns(Author, fields))
+
+def author_serializer(include=(), fields=AUTHOR_FIELDS):
+    """Serializer matching the rows produced by ``authors_query(include, fields)``."""
+    if 'books' in include:
+        return lambda author: author_to_dict(author, include, fields)
+    return row_serializer(fields)
 
 def create_author(data):
     author = Author(name=data['name'], bio=data.get('bio'), birth_date=data.get('birth_date'))
     db.session.add(author)
+    bump_versions('author')
     db.session.commit()
     return {'id': author.id, 'name': author.name}
 
-def get_authors_byid(id):
-    author =  Author.query.get_or_404(id)
-    return {'id': author.id, 'name': author.name, 'bio': author.bio, 'birth_date': author.birth_date}
+def author_cache_key(id):
+    return 'author:{}'.format(id)
+
+def get_authors_byid(id, include=(), fields=AUTHOR_FIELDS):
+    def load():
+        author = authors_query(include, fields).filter(Author.id == id).first_or_404()
+        return author_serializer(include, fields)(author)
+    if include or fields != AUTHOR_FIELDS:
+        # Expanded records depend on the book table too and sparse fieldsets
+        # are projected in SQL; only the plain full record is cached.
+        return load()
+    return cache.get_or_set(author_cache_key(id), primary_loader(load))
+
+def get_authors_by_ids(ids, include=(), fields=AUTHOR_FIELDS):
+    """
+    Authors for ``ids`` as {id: record}: one IN query per MGET_CHUNK_SIZE ids
+    (plus one per expansion). Plain full records share the GET /authors/<id> cache.
+    """
+    def load(missing):
+        serialize = author_serializer(include, fields)
+        found = {}
+        for chunk in chunked(missing, current_app.config['MGET_CHUNK_SIZE']):
+            for author in authors_query(include, fields).filter(Author.id.in_(chunk)):
+                found[author.id] = serialize(author)
+        return found
+    if include or fields != AUTHOR_FIELDS:
+        return load(list(dict.fromkeys(ids)))
+    return cache.get_or_set_many(ids, author_cache_key, primary_loader(load))
+
+def get_books_by_author_id(id, fields=BOOK_SUMMARY_FIELDS):
+    author_loader.get_or_404(id)
+    books = Book.query.with_entities(*columns(Book, fields)).filter(Book.author_id == id).order_by(Book.id)
+    return serialize_rows(books, fields)
 
 def update_author(id, data):
-    author = Author.query.get_or_404(id)
+    author = author_loader.get_or_404(id)
     author.name = data['name']
     author.bio = data.get('bio')
     author.birth_date = data.get('birth_date')
+    bump_versions('author')
     db.session.commit()
+    cache.invalidate(author_cache_key(id))
     return author
 
 def delete_author(id):
-    author = Author.query.get_or_404(id)
+    author = author_loader.get_or_404(id)
     db.session.delete(author)
+    bump_versions('author')
     db.session.commit()
+    author_loader.clear(id)
+    cache.invalidate(author_cache_key(id))
+
+def validate_author(data):
+    """Return (row, errors) for one author payload; errors maps field -> message."""
+    if not isinstance(data, dict):
+        return None, {'_item': 'must be an object'}
+    errors = {}
+    name = data.get('name')
+    if not isinstance(name, str) or not name.strip():
+        errors['name'] = 'required'
+    elif len(name) > 100:
+        errors['name'] = 'must be at most 100 characters'
+    bio = data.get('bio')
+    if bio is not None and not isinstance(bio, str):
+        errors['bio'] = 'must be a string'
+    try:
+        birth_date = parse_date(data.get('birth_date'))
+    except ValueError as exc:
+        errors['birth_date'] = str(exc)
+        birth_date = None
+    return {'name': name, 'bio': bio, 'birth_date': birth_date}, errors
 
+def create_authors_bulk(items, errors=()):
+    """
+    Validate a whole batch and insert it in a single transaction with a
+    multi-row INSERT ... RETURNING id. Nothing is written unless every item
+    is valid. Returns (ids, errors).
+    """
+    if len(items) > current_app.config['BULK_MAX_ITEMS']:
+        return None, [{'index': None, 'errors': {'_batch': 'at most {} items per request'.format(current_app.config['BULK_MAX_ITEMS'])}}]
+    errors = list(errors)
+    failed = {error['index'] for error in errors}
+    rows = []
+    for index, data in enumerate(items):
+        if index in failed:
+            continue
+        row, item_errors = validate_author(data)
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+        else:
+            rows.append(row)
+    if errors:
+        return None, sorted(errors, key=lambda error: error['index'])
+    if not rows:
+        return [], []
+    ids = insert_returning_ids(db.session, Author, rows)
+    bump_versions('author')
+    db.session.commit()
+    return ids, []
\ No newline at end of file
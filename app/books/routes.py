@@ -1,17 +1,94 @@
-from flask import Blueprint, jsonify, request, abort
+from flask import Blueprint, current_app, jsonify, request, abort
 from . import books_bp
-from app.books.services import create_book, update_book, delete_book
+from app.books.services import books_query, create_book, default_sort, filter_books, create_books_bulk, get_book_by_id, get_books_by_ids, update_book, delete_book
+from app.conditional import collection_etag, is_not_modified, make_etag, not_modified
+from app.idempotency import idempotent
 from app.models import Book, db
+from app.pagination import paginate, paginated_response
+from app.serializers import BOOK_DETAIL_FIELDS, BOOK_FIELDS, row_serializer, serialize_object, serialize_rows
+from app.streaming import stream_ndjson, wants_stream
+from app.utils import ordered_results, parse_fields, parse_ids, parse_sort, read_bulk_payload
 
 # GET /books - Retrieve a list of all books
 @books_bp.route('/', methods=['GET'])
 def get_books():
     """
-    Retrieve a list of all books
+    Retrieve a list of books, one page at a time
     ---
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Page size (capped by the server)
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Opaque cursor taken from the previous page
+      - name: stream
+        in: query
+        type: boolean
+        required: false
+        description: Stream the whole collection as NDJSON (same as Accept application/x-ndjson)
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: Comma-separated ids to fetch in one request, returned in this order as GET /books/{id} records; unknown ids come back as {"id", "found":false} (filters, sorting and paging are ignored)
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return, e.g. id,title (id always included)
+      - name: author_id
+        in: query
+        type: integer
+        required: false
+        description: Only books by this author
+      - name: published_after
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Only books published on or after this date
+      - name: published_before
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Only books published on or before this date
+      - name: title_prefix
+        in: query
+        type: string
+        required: false
+        description: Only books whose title starts with this text
+      - name: sort
+        in: query
+        type: string
+        required: false
+        enum: [id, -id, title, -title, publish_date, -publish_date]
+        description: Sort order, prefix with - for descending (default id, or title with title_prefix); streams are always ordered by id
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag from a previous response; answered with 304 if unchanged
+    produces:
+      - application/json
+      - application/x-ndjson
     responses:
       200:
-        description: A list of books
+        description: A page of books in the requested order
+        headers:
+          ETag:
+            type: string
+          Link:
+            type: string
+            description: URL of the next page (rel="next"), absent on the last page
+          X-Next-Cursor:
+            type: string
+            description: Cursor for the next page, absent on the last page
         schema:
           type: array
           items:
@@ -28,12 +105,87 @@ def get_books():
                 format: date
               author_id:
                 type: integer
+              updated_at:
+                type: string
+                format: date-time
+      304:
+        description: Not modified since the ETag sent in If-None-Match
+    """
+    sort, descending = parse_sort(['id', 'title', 'publish_date'], default_sort(request.args))
+    fields = parse_fields(BOOK_FIELDS, BOOK_FIELDS, required=('id', sort))
+    etag = collection_etag('book')
+    if is_not_modified(etag):
+        return not_modified(etag)
+    query = filter_books(books_query(fields), request.args)
+    if 'ids' in request.args:
+        response = mget_response(request.args['ids'])
+    elif wants_stream():
+        response = stream_ndjson(query, Book.id, row_serializer(fields))
+    else:
+        sort_column = None if sort == 'id' else getattr(Book, sort)
+        books, next_cursor = paginate(query, Book.id, sort_column, descending)
+        response = paginated_response(serialize_rows(books, fields), next_cursor)
+    response.set_etag(etag)
+    return response
+
+def mget_response(raw_ids):
+    ids = parse_ids(raw_ids, current_app.config['MGET_MAX_IDS'])
+    fields = parse_fields(BOOK_FIELDS, BOOK_DETAIL_FIELDS, required=('id', 'updated_at'))
+    return jsonify(ordered_results(ids, get_books_by_ids(ids, fields)))
+
+# POST /books/_mget - Retrieve many books by id in one request
+@books_bp.route('/_mget', methods=['POST'])
+def mget_books():
+    """
+    Retrieve many books by id, in request order
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - ids
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return, e.g. id,title (id and updated_at always included)
+    responses:
+      200:
+        description: One entry per requested id, in order; unknown ids are {"id", "found":false}
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: integer
+              title:
+                type: string
+              description:
+                type: string
+              updated_at:
+                type: string
+                format: date-time
+              found:
+                type: boolean
+                description: Only present (false) for ids without a book
+      400:
+        description: Invalid or too many ids
     """
-    books = Book.query.all()
-    return jsonify([{'id': book.id, 'title': book.title, 'description': book.description, 'publish_date': book.publish_date, 'author_id': book.author_id} for book in books])
+    data = request.get_json(silent=True)
+    return mget_response(data.get('ids') if isinstance(data, dict) else None)
 
 # POST /books - Create a new book
 @books_bp.route('/', methods=['POST'])
+@idempotent
 def add_book():
     """
     Create a new book
@@ -58,6 +210,11 @@ def add_book():
             author_id:
               type: integer
               example: 1
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key per logical request; a retry with the same key returns the first response
     responses:
       201:
         description: The created book
@@ -75,10 +232,74 @@ def add_book():
               format: date
             author_id:
               type: integer
+      409:
+        description: A request with the same Idempotency-Key is still in progress
+      422:
+        description: The Idempotency-Key was already used with a different body
     """
     data = request.json
-    new_book = create_book(data)
-    return jsonify({'id': new_book.id, 'title': new_book.title}), 201
+    return jsonify(create_book(data)), 201
+
+# POST /books/bulk - Create many books in one transaction
+@books_bp.route('/bulk', methods=['POST'])
+def add_books_bulk():
+    """
+    Create many books in a single transaction
+    ---
+    consumes:
+      - application/json
+      - application/x-ndjson
+    parameters:
+      - name: body
+        in: body
+        required: true
+        description: A JSON array of books, or one book per line as application/x-ndjson
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              title:
+                type: string
+              description:
+                type: string
+              publish_date:
+                type: string
+                format: date
+              author_id:
+                type: integer
+    responses:
+      201:
+        description: All books were created
+        schema:
+          type: object
+          properties:
+            count:
+              type: integer
+            ids:
+              type: array
+              items:
+                type: integer
+      400:
+        description: Nothing was created; errors are reported per item
+        schema:
+          type: object
+          properties:
+            errors:
+              type: array
+              items:
+                type: object
+                properties:
+                  index:
+                    type: integer
+                  errors:
+                    type: object
+    """
+    items, errors = read_bulk_payload()
+    ids, errors = create_books_bulk(items, errors)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    return jsonify({'count': len(ids), 'ids': ids}), 201
 
 # GET /books/{id} - Retrieve details of a specific book
 @books_bp.route('/<int:id>', methods=['GET'])
@@ -92,6 +313,16 @@ def get_book(id):
         type: integer
         required: true
         description: The ID of the book
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return, e.g. id,title (id and updated_at always included)
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag from a previous response; answered with 304 if unchanged
     responses:
       200:
         description: Book found
@@ -104,11 +335,21 @@ def get_book(id):
               type: string
             description:
               type: string
+            updated_at:
+              type: string
+              format: date-time
+      304:
+        description: Not modified since the ETag sent in If-None-Match
       404:
         description: Book not found
     """
-    book = Book.query.get_or_404(id)
-    return jsonify({'id': book.id, 'title': book.title, 'description': book.description})
+    book = get_book_by_id(id, parse_fields(BOOK_FIELDS, BOOK_DETAIL_FIELDS, required=('id', 'updated_at')))
+    etag = make_etag('book', id, book['updated_at'])
+    if is_not_modified(etag):
+        return not_modified(etag)
+    response = jsonify(book)
+    response.set_etag(etag)
+    return response
 
 # PUT /books/{id} - Update an existing book
 @books_bp.route('/<int:id>', methods=['PUT'])
@@ -153,10 +394,20 @@ def edit_book(id):
                   type: integer
                 title:
                   type: string
+                description:
+                  type: string
+                publish_date:
+                  type: string
+                  format: date
+                author_id:
+                  type: integer
+                updated_at:
+                  type: string
+                  format: date-time
     """
     data = request.json
     book = update_book(id, data)
-    return jsonify({'status': 'success', 'status_code': 200, 'data': {'id': book.id, 'title': book.title}})
+    return jsonify({'status': 'success', 'status_code': 200, 'data': serialize_object(book, BOOK_FIELDS)})
 
 # DELETE /books/{id} - Delete a book
 @books_bp.route('/<int:id>', methods=['DELETE'])
@@ -1,8 +1,73 @@
+from flask import abort, current_app
+from app.cache import cache, primary_loader
+from app.conditional import bump_versions
+from app.loaders import author_loader, book_loader
 from app.models import Book, db
+from app.serializers import BOOK_DETAIL_FIELDS, BOOK_FIELDS, columns, serialize_row
+from app.stats.services import adjust_book_counts
+from app.utils import MAX_ID, chunked, insert_returning_ids, parse_date
 
-def get_all_books():
-    books = Book.query.all()
-    return [{'id': book.id, 'title': book.title} for book in books]
+def books_query(fields=BOOK_FIELDS):
+    # Column tuples only: no ORM instances are built for read-only listings
+    return Book.query.with_entities(*columns(Book, fields))
+
+def filter_books(query, args, dialect=None):
+    """Apply the ?author_id=, ?published_after=, ?published_before= and ?title_prefix= filters."""
+    if 'author_id' in args:
+        author_id = args.get('author_id', type=int)
+        # Out of the Integer column's range the driver raises OverflowError
+        if author_id is None or abs(author_id) > MAX_ID:
+            abort(400, description='author_id must be an integer')
+        query = query.filter(Book.author_id == author_id)
+    for name, compare in (('published_after', Book.publish_date.__ge__), ('published_before', Book.publish_date.__le__)):
+        if name in args:
+            try:
+                query = query.filter(compare(parse_date(args[name])))
+            except ValueError as exc:
+                abort(400, description='{} {}'.format(name, exc))
+    if args.get('title_prefix'):
+        query = query.filter(title_prefix_filter(args['title_prefix'], dialect))
+    return query
+
+def default_sort(args):
+    # A prefix match is a range of ix_book_title; ordering it by id would sort every match per page
+    return 'title' if args.get('title_prefix') else 'id'
+
+def title_prefix_filter(prefix, dialect=None):
+    # Case-sensitive prefix match on both backends. SQLite's LIKE ignores case
+    # and so cannot use ix_book_title; GLOB with the meta characters bracketed
+    # is case-sensitive and gets the same index range scan LIKE gets on PostgreSQL.
+    if (dialect or db.session.get_bind().dialect.name) == 'sqlite':
+        escaped = ''.join('[{}]'.format(char) if char in '*?[' else char for char in prefix)
+        return Book.title.op('GLOB')(escaped + '*')
+    return Book.title.startswith(prefix, autoescape=True)
+
+def book_cache_key(id):
+    return 'book:{}'.format(id)
+
+def get_book_by_id(id, fields=BOOK_DETAIL_FIELDS):
+    def load():
+        book = books_query(fields).filter(Book.id == id).first_or_404()
+        return serialize_row(book, fields)
+    if fields != BOOK_DETAIL_FIELDS:
+        # Sparse fieldsets are projected in SQL and bypass the cache
+        return load()
+    return cache.get_or_set(book_cache_key(id), primary_loader(load))
+
+def get_books_by_ids(ids, fields=BOOK_DETAIL_FIELDS):
+    """
+    Books for ``ids`` as {id: record}: one IN query per MGET_CHUNK_SIZE ids.
+    Default-field records go through the same cache entries as GET /books/<id>.
+    """
+    def load(missing):
+        found = {}
+        for chunk in chunked(missing, current_app.config['MGET_CHUNK_SIZE']):
+            for row in books_query(fields).filter(Book.id.in_(chunk)):
+                found[row.id] = serialize_row(row, fields)
+        return found
+    if fields != BOOK_DETAIL_FIELDS:
+        return load(list(dict.fromkeys(ids)))
+    return cache.get_or_set_many(ids, book_cache_key, primary_loader(load))
 
 def create_book(data):
     book = Book(
@@ -12,18 +77,88 @@ def create_book(data):
         author_id=data['author_id']
     )
     db.session.add(book)
+    adjust_book_counts([book.author_id])
+    bump_versions('book')
     db.session.commit()
     return {'id': book.id, 'title': book.title}
 
 def update_book(id, data):
-    book = Book.query.get_or_404(id)
+    book = book_loader.get_or_404(id)
     book.title = data['title']
     book.description = data.get('description')
     book.publish_date = data.get('publish_date')
+    bump_versions('book')
     db.session.commit()
+    cache.invalidate(book_cache_key(id))
     return book
 
 def delete_book(id):
-    book = Book.query.get_or_404(id)
+    book = book_loader.get_or_404(id)
     db.session.delete(book)
-    db.session.commit()
\ No newline at end of file
+    adjust_book_counts([book.author_id], -1)
+    bump_versions('book')
+    db.session.commit()
+    book_loader.clear(id)
+    cache.invalidate(book_cache_key(id))
+
+def validate_book(data):
+    """Return (row, errors) for one book payload; errors maps field -> message."""
+    if not isinstance(data, dict):
+        return None, {'_item': 'must be an object'}
+    errors = {}
+    title = data.get('title')
+    if not isinstance(title, str) or not title.strip():
+        errors['title'] = 'required'
+    elif len(title) > 200:
+        errors['title'] = 'must be at most 200 characters'
+    description = data.get('description')
+    if description is not None and not isinstance(description, str):
+        errors['description'] = 'must be a string'
+    try:
+        publish_date = parse_date(data.get('publish_date'))
+    except ValueError as exc:
+        errors['publish_date'] = str(exc)
+        publish_date = None
+    author_id = data.get('author_id')
+    if not isinstance(author_id, int) or isinstance(author_id, bool):
+        errors['author_id'] = 'required integer'
+    row = {'title': title, 'description': description, 'publish_date': publish_date, 'author_id': author_id}
+    return row, errors
+
+def create_books_bulk(items, errors=()):
+    """
+    Validate a whole batch and insert it in a single transaction.
+
+    Author ids are checked with one batched author_loader lookup and the rows
+    go out as a multi-row INSERT ... RETURNING id, so the cost is a handful of
+    round-trips and one commit however large the batch. Nothing is written unless every
+    item is valid. Returns (ids, errors).
+    """
+    if len(items) > current_app.config['BULK_MAX_ITEMS']:
+        return None, [{'index': None, 'errors': {'_batch': 'at most {} items per request'.format(current_app.config['BULK_MAX_ITEMS'])}}]
+    errors = list(errors)
+    failed = {error['index'] for error in errors}
+    rows = []
+    for index, data in enumerate(items):
+        if index in failed:
+            continue
+        row, item_errors = validate_book(data)
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+        else:
+            rows.append((index, row))
+    author_ids = {row['author_id'] for _, row in rows}
+    if author_ids:
+        found = author_loader.load_many(author_ids)
+        for index, row in rows:
+            if row['author_id'] not in found:
+                errors.append({'index': index, 'errors': {'author_id': 'author not found'}})
+    if errors:
+        return None, sorted(errors, key=lambda error: error['index'])
+    if not rows:
+        return [], []
+    ids = insert_returning_ids(db.session, Book, [row for _, row in rows])
+    adjust_book_counts(row['author_id'] for _, row in rows)
+    bump_versions('book')
+    db.session.commit()
+    return ids, []
\ No newline at end of file
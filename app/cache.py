@@ -0,0 +1,349 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from app.replicas import replicas
+
+
+class MemoryBackend:
+    """In-process LRU with a per-entry TTL. Each worker process has its own."""
+
+    def __init__(self, maxsize=10000, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def _store(self, key, value, ttl):
+        # Caller holds self._lock
+        self._data[key] = (value, self._clock() + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def set_many(self, mapping, ttl=None):
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        """Store ``value`` only if ``key`` holds no live entry; True when stored."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > self._clock()):
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def add_many(self, mapping, ttl=None):
+        for key, value in mapping.items():
+            self.add(key, value, ttl)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedBackend:
+    """
+    Cache shared between workers, backed by any client speaking the Redis
+    get/set(ex=)/delete subset. Values are pickled so dates survive the trip.
+    """
+
+    def __init__(self, client, prefix='library:'):
+        self.client = client
+        self.prefix = prefix
+        self.evictions = 0  # evictions happen inside the store and are not visible here
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_TYPE=redis requires the redis package')
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else pickle.loads(raw)
+
+    def get_many(self, keys):
+        # One MGET round-trip for the whole batch
+        raws = self.client.mget([self.prefix + key for key in keys]) if keys else []
+        return {key: pickle.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def set_many(self, mapping, ttl=None):
+        pipeline = self.client.pipeline(transaction=False) if hasattr(self.client, 'pipeline') else self.client
+        for key, value in mapping.items():
+            pipeline.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+        if pipeline is not self.client:
+            pipeline.execute()
+
+    def add(self, key, value, ttl=None):
+        # SET NX: one atomic round-trip, so a concurrent invalidation always wins
+        return bool(self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None, nx=True))
+
+    def add_many(self, mapping, ttl=None):
+        pipeline = self.client.pipeline(transaction=False) if hasattr(self.client, 'pipeline') else self.client
+        for key, value in mapping.items():
+            pipeline.set(self.prefix + key, pickle.dumps(value), ex=ttl or None, nx=True)
+        if pipeline is not self.client:
+            pipeline.execute()
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        self.client.flushdb()
+
+
+class LocalStore:
+    """Fake shared-store client for tests: bytes in, bytes out, honours ``ex``."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._data = {}
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            return None
+        return value
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and self.get(key) is not None:
+            return None
+        self._data[key] = (bytes(value), self._clock() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self._data.pop(key, None)
+
+    def flushdb(self):
+        self._data.clear()
+
+
+class NullBackend:
+    """Caching switched off: every lookup misses."""
+
+    evictions = 0
+
+    def get(self, key):
+        return None
+
+    def get_many(self, keys):
+        return {}
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def set_many(self, mapping, ttl=None):
+        pass
+
+    def add(self, key, value, ttl=None):
+        return False
+
+    def add_many(self, mapping, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+def make_backend(config):
+    cache_type = config['CACHE_TYPE']
+    if cache_type == 'memory':
+        return MemoryBackend(maxsize=config['CACHE_MAX_ENTRIES'])
+    if cache_type == 'redis':
+        return SharedBackend.from_url(config['CACHE_REDIS_URL'])
+    if cache_type == 'local':
+        return SharedBackend(LocalStore())
+    if cache_type == 'null':
+        return NullBackend()
+    raise ValueError('Unknown CACHE_TYPE: {}'.format(cache_type))
+
+
+# Stored by Cache.invalidate(); reads treat it as a miss, fills cannot overwrite it
+INVALIDATED = '<invalidated>'
+
+
+class _CacheState:
+    def __init__(self, backend, ttl, invalidation_ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.invalidation_ttl = invalidation_ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+
+class Cache:
+    """
+    Read-through cache for single-resource lookups, keyed per resource.
+
+    A reader that misses may load a row just before a writer commits and
+    store it just after the writer's invalidation. So fills only ever add
+    (``get_or_set``: set if absent, SET NX on a shared store), and
+    ``invalidate`` replaces the entry with a tombstone for
+    CACHE_INVALIDATION_TTL seconds instead of deleting it: a fill racing the
+    write finds the tombstone and is dropped rather than caching the old row
+    for the full TTL. Reads in that window go to the database.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['cache'] = _CacheState(make_backend(app.config), app.config['CACHE_DEFAULT_TTL'],
+                                              app.config['CACHE_INVALIDATION_TTL'])
+
+    def _state(self):
+        return current_app.extensions['cache']
+
+    @property
+    def backend(self):
+        return self._state().backend
+
+    def get(self, key):
+        state = self._state()
+        value = state.backend.get(key)
+        if value == INVALIDATED:
+            value = None
+        with state.lock:
+            if value is None:
+                state.misses += 1
+            else:
+                state.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        state = self._state()
+        state.backend.set(key, value, ttl or state.ttl)
+
+    def get_or_set(self, key, loader, ttl=None):
+        """Return the cached value for ``key`` or store and return ``loader()`` (unless invalidated meanwhile)."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            state = self._state()
+            state.backend.add(key, value, ttl or state.ttl)
+        return value
+
+    def get_many(self, keys):
+        """Cached values for ``keys`` as a dict; missing keys are left out."""
+        state = self._state()
+        found = {key: value for key, value in state.backend.get_many(list(keys)).items() if value != INVALIDATED}
+        with state.lock:
+            state.hits += len(found)
+            state.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, mapping, ttl=None):
+        state = self._state()
+        if mapping:
+            state.backend.set_many(mapping, ttl or state.ttl)
+
+    def get_or_set_many(self, ids, key, loader, ttl=None):
+        """
+        Values for ``ids`` (keyed ``key(id)``) from the cache; the misses come
+        from one ``loader(missing_ids)`` call returning {id: value}, and are
+        stored. Ids the loader does not return are left out.
+        """
+        keys = {id: key(id) for id in dict.fromkeys(ids)}
+        cached = self.get_many(list(keys.values()))
+        found = {id: cached[k] for id, k in keys.items() if k in cached}
+        missing = [id for id in keys if id not in found]
+        if missing:
+            loaded = loader(missing)
+            state = self._state()
+            if loaded:
+                state.backend.add_many({keys[id]: value for id, value in loaded.items()}, ttl or state.ttl)
+            found.update(loaded)
+        return found
+
+    def delete(self, *keys):
+        self._state().backend.delete(*keys)
+
+    def invalidate(self, *keys):
+        """Drop ``keys`` after a write; see the class docstring."""
+        state = self._state()
+        state.backend.set_many(dict.fromkeys(keys, INVALIDATED), state.invalidation_ttl)
+
+    def clear(self):
+        self._state().backend.clear()
+
+    def stats(self):
+        state = self._state()
+        stats = {'backend': type(state.backend).__name__, 'hits': state.hits,
+                 'misses': state.misses, 'evictions': state.backend.evictions}
+        if isinstance(state.backend, MemoryBackend):
+            stats['size'] = len(state.backend)
+        return stats
+
+
+cache = Cache()
+
+
+def primary_loader(load):
+    """
+    Wrap a cache ``load`` function so misses read from the primary: entries
+    live for CACHE_DEFAULT_TTL, longer than a replica is allowed to lag.
+    """
+    def wrapper(*args):
+        if isinstance(cache.backend, NullBackend):
+            return load(*args)
+        with replicas.primary():
+            return load(*args)
+    return wrapper
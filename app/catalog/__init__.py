@@ -0,0 +1,5 @@
+from flask.cli import AppGroup
+
+catalog_cli = AppGroup('catalog', help='Bulk import and export of the catalogue.')
+
+from . import commands
@@ -0,0 +1,56 @@
+import click
+
+from . import catalog_cli
+from .exporter import WRITERS, export_books
+from .importer import ImportAborted, Importer
+
+
+# flask catalog import - Load authors and books from CSV / NDJSON files
+@catalog_cli.command('import')
+@click.option('--authors', 'authors_path', metavar='FILE', help='Authors file (.csv, .ndjson, .jsonl, optionally .gz; - for stdin)')
+@click.option('--books', 'books_path', metavar='FILE', help='Books file; authors referenced by author (name) or author_id')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Override the format taken from the file extension')
+@click.option('--batch-size', default=10000, show_default=True, help='Rows per COPY / INSERT and per commit')
+@click.option('--max-errors', default=100, show_default=True, help='Stop after this many rejected rows')
+def import_catalog(authors_path, books_path, fmt, batch_size, max_errors):
+    """
+    Stream authors and/or books into the database.
+
+    Authors are imported first so books can reference them by name. Rows are
+    committed batch by batch; rejected rows are reported and skipped.
+    """
+    if not authors_path and not books_path:
+        raise click.UsageError('Pass --authors and/or --books')
+    importer = Importer(batch_size=batch_size, max_errors=max_errors, echo=lambda line: click.echo(line, err=True))
+    totals = []
+    try:
+        if authors_path:
+            totals.append(('authors', importer.import_authors(authors_path, fmt)))
+        if books_path:
+            totals.append(('books', importer.import_books(books_path, fmt)))
+    except (ImportAborted, ValueError, OSError) as exc:
+        raise click.ClickException(str(exc))
+    click.echo('Imported {}; {} rows rejected'.format(
+        ', '.join('{} {}'.format(count, label) for label, count in totals), importer.errors))
+
+
+# flask catalog export - Stream books with their author to CSV / NDJSON / Parquet
+@catalog_cli.command('export')
+@click.option('--format', 'fmt', type=click.Choice(sorted(WRITERS)), default='csv', show_default=True)
+@click.option('--output', '-o', default='-', show_default=True, help='Output file (.gz compresses CSV/NDJSON); - for stdout')
+@click.option('--batch-size', default=10000, show_default=True, help='Rows fetched and written per batch')
+@click.option('--since-id', type=int, help='Only books with a higher id')
+@click.option('--updated-since', type=click.DateTime(), help='Only books or authors updated after this UTC timestamp')
+def export_catalog(fmt, output, batch_size, since_id, updated_since):
+    """
+    Stream books joined with their author, in id order, through a server-side cursor.
+
+    The summary on stderr gives the last id and latest updated_at, to pass
+    as --since-id / --updated-since on the next incremental export.
+    """
+    try:
+        count, last_id, latest = export_books(output, fmt, batch_size, since_id, updated_since)
+    except (RuntimeError, ValueError, OSError) as exc:
+        raise click.ClickException(str(exc))
+    click.echo('Exported {} books; last id {}, latest updated_at {}'.format(
+        count, last_id if last_id is not None else '-', latest.isoformat() if latest else '-'), err=True)
@@ -0,0 +1,254 @@
+"""
+Streaming import of authors and books from CSV or NDJSON files.
+
+Files are read one record at a time and written in batches, one commit per
+batch, so memory is bounded by the batch size plus the author index
+whatever the file size. PostgreSQL batches go through ``COPY ... FROM STDIN``;
+other backends use a chunked ``executemany`` INSERT.
+
+Books reference their author by ``author`` (name) or ``author_id``. Names
+are resolved through an in-memory name -> id map of the existing and the
+imported authors (the lowest id wins for duplicate names). When the authors
+file has an ``id`` column, a book's ``author_id`` is first translated from
+those source ids to the newly assigned ones, so an export re-imports as is.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from sqlalchemy import insert, select, text
+
+from app.authors.services import validate_author
+from app.books.services import validate_book
+from app.conditional import bump_versions
+from app.models import Author, Book, db, utcnow
+from app.stats.services import adjust_book_counts
+from app.utils import insert_returning_ids
+
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+AUTHOR_COLUMNS = ('name', 'bio', 'birth_date')
+BOOK_COLUMNS = ('title', 'description', 'publish_date', 'author_id')
+
+
+class ImportAborted(Exception):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    root, extension = os.path.splitext(path[:-3] if path.endswith('.gz') else path)
+    if extension.lower() not in FORMATS:
+        raise ValueError('Cannot tell the format of {}; pass --format'.format(path))
+    return FORMATS[extension.lower()]
+
+
+def open_text(path):
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_records(handle, fmt):
+    """Yield (line number, record dict or None) one at a time; None marks an unparseable line."""
+    if fmt == 'csv':
+        reader = csv.DictReader(handle)
+        for record in reader:
+            # Empty CSV cells are NULLs, not empty strings
+            yield reader.line_num, {key: value if value != '' else None for key, value in record.items()}
+        return
+    for number, line in enumerate(handle, 1):
+        if line.strip():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield number, record if isinstance(record, dict) else None
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class AuthorIndex:
+    """Author name -> id and source id -> id maps used to resolve book foreign keys."""
+
+    def __init__(self):
+        self.by_name = {}
+        self.ids = set()
+        self.by_source_id = {}
+
+    def load(self, session, batch_size=10000):
+        stmt = select(Author.id, Author.name).order_by(Author.id).execution_options(yield_per=batch_size)
+        for id, name in session.execute(stmt):
+            self.add(id, name)
+        return self
+
+    def add(self, id, name, source_id=None):
+        self.by_name.setdefault(name, id)
+        self.ids.add(id)
+        if source_id is not None:
+            self.by_source_id[source_id] = id
+
+    def resolve(self, record):
+        name = record.get('author')
+        if name is not None and record.get('author_id') is None:
+            return self.by_name.get(name)
+        author_id = parse_id(record.get('author_id'))
+        if author_id is None:
+            return None
+        author_id = self.by_source_id.get(author_id, author_id)
+        return author_id if author_id in self.ids else None
+
+
+def parse_id(value):
+    """A non-negative integer id from an int or a string of ASCII digits, else None."""
+    if isinstance(value, str):
+        value = value.strip()
+        # isdigit() alone also accepts characters such as '²' that int() rejects
+        return int(value) if value.isascii() and value.isdigit() else None
+    if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+        return value
+    return None
+
+
+def copy_rows(session, table, columns, rows):
+    """COPY ``rows`` (tuples in ``columns`` order) into ``table`` on the session's PostgreSQL connection."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(table, ', '.join(columns))
+    cursor = session.connection().connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def reserve_ids(session, table, count):
+    """Draw ``count`` ids from the table's sequence, so COPY can write them explicitly."""
+    return session.scalars(text("SELECT nextval(pg_get_serial_sequence('{}', 'id')) "
+                                "FROM generate_series(1, :count)".format(table)), {'count': count}).all()
+
+
+def write_authors(session, rows, use_copy):
+    if not use_copy:
+        return insert_returning_ids(session, Author, rows)
+    ids = reserve_ids(session, 'author', len(rows))
+    now = utcnow()
+    copy_rows(session, 'author', ('id',) + AUTHOR_COLUMNS + ('updated_at',),
+              ((id,) + tuple(row[column] for column in AUTHOR_COLUMNS) + (now,) for id, row in zip(ids, rows)))
+    return ids
+
+
+def write_books(session, rows, use_copy):
+    if not use_copy:
+        session.execute(insert(Book), rows)
+    else:
+        now = utcnow()
+        copy_rows(session, 'book', BOOK_COLUMNS + ('updated_at',),
+                  (tuple(row[column] for column in BOOK_COLUMNS) + (now,) for row in rows))
+    adjust_book_counts(row['author_id'] for row in rows)
+
+
+class Importer:
+    """
+    Import files into the current app's database; ``echo`` receives progress
+    lines and per-row errors. Aborts (after committing the batches written so
+    far) once more than ``max_errors`` rows were rejected.
+    """
+
+    def __init__(self, batch_size=10000, max_errors=100, echo=print, session=None):
+        self.session = session or db.session
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.echo = echo
+        self.use_copy = self.session.get_bind().dialect.name == 'postgresql'
+        self.errors = 0
+        self.index = None
+
+    def _reject(self, label, number, errors):
+        self.errors += 1
+        self.echo('{} line {}: {}'.format(label, number, json.dumps(errors, sort_keys=True)))
+        if self.errors > self.max_errors:
+            raise ImportAborted('More than {} invalid rows; stopping'.format(self.max_errors))
+
+    def _author_index(self):
+        if self.index is None:
+            self.index = AuthorIndex().load(self.session, self.batch_size)
+        return self.index
+
+    def _run(self, label, path, fmt, prepare, write):
+        started = time.perf_counter()
+        imported = 0
+        with open_text(path) as handle:
+            for batch in batched(read_records(handle, detect_format(path, fmt)), self.batch_size):
+                rows = []
+                for number, record in batch:
+                    row, errors = prepare(record)
+                    if errors:
+                        self._reject(label, number, errors)
+                    else:
+                        rows.append((record, row))
+                if rows:
+                    write(rows)
+                    bump_versions(label)
+                    self.session.commit()
+                    imported += len(rows)
+                elapsed = time.perf_counter() - started
+                self.echo('{}: {} rows in {:.1f}s ({:.0f} rows/s)'.format(label, imported, elapsed,
+                                                                        imported / elapsed if elapsed else 0))
+        return imported
+
+    def import_authors(self, path, fmt=None):
+        index = self._author_index()
+
+        def prepare(record):
+            if record is None:
+                return None, {'_line': 'invalid record'}
+            row, errors = validate_author(record)
+            source_id = record.get('id')
+            if source_id is not None and parse_id(source_id) is None:
+                errors['id'] = 'must be a non-negative integer'
+            return row, errors
+
+        def write(rows):
+            ids = write_authors(self.session, [row for _, row in rows], self.use_copy)
+            for id, (record, row) in zip(ids, rows):
+                source_id = record.get('id')
+                index.add(id, row['name'], parse_id(source_id))
+
+        return self._run('author', path, fmt, prepare, write)
+
+    def import_books(self, path, fmt=None):
+        index = self._author_index()
+
+        def prepare(record):
+            if record is None:
+                return None, {'_line': 'invalid record'}
+            author_id = index.resolve(record)
+            row, errors = validate_book(dict(record, author_id=author_id))
+            if author_id is None:
+                errors['author_id'] = 'author not found'
+            return row, errors
+
+        def write(rows):
+            write_books(self.session, [row for _, row in rows], self.use_copy)
+
+        return self._run('book', path, fmt, prepare, write)
@@ -0,0 +1,150 @@
+"""
+Response compression negotiated from ``Accept-Encoding``.
+
+JSON and other text responses of at least COMPRESSION_MIN_SIZE bytes are sent
+with brotli (``br``, when the brotli package is installed) or gzip, whichever
+the client gives the higher q-value; ties go to COMPRESSION_ENCODINGS order.
+Streamed responses (NDJSON exports) are passed through untouched.
+
+A GET response with a strong ETag has one body per ETag (data versions,
+path, query string and media type all go into it), so its compressed bytes
+are kept under ETag and encoding: a hot list page is compressed once per data
+version rather than on every hit. They live in a per-process LRU of their own
+(COMPRESSION_CACHE_ENTRIES), apart from the record cache, so large list
+bodies neither evict cached records nor show up in its hit/miss counters.
+
+A strong ETag names one exact byte sequence, so a compressed response carries
+the ETag with the encoding appended (``"<etag>-gzip"``); If-None-Match
+accepts either form. ``Vary: Accept-Encoding`` keeps shared caches from
+mixing the variants.
+
+Compression time shows up as ``compress`` in Server-Timing and, with the
+compressed/original size ratio, in per-endpoint histograms at GET /metrics.
+"""
+import gzip
+import threading
+
+from flask import current_app, request
+
+from app.cache import MemoryBackend
+from app.instrumentation import current_timing, timed
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+def gzip_compress(data, level):
+    # mtime=0: identical input gives identical bytes, so cached and fresh bodies match
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def brotli_compress(data, level):
+    return brotli.compress(data, quality=level)
+
+
+COMPRESSORS = {
+    'br': (brotli_compress, 'COMPRESSION_BROTLI_QUALITY'),
+    'gzip': (gzip_compress, 'COMPRESSION_GZIP_LEVEL'),
+}
+
+
+class _CompressionState:
+    def __init__(self, config):
+        self.bodies = MemoryBackend(maxsize=config['COMPRESSION_CACHE_ENTRIES'])
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        body = self.bodies.get(key)
+        with self.lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return body
+
+
+def cache_stats():
+    """Hit, miss and eviction counters of the compressed-body cache; None when it is off."""
+    state = current_app.extensions.get('compression')
+    if state is None or not current_app.config['COMPRESSION_CACHE']:
+        return None
+    return {'hits': state.hits, 'misses': state.misses, 'evictions': state.bodies.evictions,
+            'size': len(state.bodies)}
+
+
+def available_encodings(config):
+    """COMPRESSION_ENCODINGS in preference order, without brotli when it is not installed."""
+    return tuple(encoding for encoding in config['COMPRESSION_ENCODINGS']
+                 if encoding in COMPRESSORS and (encoding != 'br' or brotli is not None))
+
+
+def negotiate(accept_encodings, encodings):
+    """The accepted encoding with the highest q-value (first listed on ties); None means identity."""
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compressible(response, config):
+    """Successful, not yet encoded, fully buffered and of a COMPRESSION_MIMETYPES type."""
+    return (200 <= response.status_code < 300 and response.status_code != 204
+            and not getattr(response, 'is_streamed', False)
+            and not getattr(response, 'direct_passthrough', False)
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in config['COMPRESSION_MIMETYPES'])
+
+
+def compress(data, encoding, config):
+    compressor, level = COMPRESSORS[encoding]
+    with timed('compress'):
+        return compressor(data, config[level])
+
+
+def encode_response(response, body, encoding, size):
+    """Swap in the compressed ``body`` and record the ratio against the original ``size``."""
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # Matched by app.conditional.matching_etag
+        response.set_etag('{}-{}'.format(etag, encoding))
+    timing = current_timing()
+    if timing is not None:
+        timing.compression_ratio = len(body) / size
+    return response
+
+
+def compress_response(response):
+    """after_request hook of the Flask app."""
+    config = current_app.config
+    if not compressible(response, config):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings, available_encodings(config))
+    data = response.get_data()
+    if encoding is None or len(data) < config['COMPRESSION_MIN_SIZE']:
+        return response
+    etag, weak = response.get_etag()
+    key = None
+    if etag and not weak and request.method in ('GET', 'HEAD') and config['COMPRESSION_CACHE']:
+        key = '{}:{}'.format(encoding, etag)
+    state = current_app.extensions['compression']
+    body = state.get(key) if key else None
+    if body is None:
+        body = compress(data, encoding, config)
+        if key:
+            state.bodies.set(key, body)
+    return encode_response(response, body, encoding, len(data))
+
+
+def init_app(app):
+    if app.config['COMPRESSION_ENABLED']:
+        app.extensions['compression'] = _CompressionState(app.config)
+        app.after_request(compress_response)
@@ -0,0 +1,67 @@
+import hashlib
+
+from flask import current_app, request
+
+from app.models import TableVersion, db
+
+
+def bump_versions(*tables):
+    """Advance the write counter of ``tables``; call before committing a write."""
+    db.session.execute(
+        db.update(TableVersion)
+        .where(TableVersion.name.in_(tables))
+        .values(version=TableVersion.version + 1)
+    )
+
+
+def versions_query(*tables):
+    return db.select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables))
+
+
+def ordered_versions(rows, tables):
+    versions = dict(rows)
+    return [versions.get(table, 0) for table in tables]
+
+
+def table_versions(*tables):
+    """Current write counters for ``tables``: one primary-key lookup, no row scan."""
+    return ordered_versions(db.session.execute(versions_query(*tables)).all(), tables)
+
+
+def make_etag(*parts, req=None):
+    """
+    Strong ETag from data versions plus everything that shapes the body
+    (path, query string and negotiated media type).
+    """
+    req = request if req is None else req
+    key = '|'.join(str(part) for part in parts + (req.full_path, req.accept_mimetypes))
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def collection_etag(*tables):
+    return make_etag(*tables, *table_versions(*tables))
+
+
+def matching_etag(etag, req=None):
+    """
+    The tag in If-None-Match that matches ``etag`` or one of its content-coded
+    variants (``<etag>-gzip``, set by app.compression), or None.
+    """
+    if_none_match = (request if req is None else req).if_none_match
+    if etag in if_none_match:
+        return etag
+    for tag in if_none_match.as_set():
+        if tag.rpartition('-')[0] == etag:
+            return tag
+    return None
+
+
+def is_not_modified(etag, req=None):
+    return matching_etag(etag, req) is not None
+
+
+def not_modified(etag):
+    response = current_app.response_class(status=304)
+    # Echo the coded variant the client holds, as a 200 would have carried it
+    response.set_etag(matching_etag(etag) or etag)
+    return response
@@ -0,0 +1,190 @@
+"""
+Idempotency-Key support for the create endpoints (POST /books/, POST /authors/).
+
+A client that may retry sends ``Idempotency-Key: <unique string>``. The first
+request with a key runs normally and its successful response is stored for
+IDEMPOTENCY_TTL seconds; repeats of the key get that response back, marked
+``Idempotent-Replayed: true``, without touching the book or author tables.
+Reusing a key with a different body is a 422. Requests without the header
+behave as before.
+
+Keys are scoped to the endpoint and stored as a 16-byte digest in the
+``idempotency_key`` table, fronted by a per-process LRU of completed
+responses. The key row is inserted in the transaction the view commits, so
+the created record and its key land together: a concurrent request with the
+same key blocks on the primary key (or the SQLite write lock) instead of
+inserting a second record, then replays the stored response. Within a
+process, requests for one key wait on a lock rather than on the database.
+If the first request is still running after IDEMPOTENCY_WAIT_SECONDS the
+repeat gets a 409. A request that fails is rolled back with its key, so the
+client can retry it.
+
+A pending claim only holds the key for IDEMPOTENCY_WAIT_SECONDS; storing the
+response extends it to IDEMPOTENCY_TTL. Should a worker die between committing
+the record and storing its response, the key is reclaimable once that short
+lease runs out instead of answering 409 for the whole TTL.
+
+Expired keys are deleted at most every IDEMPOTENCY_PURGE_INTERVAL seconds per
+process, in the transaction of a request that claims a new key.
+"""
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import wraps
+
+from flask import abort, current_app, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.cache import MemoryBackend
+from app.models import IdempotencyKey, db, utcnow
+
+HEADER = 'Idempotency-Key'
+POLL_SECONDS = 0.05
+
+
+def digest(*parts):
+    return hashlib.blake2b(b'\0'.join(parts), digest_size=16).digest()
+
+
+def request_fingerprint():
+    # Parsed JSON, so whitespace and key order do not make a retry look different
+    data = request.get_json(silent=True)
+    if data is None:
+        return digest(request.get_data())
+    return digest(json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode())
+
+
+class _IdempotencyState:
+    def __init__(self, config):
+        self.ttl = config['IDEMPOTENCY_TTL']
+        self.wait_seconds = config['IDEMPOTENCY_WAIT_SECONDS']
+        self.purge_interval = config['IDEMPOTENCY_PURGE_INTERVAL']
+        self.max_length = config['IDEMPOTENCY_KEY_MAX_LENGTH']
+        self.responses = MemoryBackend(maxsize=config['IDEMPOTENCY_CACHE_ENTRIES'])
+        self.locks = {}  # key -> [lock, waiters]
+        self.lock = threading.Lock()
+        self.purged_at = None
+
+
+class Idempotency:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['idempotency'] = _IdempotencyState(app.config)
+
+    def _state(self):
+        return current_app.extensions['idempotency']
+
+    @contextmanager
+    def _serialized(self, state, key):
+        with state.lock:
+            entry = state.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with state.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del state.locks[key]
+
+    def handle(self, view, args, kwargs):
+        raw = request.headers.get(HEADER)
+        if raw is None:
+            return view(*args, **kwargs)
+        state = self._state()
+        if not raw or len(raw) > state.max_length:
+            abort(400, description='{} must be 1 to {} characters'.format(HEADER, state.max_length))
+        key = digest(request.endpoint.encode(), raw.encode())
+        fingerprint = request_fingerprint()
+        with self._serialized(state, key):
+            stored = state.responses.get(key) or self._stored_or_claim(state, key, fingerprint)
+            if stored is None:
+                return self._execute(state, key, fingerprint, view, args, kwargs)
+        return self._replay(stored, fingerprint)
+
+    def _stored_or_claim(self, state, key, fingerprint):
+        """
+        The stored (fingerprint, status, body) for ``key``; or None once the
+        key is claimed by a pending row in the current transaction.
+        """
+        deadline = time.monotonic() + state.wait_seconds
+        while True:
+            row = db.session.execute(
+                select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.body,
+                       IdempotencyKey.expires_at).where(IdempotencyKey.key == key)).first()
+            now = utcnow()
+            if row is not None and row.expires_at > now:
+                if row.fingerprint != fingerprint:
+                    self._reject()
+                if row.status_code is not None:
+                    stored = (row.fingerprint, row.status_code, row.body)
+                    state.responses.set(key, stored, (row.expires_at - now).total_seconds())
+                    return stored
+            else:
+                self._purge(state, now)
+                if row is not None:
+                    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+                try:
+                    # A short lease until the response is stored, see _execute()
+                    db.session.execute(insert(IdempotencyKey).values(
+                        key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=state.wait_seconds)))
+                    return None
+                except IntegrityError:
+                    pass  # claimed by a concurrent request that has committed since
+            db.session.rollback()  # end the read so the next poll sees new commits
+            if time.monotonic() >= deadline:
+                abort(409, description='A request with this {} is still in progress'.format(HEADER))
+            time.sleep(POLL_SECONDS)
+
+    def _purge(self, state, now):
+        if state.purged_at is not None and time.monotonic() - state.purged_at < state.purge_interval:
+            return
+        state.purged_at = time.monotonic()
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+
+    def _execute(self, state, key, fingerprint, view, args, kwargs):
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            db.session.rollback()
+            raise
+        if not 200 <= response.status_code < 300:
+            db.session.rollback()  # releases the claim; nothing was written
+            return response
+        body = response.get_data()
+        db.session.execute(update(IdempotencyKey).where(IdempotencyKey.key == key)
+                           .values(status_code=response.status_code, body=body,
+                                   expires_at=utcnow() + timedelta(seconds=state.ttl)))
+        db.session.commit()
+        state.responses.set(key, (fingerprint, response.status_code, body), state.ttl)
+        return response
+
+    def _reject(self):
+        abort(422, description='{} was already used with a different request body'.format(HEADER))
+
+    def _replay(self, stored, fingerprint):
+        stored_fingerprint, status_code, body = stored
+        if stored_fingerprint != fingerprint:
+            self._reject()
+        response = current_app.response_class(body, status=status_code, mimetype='application/json')
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+
+idempotency = Idempotency()
+
+
+def idempotent(view):
+    """Honour the Idempotency-Key header on a create view."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return idempotency.handle(view, args, kwargs)
+    return wrapper
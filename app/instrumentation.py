@@ -0,0 +1,207 @@
+"""
+Per-request performance instrumentation.
+
+For every request it records the total latency, the number of SQL
+statements and the time spent executing them (cursor execute events on the
+app's engines), the time spent encoding JSON and compressing the body, and
+the compression ratio achieved. The numbers go out in a
+``Server-Timing`` header and into per-endpoint histograms served in the
+Prometheus text format at GET /metrics. Statements slower than
+SLOW_QUERY_THRESHOLD_MS are logged.
+
+With INSTRUMENTATION_ENABLED off no hooks or listeners are installed, and
+``timed()`` costs one attribute lookup on ``g``.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger('app.slow_queries')
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+RATIO_BUCKETS = (0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0)
+
+HISTOGRAMS = {
+    'library_request_duration_seconds': ('Request latency', DURATION_BUCKETS),
+    'library_request_db_seconds': ('Time spent executing SQL per request', DURATION_BUCKETS),
+    'library_request_db_queries': ('SQL statements per request', QUERY_BUCKETS),
+    'library_request_serialize_seconds': ('Time spent encoding JSON per request', DURATION_BUCKETS),
+    'library_request_compress_seconds': ('Time spent compressing the response body per request', DURATION_BUCKETS),
+    'library_response_compression_ratio': ('Compressed over original body size, compressed responses only', RATIO_BUCKETS),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestTiming:
+    __slots__ = ('start', 'queries', 'db_seconds', 'serialize_seconds', 'compress_seconds', 'compression_ratio')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.compress_seconds = 0.0
+        self.compression_ratio = None
+
+
+class _InstrumentationState:
+    def __init__(self, server_timing, slow_query_seconds):
+        self.server_timing = server_timing
+        self.slow_query_seconds = slow_query_seconds
+        self.histograms = {}  # (metric, endpoint, method) -> Histogram
+        self.requests = {}  # (endpoint, method, status) -> count
+        self.lock = threading.Lock()
+
+    def observe(self, endpoint, method, status, values):
+        with self.lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for metric, value in values.items():
+                histogram = self.histograms.get((metric, endpoint, method))
+                if histogram is None:
+                    histogram = self.histograms[(metric, endpoint, method)] = Histogram(HISTOGRAMS[metric][1])
+                histogram.observe(value)
+
+
+def current_timing():
+    return g.get('timing') if has_app_context() else None
+
+
+@contextmanager
+def timed(bucket):
+    """Add the time spent in the block to the current request's ``bucket`` (e.g. 'serialize')."""
+    timing = current_timing()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timing, bucket + '_seconds', getattr(timing, bucket + '_seconds') + time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is discarded with a failing
+    # statement (after_cursor_execute never runs for it). Context-less cursor
+    # executes overwrite a single slot on the connection instead of a stack.
+    if context is not None:
+        context._query_start = time.perf_counter()
+    else:
+        conn.info['query_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = context._query_start if context is not None else conn.info['query_start']
+    elapsed = time.perf_counter() - start
+    if not has_app_context():
+        return
+    timing = current_timing()
+    if timing is not None:
+        timing.queries += 1
+        timing.db_seconds += elapsed
+    state = current_app.extensions.get('instrumentation')
+    if state is not None and state.slow_query_seconds and elapsed >= state.slow_query_seconds:
+        logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000,
+                       request.endpoint if has_request_context() else '-', ' '.join(statement.split()))
+
+
+class Instrumentation:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, engines=()):
+        """Install the request hooks and listen on ``engines`` (primary and replicas)."""
+        threshold = app.config['SLOW_QUERY_THRESHOLD_MS']
+        enabled = app.config['INSTRUMENTATION_ENABLED']
+        app.extensions['instrumentation'] = _InstrumentationState(
+            app.config['SERVER_TIMING_HEADER'], threshold / 1000 if threshold else 0)
+        if enabled:
+            app.before_request(self._start)
+            app.after_request(self._finish)
+        if enabled or threshold:
+            for engine in engines:
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def _start(self):
+        g.timing = RequestTiming()
+
+    def _finish(self, response):
+        timing = g.pop('timing', None)
+        if timing is None:
+            return response
+        total = time.perf_counter() - timing.start
+        state = current_app.extensions['instrumentation']
+        values = {
+            'library_request_duration_seconds': total,
+            'library_request_db_seconds': timing.db_seconds,
+            'library_request_db_queries': timing.queries,
+            'library_request_serialize_seconds': timing.serialize_seconds,
+            'library_request_compress_seconds': timing.compress_seconds,
+        }
+        if timing.compression_ratio is not None:
+            values['library_response_compression_ratio'] = timing.compression_ratio
+        state.observe(request.endpoint or 'unmatched', request.method, response.status_code, values)
+        if state.server_timing:
+            app_seconds = max(total - timing.db_seconds - timing.serialize_seconds - timing.compress_seconds, 0.0)
+            response.headers['Server-Timing'] = ', '.join([
+                'db;dur={:.2f};desc="{} queries"'.format(timing.db_seconds * 1000, timing.queries),
+                'serialize;dur={:.2f}'.format(timing.serialize_seconds * 1000),
+                'compress;dur={:.2f}'.format(timing.compress_seconds * 1000),
+                'app;dur={:.2f}'.format(app_seconds * 1000),
+                'total;dur={:.2f}'.format(total * 1000),
+            ])
+        return response
+
+    def render(self, metrics=()):
+        """
+        Prometheus text exposition of the request histograms plus ``metrics``,
+        (name, type, help, value) tuples with type 'counter' or 'gauge'.
+        """
+        state = current_app.extensions['instrumentation']
+        lines = ['# HELP library_requests_total Requests served', '# TYPE library_requests_total counter']
+        with state.lock:
+            for (endpoint, method, status), count in sorted(state.requests.items()):
+                lines.append('library_requests_total{{endpoint="{}",method="{}",status="{}"}} {}'.format(
+                    endpoint, method, status, count))
+            for metric, (help_text, _) in HISTOGRAMS.items():
+                lines += ['# HELP {} {}'.format(metric, help_text), '# TYPE {} histogram'.format(metric)]
+                for (name, endpoint, method), histogram in sorted(state.histograms.items()):
+                    if name != metric:
+                        continue
+                    labels = 'endpoint="{}",method="{}"'.format(endpoint, method)
+                    for bound, total in histogram.cumulative():
+                        lines.append('{}_bucket{{{},le="{}"}} {}'.format(metric, labels, bound, total))
+                    lines.append('{}_sum{{{}}} {}'.format(metric, labels, histogram.sum))
+                    lines.append('{}_count{{{}}} {}'.format(metric, labels, total))
+        for name, kind, help_text, value in metrics:
+            lines += ['# HELP {} {}'.format(name, help_text), '# TYPE {} {}'.format(name, kind),
+                      '{} {}'.format(name, value)]
+        return '\n'.join(lines) + '\n'
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,62 @@
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider, _default as flask_default
+
+from app.instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def default(o):
+    # ISO-8601 for dates (the format the API documents), Flask's handling for the rest
+    if isinstance(o, date):
+        return o.isoformat()
+    return flask_default(o)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Stdlib ``json`` with ISO-8601 dates, matching the orjson output."""
+
+    default = staticmethod(default)
+    ensure_ascii = False
+    sort_keys = False
+
+    def response(self, *args, **kwargs):
+        with timed('serialize'):
+            return super().response(*args, **kwargs)
+
+
+class OrjsonProvider(JSONProvider):
+    """``orjson`` encoder: dates, datetimes and dataclasses are handled natively in C."""
+
+    def _option(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._option(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        with timed('serialize'):
+            body = orjson.dumps(obj, default=self.default, option=self._option(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def make_json_provider(app):
+    """Pick the JSON backend from ``JSON_BACKEND``: auto (orjson if installed), orjson or stdlib."""
+    backend = app.config['JSON_BACKEND']
+    if backend == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_BACKEND=orjson but orjson is not installed')
+    if backend in ('auto', 'orjson') and orjson is not None:
+        return OrjsonProvider(app)
+    return JSONProvider(app)
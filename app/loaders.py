@@ -0,0 +1,79 @@
+"""
+Request-scoped batching loaders (the DataLoader pattern).
+
+A loader collects primary-key lookups for one model and resolves them with a
+single ``SELECT ... WHERE id IN (...)`` per MGET_CHUNK_SIZE keys. Results,
+misses included, are memoized in ``g`` until the request ends, so a route, a
+service and a relationship that all need the same Author load it once.
+
+``prime(keys)`` queues keys without querying; the next ``load`` resolves
+everything queued in the same round-trip. Loaded objects live in the
+session's identity map, so many-to-one relationships such as ``Book.author``
+are answered from it without another query once their target was loaded.
+"""
+from flask import abort, current_app, g
+
+from app.models import Author, Book, db
+from app.utils import chunked
+
+MISSING = object()
+
+
+class Loader:
+    def __init__(self, model):
+        self.model = model
+        self.name = model.__tablename__
+
+    def _state(self):
+        loaders = g.setdefault('loaders', {})
+        if self.name not in loaders:
+            loaders[self.name] = ({}, set())  # (memo, pending keys)
+        return loaders[self.name]
+
+    def prime(self, keys):
+        """Queue ``keys`` for the next batch without querying."""
+        memo, pending = self._state()
+        pending.update(key for key in keys if key not in memo)
+
+    def load(self, key):
+        """The object for ``key``, or None; resolves every queued key with it."""
+        return self.load_many([key]).get(key)
+
+    def load_many(self, keys):
+        """Objects for ``keys`` as {key: object}; keys without a row are left out."""
+        keys = list(keys)
+        self.prime(keys)
+        memo, pending = self._state()
+        if pending:
+            self._resolve(memo, pending)
+        return {key: memo[key] for key in keys if memo[key] is not MISSING}
+
+    def get_or_404(self, key):
+        obj = self.load(key)
+        if obj is None:
+            abort(404)
+        return obj
+
+    def clear(self, key):
+        """Forget ``key`` (after a delete) so a later load asks the database again."""
+        memo, pending = self._state()
+        memo.pop(key, None)
+        pending.discard(key)
+
+    def _resolve(self, memo, pending):
+        keys = sorted(pending)
+        pending.clear()
+        for chunk in chunked(keys, current_app.config['MGET_CHUNK_SIZE']):
+            for obj in db.session.scalars(db.select(self.model).where(self.model.id.in_(chunk))):
+                memo[obj.id] = obj
+        for key in keys:
+            memo.setdefault(key, MISSING)
+
+
+def reset_loaders(exc=None):
+    # teardown_request: an app context (and its g) can outlive one request in tests and CLI code
+    g.pop('loaders', None)
+
+
+author_loader = Loader(Author)
+book_loader = Loader(Book)
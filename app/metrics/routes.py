@@ -0,0 +1,145 @@
+from flask import Response, jsonify
+from . import metrics_bp
+from app import compression, db
+from app.cache import cache
+from app.instrumentation import instrumentation
+from app.pool import pool_stats
+from app.replicas import replicas
+
+def cache_metrics(prefix, description, counters):
+    """hits/misses/evictions as ``<prefix>_<name>_total`` counters; size as a gauge."""
+    metrics = [('{}_{}_total'.format(prefix, name), 'counter', '{} {}'.format(description, name), counters[name])
+               for name in ('hits', 'misses', 'evictions')]
+    if 'size' in counters:
+        metrics.append(('{}_size'.format(prefix), 'gauge', '{} entries'.format(description), counters['size']))
+    return metrics
+
+# pool_stats() key -> (metric, type, help); checkouts, timeouts and wait time only ever grow
+POOL_METRICS = {
+    'checked_out': ('library_db_pool_checked_out', 'gauge', 'Connections currently checked out'),
+    'overflow': ('library_db_pool_overflow', 'gauge', 'Connections open beyond pool_size'),
+    'checkouts': ('library_db_pool_checkouts_total', 'counter', 'Connection pool checkouts'),
+    'timeouts': ('library_db_pool_timeouts_total', 'counter', 'Checkouts that gave up after pool_timeout'),
+    'wait_seconds_total': ('library_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a connection'),
+}
+
+# GET /metrics - Prometheus scrape endpoint
+@metrics_bp.route('', methods=['GET'], strict_slashes=False)
+def prometheus_metrics():
+    """
+    Request, SQL and serialization histograms per endpoint, plus cache, compression cache and pool counters and gauges, in the Prometheus text format
+    ---
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Prometheus exposition format 0.0.4
+    """
+    metrics = cache_metrics('library_cache', 'Response cache', cache.stats())
+    compressed = compression.cache_stats()
+    if compressed is not None:
+        metrics += cache_metrics('library_compression_cache', 'Compressed body cache', compressed)
+    pool = pool_stats(db.engine)
+    metrics += [(name, kind, help_text, pool[key]) for key, (name, kind, help_text) in POOL_METRICS.items()
+                if pool.get(key) is not None]
+    return Response(instrumentation.render(metrics), mimetype='text/plain; version=0.0.4')
+
+# GET /metrics/cache - Cache hit, miss and eviction counters
+@metrics_bp.route('/cache', methods=['GET'])
+def cache_stats():
+    """
+    Response cache counters for this worker process
+    ---
+    responses:
+      200:
+        description: Cache statistics
+        schema:
+          type: object
+          properties:
+            backend:
+              type: string
+            hits:
+              type: integer
+            misses:
+              type: integer
+            evictions:
+              type: integer
+            size:
+              type: integer
+    """
+    return jsonify(cache.stats())
+
+# GET /metrics/pool - Database connection pool occupancy and checkout waits
+@metrics_bp.route('/pool', methods=['GET'])
+def pool_metrics():
+    """
+    Database connection pool counters for this worker process
+    ---
+    responses:
+      200:
+        description: Pool statistics (occupancy fields only for queue pools)
+        schema:
+          type: object
+          properties:
+            pool:
+              type: string
+            size:
+              type: integer
+            max_overflow:
+              type: integer
+            checked_out:
+              type: integer
+            checked_in:
+              type: integer
+            overflow:
+              type: integer
+            saturation:
+              type: number
+              description: Checked-out connections over pool_size + max_overflow
+            checkouts:
+              type: integer
+            timeouts:
+              type: integer
+              description: Checkouts that gave up after pool_timeout
+            wait_seconds_total:
+              type: number
+            wait_seconds_avg:
+              type: number
+            wait_seconds_max:
+              type: number
+    """
+    return jsonify(pool_stats(db.engine))
+
+# GET /metrics/replicas - Replica lag and read routing counters
+@metrics_bp.route('/replicas', methods=['GET'])
+def replica_metrics():
+    """
+    Read-replica health and routing counters for this worker process
+    ---
+    responses:
+      200:
+        description: Last probed lag per replica and how reads were routed
+        schema:
+          type: object
+          properties:
+            replicas:
+              type: object
+              additionalProperties:
+                type: object
+                properties:
+                  lag_seconds:
+                    type: number
+                    description: null when the replica is unreachable or out of sync
+                  healthy:
+                    type: boolean
+                  pool:
+                    type: object
+                    description: Same fields as /metrics/pool
+            replica_reads:
+              type: integer
+              description: Requests whose reads were served by a replica
+            primary_fallbacks:
+              type: integer
+              description: Replica-eligible requests sent to the primary because no replica was healthy
+    """
+    return jsonify(replicas.stats())
@@ -1,10 +1,29 @@
+from datetime import datetime, timezone
+from sqlalchemy import event
+from sqlalchemy.orm import validates
 from . import db
+from app.utils import parse_date
+
+def utcnow():
+    # Python-side so updated_at keeps sub-second resolution on every backend
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 class Author(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     bio = db.Column(db.Text)
     birth_date = db.Column(db.Date)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+    # Maintained by the book write paths (app.stats.services.adjust_book_counts)
+    book_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @validates('birth_date')
+    def validate_birth_date(self, key, value):
+        return parse_date(value)
+
+    __table_args__ = (
+        db.Index('ix_author_book_count', 'book_count', 'id'),
+    )
 
 class Book(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -12,4 +31,44 @@ class Book(db.Model):
     description = db.Column(db.Text)
     publish_date = db.Column(db.Date)
     author_id = db.Column(db.Integer, db.ForeignKey('author.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
     author = db.relationship('Author', backref=db.backref('books', lazy=True))
+
+    @validates('publish_date')
+    def validate_publish_date(self, key, value):
+        # JSON payloads carry ISO strings; only SQLite's DATE type insists on date objects
+        return parse_date(value)
+
+    # Trailing id matches the keyset order (sort column, id) used by GET /books/
+    __table_args__ = (
+        db.Index('ix_book_author_id_id', 'author_id', 'id'),
+        db.Index('ix_book_author_id_publish_date', 'author_id', 'publish_date', 'id'),
+        db.Index('ix_book_publish_date', 'publish_date', 'id'),
+        db.Index('ix_book_title', 'title', 'id'),
+        # LIKE 'prefix%' can only use a B-tree under non-C collations with pattern ops
+        db.Index('ix_book_title_pattern', 'title', postgresql_ops={'title': 'varchar_pattern_ops'}).ddl_if(dialect='postgresql'),
+    )
+
+class TableVersion(db.Model):
+    """Write counter per table, bumped in the same transaction as every write."""
+    __tablename__ = 'table_version'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+@event.listens_for(TableVersion.__table__, 'after_create')
+def seed_table_versions(target, connection, **kw):
+    connection.execute(target.insert(), [{'name': 'author', 'version': 0}, {'name': 'book', 'version': 0}])
+
+class IdempotencyKey(db.Model):
+    """Response of a create request, stored under a digest of its endpoint and Idempotency-Key."""
+    __tablename__ = 'idempotency_key'
+    key = db.Column(db.LargeBinary(16), primary_key=True)
+    fingerprint = db.Column(db.LargeBinary(16), nullable=False)
+    # NULL while the first request with the key is still running
+    status_code = db.Column(db.SmallInteger)
+    body = db.Column(db.LargeBinary)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_idempotency_key_expires_at', 'expires_at'),
+    )
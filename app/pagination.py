@@ -0,0 +1,130 @@
+import base64
+import json
+from datetime import date
+
+from flask import abort, current_app, jsonify, request, url_for
+from sqlalchemy import and_, or_, tuple_
+
+from app.serializers import fetch_rows
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor, key='id'):
+    """Decode an opaque cursor; ``key`` must hold a non-negative integer."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        abort(400, description='Invalid cursor')
+    position = values.get(key) if isinstance(values, dict) else None
+    if not isinstance(position, int) or isinstance(position, bool) or position < 0:
+        abort(400, description='Invalid cursor')
+    return values
+
+
+def get_limit(args=None, config=None):
+    """Read ?limit= and clamp it to the server-enforced maximum page size."""
+    config = current_app.config if config is None else config
+    default = config['PAGE_SIZE_DEFAULT']
+    maximum = config['PAGE_SIZE_MAX']
+    # type=int would quietly fall back to the default for ?limit=abc
+    raw = (request.args if args is None else args).get('limit')
+    try:
+        limit = default if raw is None else int(raw)
+    except ValueError:
+        limit = None
+    if limit is None or limit < 1:
+        abort(400, description='limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def _encode_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _decode_value(column, value):
+    if value is None or column.type.python_type is not date:
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        abort(400, description='Invalid cursor')
+
+
+def _ordering(id_column, sort_column, descending):
+    # NULLs sort as the largest value (PostgreSQL's B-tree order) on every backend
+    if sort_column is None:
+        return [id_column.desc() if descending else id_column.asc()]
+    if descending:
+        return [sort_column.desc().nulls_first(), id_column.desc()]
+    return [sort_column.asc().nulls_last(), id_column.asc()]
+
+
+def _seek(cursor, id_column, sort_column, descending):
+    last_id = cursor['id']
+    past_id = id_column < last_id if descending else id_column > last_id
+    if sort_column is None:
+        return past_id
+    if 'k' not in cursor:
+        abort(400, description='Invalid cursor')
+    value = _decode_value(sort_column, cursor['k'])
+    if value is None:
+        seek = and_(sort_column.is_(None), past_id)
+        return or_(seek, sort_column.isnot(None)) if descending else seek
+    # Row-value comparison so (sort_column, id) can be one index range scan
+    key = tuple_(sort_column, id_column)
+    seek = key < (value, last_id) if descending else key > (value, last_id)
+    if sort_column.nullable and not descending:
+        seek = or_(seek, sort_column.is_(None))
+    return seek
+
+
+def paginate(query, id_column, sort_column=None, descending=False):
+    """
+    Keyset pagination on the primary key, or on ``sort_column`` with the
+    primary key as tie-breaker.
+
+    Seeks past the position stored in the ?after= cursor instead of using
+    OFFSET, so every page costs the same index range scan regardless of depth.
+    The sort column must be part of the selected columns. Column-only queries
+    return compact rows (``fetch_rows``).
+    Returns the rows of the page and the cursor for the next one (or None).
+    """
+    limit = get_limit()
+    rows = fetch_rows(keyset_query(query, limit, request.args.get('after'), id_column, sort_column, descending))
+    return split_page(rows, limit, sort_column)
+
+
+def keyset_query(query, limit, after, id_column, sort_column=None, descending=False):
+    """Seek past the ``after`` cursor, order, and fetch one row beyond ``limit`` (Query or Select)."""
+    if after:
+        query = query.filter(_seek(decode_cursor(after), id_column, sort_column, descending))
+    return query.order_by(*_ordering(id_column, sort_column, descending)).limit(limit + 1)
+
+
+def split_page(rows, limit, sort_column=None):
+    """Drop the look-ahead row; returns the page and the cursor for the next one (or None)."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        position = {'id': rows[-1].id}
+        if sort_column is not None:
+            position['k'] = _encode_value(getattr(rows[-1], sort_column.key))
+        next_cursor = encode_cursor(position)
+    return rows, next_cursor
+
+
+def paginated_response(items, next_cursor):
+    """JSON array response; the next page is advertised via Link / X-Next-Cursor."""
+    response = jsonify(items)
+    if next_cursor:
+        args = request.args.to_dict()
+        args['after'] = next_cursor
+        args.update(request.view_args or {})
+        response.headers['Link'] = '<{}>; rel="next"'.format(url_for(request.endpoint, **args))
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
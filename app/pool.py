@@ -0,0 +1,80 @@
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """Checkout counters for one pool: how often and how long callers waited."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that times every checkout. The wait covers both queueing for a
+    free connection and opening a new one, i.e. what a request actually pays.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+def instrument_engine_options(options):
+    """Swap in InstrumentedQueuePool wherever the engine would use a QueuePool."""
+    if 'pool_size' in options and 'poolclass' not in options:
+        return dict(options, poolclass=InstrumentedQueuePool)
+    return options
+
+
+def pool_stats(engine):
+    """Occupancy of ``engine``'s pool plus checkout wait times when instrumented."""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        stats.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': checked_out,
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'saturation': round(checked_out / capacity, 4) if capacity else None,
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        waits = pool.stats.checkouts + pool.stats.timeouts
+        stats.update({
+            'checkouts': pool.stats.checkouts,
+            'timeouts': pool.stats.timeouts,
+            'wait_seconds_total': round(pool.stats.wait_seconds_total, 6),
+            'wait_seconds_avg': round(pool.stats.wait_seconds_total / waits, 6) if waits else 0.0,
+            'wait_seconds_max': round(pool.stats.wait_seconds_max, 6),
+        })
+    return stats
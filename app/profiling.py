@@ -0,0 +1,191 @@
+"""
+On-demand profiling of individual requests.
+
+A request asks to be profiled with ``?__profile=pstats`` (or ``=1``) for a
+cProfile run, or ``?__profile=speedscope`` for a sampling profile; the
+``X-Profile`` header does the same without touching the query string. When
+PROFILING_TOKEN is set the request must also carry it in ``X-Profile-Token``.
+
+The profile and a JSON report with the SQL statements the request issued are
+written to PROFILING_DIR, and the report replaces the response body. With
+PROFILING_ENABLED off (the default outside development) no hooks or engine
+listeners are installed.
+"""
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+
+from flask import current_app, g, has_app_context, jsonify, request
+from sqlalchemy import event
+
+FORMATS = {'1': 'pstats', 'pstats': 'pstats', 'speedscope': 'speedscope'}
+TOP_FUNCTIONS = 25
+
+
+class Sampler(threading.Thread):
+    """Sample the stack of one thread every ``interval`` seconds, for speedscope's sampled format."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = []
+        self.frames = {}  # (name, file, line) -> index
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(self.frames.setdefault((code.co_name, code.co_filename, code.co_firstlineno),
+                                                    len(self.frames)))
+                frame = frame.f_back
+            if stack:
+                self.samples.append(stack[::-1])
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def speedscope(self, name, duration):
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'library_api',
+            'shared': {'frames': [{'name': fn, 'file': file, 'line': line} for fn, file, line in self.frames]},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': duration,
+                'samples': self.samples,
+                'weights': [self.interval] * len(self.samples),
+            }],
+        }
+
+
+class RequestProfile:
+    def __init__(self, fmt, interval):
+        self.format = fmt
+        self.statements = []
+        self.start = time.perf_counter()
+        if fmt == 'speedscope':
+            self.profiler = Sampler(threading.get_ident(), interval)
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self):
+        if self.format == 'speedscope':
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+        return time.perf_counter() - self.start
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{'function': '{}:{}({})'.format(*func), 'calls': calls,
+             'own_ms': round(own * 1000, 3), 'cumulative_ms': round(cumulative * 1000, 3)}
+            for func, (_, calls, own, cumulative, _) in rows]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Not on the pooled connection, which would keep the start of every failed statement
+    if context is not None:
+        context._profile_start = time.perf_counter()
+    else:
+        conn.info['profile_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = context._profile_start if context is not None else conn.info['profile_start']
+    elapsed = time.perf_counter() - start
+    profile = g.get('profile') if has_app_context() else None
+    if profile is not None:
+        profile.statements.append({'statement': statement, 'parameters': repr(parameters),
+                                   'executemany': executemany, 'duration_ms': round(elapsed * 1000, 3)})
+
+
+class Profiler:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, engines=()):
+        if not app.config['PROFILING_ENABLED']:
+            return
+        if not app.config['PROFILING_TOKEN'] and not (app.debug or app.testing):
+            raise RuntimeError('PROFILING_ENABLED requires PROFILING_TOKEN outside debug mode')
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._discard)
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def _requested_format(self):
+        value = request.args.get('__profile') or request.headers.get('X-Profile')
+        if not value:
+            return None
+        token = current_app.config['PROFILING_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('X-Profile-Token', ''), token):
+            return None
+        return FORMATS.get(value.lower())
+
+    def _start(self):
+        fmt = self._requested_format()
+        if fmt is not None:
+            g.profile = RequestProfile(fmt, current_app.config['PROFILING_SAMPLE_INTERVAL_MS'] / 1000)
+
+    def _finish(self, response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        duration = profile.stop()
+        name = '{}-{}-{}'.format(time.strftime('%Y%m%dT%H%M%S'), request.endpoint or 'unmatched',
+                                 uuid.uuid4().hex[:8])
+        directory = current_app.config['PROFILING_DIR']
+        os.makedirs(directory, exist_ok=True)
+        report = {
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.full_path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'format': profile.format,
+            'queries': len(profile.statements),
+            'sql': profile.statements,
+        }
+        if profile.format == 'speedscope':
+            report['profile'] = os.path.join(directory, name + '.speedscope.json')
+            with open(report['profile'], 'w') as handle:
+                json.dump(profile.profiler.speedscope(request.endpoint or request.path, duration), handle)
+        else:
+            report['profile'] = os.path.join(directory, name + '.prof')
+            profile.profiler.dump_stats(report['profile'])
+            report['top'] = top_functions(profile.profiler)
+        with open(os.path.join(directory, name + '.json'), 'w') as handle:
+            json.dump(report, handle, default=str)
+        return jsonify(report)
+
+    def _discard(self, exc):
+        # The view raised before after_request could stop the profiler
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.stop()
+
+
+profiler = Profiler()
@@ -0,0 +1,203 @@
+"""
+Read-replica routing.
+
+Replica URLs come from SQLALCHEMY_REPLICA_URIS. Their engines are created
+here with the primary's SQLALCHEMY_ENGINE_OPTIONS rather than as
+Flask-SQLAlchemy binds, so create_all/drop_all and migrations never touch
+them. GET and HEAD requests to the blueprints in REPLICA_BLUEPRINTS read
+from a healthy replica; everything else, and every statement once the
+request has written, goes to the primary. A client that
+has just written carries a short-lived cookie that pins its reads to the
+primary, so it always sees its own writes.
+
+A request reads from one replica for its whole duration, picked round-robin
+on its first read, so version lookups (ETags) and the rows they label always
+come from the same database. Replica health is probed at most every
+REPLICA_LAG_CHECK_INTERVAL seconds per process. A replica more than REPLICA_MAX_LAG_SECONDS behind, or one that
+cannot be reached, is skipped until the next probe; with none left, the
+request falls back to the primary.
+"""
+import itertools
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, exc, text
+
+from app.pool import pool_stats
+
+logger = logging.getLogger(__name__)
+
+READ_PRIMARY_COOKIE = 'read_primary_until'
+
+PG_REPLAY_LAG = text("""
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) END""")
+TABLE_VERSIONS = text('SELECT name, version FROM table_version ORDER BY name')
+
+
+def replica_lag(primary, replica):
+    """
+    Seconds ``replica`` is behind ``primary``. PostgreSQL standbys report
+    their replay delay; other backends compare the table_version write
+    counters and count any difference as infinitely stale.
+    """
+    if replica.dialect.name == 'postgresql':
+        with replica.connect() as connection:
+            return float(connection.execute(PG_REPLAY_LAG).scalar())
+    with primary.connect() as connection:
+        expected = connection.execute(TABLE_VERSIONS).all()
+    with replica.connect() as connection:
+        actual = connection.execute(TABLE_VERSIONS).all()
+    return 0.0 if actual == expected else math.inf
+
+
+class _ReplicaState:
+    def __init__(self, engines, max_lag, check_interval):
+        self.engines = engines
+        self.keys = sorted(engines)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = {key: (0.0, -math.inf) for key in engines}  # key -> (lag, checked_at)
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self.lock = threading.Lock()
+        self._next = itertools.cycle(self.keys)
+
+
+class ReplicaRouter:
+    """Picks the engine for reads made while serving a request."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        engines = {'replica_{}'.format(index): create_engine(uri, **options)
+                   for index, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS'])}
+        app.extensions['replicas'] = _ReplicaState(
+            engines, app.config['REPLICA_MAX_LAG_SECONDS'], app.config['REPLICA_LAG_CHECK_INTERVAL'])
+        if engines:
+            app.before_request(self._route_request)
+            app.after_request(self._pin_writer)
+
+    def _state(self):
+        return current_app.extensions['replicas']
+
+    def _route_request(self):
+        g.wrote_primary = False
+        g.pop('read_engine', None)
+        g.primary_reads = 0
+        g.read_replica = (request.method in ('GET', 'HEAD')
+                          and request.blueprint in current_app.config['REPLICA_BLUEPRINTS']
+                          and request.cookies.get(READ_PRIMARY_COOKIE, type=float, default=0) < time.time())
+
+    def _pin_writer(self, response):
+        if g.get('wrote_primary'):
+            seconds = current_app.config['READ_YOUR_WRITES_SECONDS']
+            response.set_cookie(READ_PRIMARY_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True)
+        return response
+
+    def mark_write(self):
+        """Send the rest of this request, and the client's next reads, to the primary."""
+        if has_request_context():
+            g.read_replica = False
+            g.wrote_primary = True
+
+    def lag(self, key):
+        """Replica lag in seconds, re-probed once the cached value is older than the interval."""
+        state = self._state()
+        lag, checked_at = state.lag[key]
+        now = time.monotonic()
+        if now - checked_at < state.check_interval:
+            return lag
+        try:
+            lag = replica_lag(current_app.extensions['sqlalchemy'].engines[None], state.engines[key])
+        except exc.SQLAlchemyError as error:
+            logger.warning('Replica %s unavailable: %s', key, error)
+            lag = math.inf
+        with state.lock:
+            state.lag[key] = (lag, now)
+        return lag
+
+    def engine_for_read(self):
+        """
+        The replica engine serving this request's reads, or None to use the
+        primary. Chosen on the first read and kept for the rest of the request.
+        """
+        if not has_request_context() or not g.get('read_replica') or g.get('primary_reads'):
+            return None
+        engine = g.get('read_engine')
+        if engine is None:
+            engine = g.read_engine = self._pick()
+            if engine is None:
+                g.read_replica = False  # no healthy replica: the whole request reads the primary
+        return engine
+
+    def _pick(self):
+        state = self._state()
+        for _ in state.keys:
+            with state.lock:
+                key = next(state._next)
+            if self.lag(key) <= state.max_lag:
+                with state.lock:
+                    state.replica_reads += 1
+                return state.engines[key]
+        with state.lock:
+            state.primary_fallbacks += 1
+        return None
+
+    @contextmanager
+    def primary(self):
+        """
+        Read from the primary inside the block, e.g. to fill a cache entry
+        that outlives REPLICA_MAX_LAG_SECONDS.
+        """
+        if not has_request_context():
+            yield
+            return
+        g.primary_reads = g.get('primary_reads', 0) + 1
+        try:
+            yield
+        finally:
+            g.primary_reads -= 1
+
+    def engines(self):
+        return self._state().engines
+
+    def stats(self):
+        state = self._state()
+        return {
+            'replicas': {key: {'lag_seconds': None if math.isinf(lag) else round(lag, 3),
+                               'healthy': lag <= state.max_lag,
+                               'pool': pool_stats(state.engines[key])}
+                         for key, (lag, _) in state.lag.items()},
+            'replica_reads': state.replica_reads,
+            'primary_fallbacks': state.primary_fallbacks,
+        }
+
+
+replicas = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """
+    ``db.session`` that sends reads to a replica when the request allows it.
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary and
+    pin the remainder of the request there.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                replicas.mark_write()
+            else:
+                engine = replicas.engine_for_read()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
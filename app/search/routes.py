@@ -0,0 +1,80 @@
+from flask import abort, current_app, request
+from . import search_bp
+from app.pagination import decode_cursor, encode_cursor, get_limit, paginated_response
+from app.search.services import SEARCH_TYPES, search
+
+# GET /search - Full-text search across books and authors
+@search_bp.route('/', methods=['GET'], strict_slashes=False)
+def search_catalog():
+    """
+    Full-text search across book titles and descriptions and author names and bios
+    ---
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Search terms (all must match)
+      - name: type
+        in: query
+        type: string
+        required: false
+        enum: [book, author]
+        description: Only return hits of this type
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Page size (capped by the server)
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Opaque cursor taken from the previous page
+    responses:
+      200:
+        description: Hits ordered by relevance, with highlighted snippets
+        headers:
+          Link:
+            type: string
+            description: URL of the next page (rel="next"), absent on the last page
+          X-Next-Cursor:
+            type: string
+            description: Cursor for the next page, absent on the last page
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              type:
+                type: string
+                enum: [book, author]
+              id:
+                type: integer
+              title:
+                type: string
+              snippet:
+                type: string
+                description: HTML-escaped matching text with terms wrapped in <mark></mark>
+              score:
+                type: number
+      400:
+        description: Missing q, unknown type, or invalid limit/cursor
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        abort(400, description='q is required')
+    kind = request.args.get('type')
+    if kind is not None and kind not in SEARCH_TYPES:
+        abort(400, description='type must be one of: {}'.format(', '.join(SEARCH_TYPES)))
+    limit = get_limit()
+    after = request.args.get('after')
+    offset = decode_cursor(after, key='offset')['offset'] if after else 0
+    if offset + limit > current_app.config['SEARCH_MAX_RESULTS']:
+        abort(400, description='Search results are limited to the first {}'.format(current_app.config['SEARCH_MAX_RESULTS']))
+    hits = search(q, types=(kind,) if kind else SEARCH_TYPES, limit=limit + 1, offset=offset)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor({'offset': offset + limit})
+    return paginated_response(hits, next_cursor)
@@ -0,0 +1,71 @@
+"""
+Full-text index DDL, kept outside the mapped models because it is dialect
+specific.
+
+PostgreSQL: a generated, weighted ``tsvector`` column on book and author
+with a GIN index each. SQLite: one FTS5 table, ``search_index``, kept in
+sync by triggers. Its rowid encodes the source row (book id * 2, author
+id * 2 + 1) so that updates and deletes are primary-key lookups.
+
+``db.create_all()`` builds the index through the ``after_create`` hook
+below; existing databases get it from the matching Alembic migration.
+"""
+from sqlalchemy import event
+
+from app.models import Author, Book, db
+
+POSTGRESQL_DDL = [
+    """ALTER TABLE book ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_book_search_vector ON book USING gin (search_vector)",
+    """ALTER TABLE author ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(bio, '')), 'B')) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_author_search_vector ON author USING gin (search_vector)",
+]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize='porter unicode61')",
+    """CREATE TRIGGER IF NOT EXISTS book_search_insert AFTER INSERT ON book BEGIN
+        INSERT INTO search_index (rowid, kind, ref_id, title, body)
+        VALUES (new.id * 2, 'book', new.id, new.title, coalesce(new.description, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_search_update AFTER UPDATE OF title, description ON book BEGIN
+        UPDATE search_index SET title = new.title, body = coalesce(new.description, '')
+        WHERE rowid = new.id * 2;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_search_delete AFTER DELETE ON book BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS author_search_insert AFTER INSERT ON author BEGIN
+        INSERT INTO search_index (rowid, kind, ref_id, title, body)
+        VALUES (new.id * 2 + 1, 'author', new.id, new.name, coalesce(new.bio, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS author_search_update AFTER UPDATE OF name, bio ON author BEGIN
+        UPDATE search_index SET title = new.name, body = coalesce(new.bio, '')
+        WHERE rowid = new.id * 2 + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS author_search_delete AFTER DELETE ON author BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+    END""",
+]
+
+
+def create_search_schema(connection):
+    statements = {'postgresql': POSTGRESQL_DDL, 'sqlite': SQLITE_DDL}.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_schema(target, connection, tables=(), **kw):
+    names = {table.name for table in tables}
+    if {Author.__tablename__, Book.__tablename__} <= names:
+        create_search_schema(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_schema(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_index')
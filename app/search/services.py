@@ -0,0 +1,91 @@
+import html
+import re
+
+from flask import abort
+from sqlalchemy import text
+
+from app.models import db
+
+SEARCH_TYPES = ('book', 'author')
+SNIPPET_TOKENS = 12
+# The database marks matches with private-use characters; the snippet is
+# HTML-escaped before they become <mark> tags, so stored text is never markup.
+MARK_START, MARK_STOP = '\ue000', '\ue001'
+
+# Ranked hits for one page only; ts_headline is the expensive part of the
+# query and runs on those rows alone, not on every match.
+POSTGRESQL_HIT = """
+    SELECT '{type}' AS type, id, ts_rank(search_vector, query) AS score
+    FROM {type}, websearch_to_tsquery('english', :q) AS query
+    WHERE search_vector @@ query"""
+
+POSTGRESQL_SEARCH = """
+WITH hits AS (
+    {hits}
+    ORDER BY score DESC, type, id
+    LIMIT :limit OFFSET :offset
+)
+SELECT hits.type, hits.id, coalesce(book.title, author.name) AS title,
+       ts_headline('english', concat_ws(' ', coalesce(book.title, author.name), coalesce(book.description, author.bio)),
+                   websearch_to_tsquery('english', :q),
+                   'StartSel={start}, StopSel={stop}, MaxWords={words}, MinWords={min_words}') AS snippet,
+       hits.score
+FROM hits
+LEFT JOIN book ON hits.type = 'book' AND book.id = hits.id
+LEFT JOIN author ON hits.type = 'author' AND author.id = hits.id
+ORDER BY hits.score DESC, hits.type, hits.id"""
+
+# bm25() weights per column: kind, ref_id, title, body. Lower is better.
+SQLITE_SEARCH = """
+SELECT kind, ref_id, title,
+       snippet(search_index, -1, :mark_start, :mark_stop, '…', {words}) AS snippet,
+       -bm25(search_index, 0.0, 0.0, 10.0, 1.0) AS score
+FROM search_index
+WHERE search_index MATCH :q{kind_filter}
+ORDER BY bm25(search_index, 0.0, 0.0, 10.0, 1.0), rowid
+LIMIT :limit OFFSET :offset"""
+
+
+def fts5_query(q):
+    # Quote every word so user input can never be read as FTS5 query syntax;
+    # the terms are implicitly ANDed, like websearch_to_tsquery without operators.
+    return ' '.join('"{}"'.format(term) for term in re.findall(r'\w+', q))
+
+
+def highlight(snippet):
+    """Escape the snippet text, then turn the match markers into <mark> tags."""
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet, quote=False)
+    return escaped.replace(MARK_START, '<mark>').replace(MARK_STOP, '</mark>')
+
+
+def search(q, types=SEARCH_TYPES, limit=20, offset=0):
+    """
+    Ranked full-text search over book titles/descriptions and author
+    names/bios. Returns up to ``limit`` hits starting at ``offset``, best
+    first, each with a ``<mark>``-highlighted snippet.
+    """
+    dialect = db.session.get_bind().dialect.name
+    params = {'limit': limit, 'offset': offset}
+    if dialect == 'postgresql':
+        params['q'] = q
+        hits = '\n    UNION ALL'.join(POSTGRESQL_HIT.format(type=type) for type in types)
+        sql = POSTGRESQL_SEARCH.format(hits=hits, words=SNIPPET_TOKENS * 2, min_words=SNIPPET_TOKENS // 2,
+                                       start=MARK_START, stop=MARK_STOP)
+    elif dialect == 'sqlite':
+        params.update(q=fts5_query(q), mark_start=MARK_START, mark_stop=MARK_STOP)
+        if not params['q']:
+            return []
+        kind_filter = ''
+        if len(types) == 1:
+            kind_filter = ' AND kind = :kind'
+            params['kind'] = types[0]
+        sql = SQLITE_SEARCH.format(words=SNIPPET_TOKENS, kind_filter=kind_filter)
+    else:
+        abort(501, description='Full-text search is not supported on {}'.format(dialect))
+    rows = db.session.execute(text(sql), params)
+    return [
+        {'type': type, 'id': id, 'title': title, 'snippet': highlight(snippet), 'score': round(score, 6)}
+        for type, id, title, snippet, score in rows
+    ]
@@ -0,0 +1,82 @@
+"""
+Field sets for the API representations of authors and books.
+
+List and detail reads select exactly these columns (``with_entities``) and
+zip the returned tuples into dicts, so no ORM instances are built on the
+read path. Large column-only reads (list pages, NDJSON streams) are executed
+on the session's connection by ``fetch_rows`` / ``iter_rows`` and come back
+as namedtuples: no ORM loading, no identity map, one plain tuple per row.
+ORM objects (e.g. authors loaded with their books) go through
+``serialize_object`` with the same field sets.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from sqlalchemy import inspect
+
+AUTHOR_FIELDS = ('id', 'name', 'bio', 'birth_date', 'updated_at')
+BOOK_FIELDS = ('id', 'title', 'description', 'publish_date', 'author_id', 'updated_at')
+BOOK_DETAIL_FIELDS = ('id', 'title', 'description', 'updated_at')
+BOOK_SUMMARY_FIELDS = ('id', 'title')
+
+
+def columns(model, fields):
+    return [getattr(model, field) for field in fields]
+
+
+def serialize_row(row, fields):
+    return dict(zip(fields, row))
+
+
+def serialize_rows(rows, fields):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def row_serializer(fields):
+    return lambda row: dict(zip(fields, row))
+
+
+def serialize_object(obj, fields):
+    return {field: getattr(obj, field) for field in fields}
+
+
+@lru_cache(maxsize=None)
+def row_type(fields):
+    """Compact row class for ``fields``: a tuple with attribute access and no per-row dict."""
+    return namedtuple('CompactRow', fields)
+
+
+def loads_entities(query):
+    """True when ``query`` selects mapped classes (ORM instances) rather than columns."""
+    for description in query.column_descriptions:
+        info = inspect(description['expr'], raiseerr=False)
+        if info is not None and (info.is_mapper or info.is_aliased_class):
+            return True
+    return False
+
+
+def _execute(query, **options):
+    # Core execution on the connection the session would use (replica routing
+    # included): skips ORM result loading; read-only queries, so no autoflush.
+    stmt = query.statement
+    connection = query.session.connection(bind_arguments={'clause': stmt})
+    result = connection.execution_options(**options).execute(stmt)
+    return result, row_type(tuple(result.keys()))._make
+
+
+def fetch_rows(query):
+    """All rows of ``query``: compact rows for column-only queries, ORM results otherwise."""
+    if loads_entities(query):
+        return query.all()
+    result, make = _execute(query)
+    return list(map(make, result))
+
+
+def iter_rows(query, batch_size):
+    """Like ``fetch_rows``, streamed ``batch_size`` rows at a time (server-side cursor on PostgreSQL)."""
+    if loads_entities(query):
+        yield from query.yield_per(batch_size)
+        return
+    result, make = _execute(query, yield_per=batch_size)
+    for partition in result.partitions():
+        yield from map(make, partition)
@@ -0,0 +1,117 @@
+"""
+Production entry point: ``python -m app.serve [--workers N] [--threads N]``.
+
+Runs the app under gunicorn with gthread workers. Defaults: one worker per
+CPU, WEB_THREADS threads each, and the app preloaded in the master so
+imports and the Swagger spec are built once before forking.
+
+Signals to the master (gunicorn's own):
+  HUP        graceful reload: start fresh workers, then retire the old ones
+  TTIN/TTOU  add/remove one worker at runtime
+  USR2+WINCH zero-downtime upgrade to new code (HUP alone reuses the
+             preloaded app)
+
+Without gunicorn (e.g. on Windows) it falls back to a single waitress process.
+
+The app always runs with ProductionConfig unless ``--config`` says otherwise;
+FLASK_ENV is not consulted, since importing ``config`` loads ``.env``, whose
+FLASK_ENV=development would turn on the debugger and the profiler.
+"""
+import argparse
+import os
+
+
+def dispose_engines(app):
+    """Drop connections inherited from the master; each worker opens its own."""
+    from app import db
+    from app.replicas import replicas
+    with app.app_context():
+        db.engine.dispose(close=False)
+        for engine in replicas.engines().values():
+            engine.dispose(close=False)
+
+
+def warm_up(app):
+    # flasgger caches the generated spec outside debug mode
+    app.test_client().get('/apispec_1.json')
+
+
+def build_app(config_name='production'):
+    from app import create_app
+    from config import CONFIGS
+    app = create_app(CONFIGS[config_name])
+    warm_up(app)
+    return app
+
+
+def gunicorn_options(args):
+    return {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread' if args.threads > 1 else 'sync',
+        'preload_app': args.preload,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests_jitter,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'keepalive': args.keep_alive,
+        'accesslog': args.access_log,
+    }
+
+
+def serve_gunicorn(options, config_name='production'):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+            self.cfg.set('post_fork', lambda server, worker: dispose_engines(self.wsgi()))
+
+        def load(self):
+            # Called once in the master with preload_app, otherwise once per worker
+            return build_app(config_name)
+
+    Application().run()
+
+
+def serve_waitress(options, config_name='production'):
+    import waitress
+    waitress.serve(build_app(config_name), listen=options['bind'], threads=options['threads'])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Library API with a production WSGI server')
+    parser.add_argument('--bind', default=os.getenv('BIND', '0.0.0.0:{}'.format(os.getenv('PORT', 8000))))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', 4)))
+    parser.add_argument('--no-preload', dest='preload', action='store_false')
+    parser.add_argument('--config', default='production', choices=['production', 'development', 'testing'],
+                        help='Configuration class to run with (FLASK_ENV is ignored)')
+    parser.add_argument('--max-requests', type=int, default=int(os.getenv('WEB_MAX_REQUESTS', 10000)),
+                        help='Recycle a worker after this many requests (0 = never)')
+    parser.add_argument('--max-requests-jitter', type=int, default=int(os.getenv('WEB_MAX_REQUESTS_JITTER', 1000)),
+                        help='Random extra requests per worker so they do not all restart at once')
+    parser.add_argument('--timeout', type=int, default=int(os.getenv('WEB_TIMEOUT', 30)))
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30)))
+    # Longer than a load balancer's idle timeout (often 60s), or it may reuse a connection
+    # just as the worker closes it; idle connections cost gthread workers no thread
+    parser.add_argument('--keep-alive', type=int, default=int(os.getenv('WEB_KEEP_ALIVE', 75)))
+    parser.add_argument('--access-log', default=os.getenv('WEB_ACCESS_LOG'), help="Path, or '-' for stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = gunicorn_options(args)
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:  # not available on Windows
+        serve_waitress(options, args.config)
+    else:
+        serve_gunicorn(options, args.config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+from flask import jsonify, request
+from . import stats_bp
+from .services import catalog_stats
+from app.conditional import is_not_modified, make_etag, not_modified, table_versions
+
+# GET /stats/catalog - Catalogue totals, books per year and top authors
+@stats_bp.route('/catalog', methods=['GET'])
+def get_catalog_stats():
+    """
+    Catalogue totals, books per publication year and the authors with most books
+    ---
+    parameters:
+      - name: top
+        in: query
+        type: integer
+        required: false
+        description: Number of top authors to return (default 10, at most 100)
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag from a previous response; answered with 304 if unchanged
+    responses:
+      200:
+        description: Catalogue statistics, recomputed only after a write
+        schema:
+          type: object
+          properties:
+            authors:
+              type: integer
+            books:
+              type: integer
+            books_per_year:
+              type: array
+              items:
+                type: object
+                properties:
+                  year:
+                    type: integer
+                  count:
+                    type: integer
+            undated:
+              type: integer
+              description: Books without a publish_date
+            top_authors:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: integer
+                  name:
+                    type: string
+                  book_count:
+                    type: integer
+      304:
+        description: Not modified since the ETag sent in If-None-Match
+    """
+    top = min(max(request.args.get('top', 10, type=int), 0), 100)
+    # Versions first: a current ETag is answered without loading the stats
+    versions = table_versions('author', 'book')
+    etag = make_etag('stats', *versions)
+    if is_not_modified(etag):
+        return not_modified(etag)
+    response = jsonify(catalog_stats(versions, top))
+    response.set_etag(etag)
+    return response
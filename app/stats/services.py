@@ -0,0 +1,78 @@
+"""
+Catalogue statistics backed by the denormalized ``Author.book_count``.
+
+Every book write adjusts the count of the affected authors in the same
+transaction (``adjust_book_counts``); ``refresh_book_counts`` recomputes
+it from the book table after loads that bypass the services. Per-year
+histograms come from one grouped query.
+"""
+from collections import Counter
+
+from flask import abort
+from sqlalchemy import bindparam, func, select
+
+from app.cache import cache
+from app.models import Author, Book, db
+
+author_table = Author.__table__
+
+
+def adjust_book_counts(author_ids, sign=1):
+    """Add ``sign`` to the book_count of each id in ``author_ids`` (repeats accumulate)."""
+    deltas = Counter(author_ids)
+    if not deltas:
+        return
+    stmt = (author_table.update()
+            .where(author_table.c.id == bindparam('author_id'))
+            # Keep updated_at: the author record itself did not change
+            .values(book_count=author_table.c.book_count + bindparam('delta'),
+                    updated_at=author_table.c.updated_at))
+    # Ascending id order, so concurrent writers lock author rows in the same order
+    db.session.execute(stmt, [{'author_id': id, 'delta': sign * delta} for id, delta in sorted(deltas.items())])
+
+
+def refresh_book_counts(author_ids=None):
+    """Recompute book_count from the book table, for ``author_ids`` or every author."""
+    count = (select(func.count()).where(Book.author_id == author_table.c.id)
+             .correlate(author_table).scalar_subquery())
+    stmt = author_table.update().values(book_count=count, updated_at=author_table.c.updated_at)
+    if author_ids is not None:
+        stmt = stmt.where(author_table.c.id.in_(author_ids))
+    db.session.execute(stmt)
+
+
+def books_per_year(*criteria):
+    """Books per publication year as [{year, count}] (ascending) plus the number without a date."""
+    year = func.extract('year', Book.publish_date)
+    rows = db.session.execute(select(year, func.count()).where(*criteria).group_by(year)).all()
+    histogram = [{'year': int(value), 'count': count}
+                 for value, count in sorted((value, count) for value, count in rows if value is not None)]
+    undated = sum(count for value, count in rows if value is None)
+    return histogram, undated
+
+
+def author_stats(id):
+    author = db.session.execute(
+        select(Author.id, Author.name, Author.book_count).where(Author.id == id)).first()
+    if author is None:
+        abort(404)
+    histogram, undated = books_per_year(Book.author_id == id)
+    return {'id': author.id, 'name': author.name, 'book_count': author.book_count,
+            'books_per_year': histogram, 'undated': undated}
+
+
+def catalog_stats(versions, top=10):
+    """
+    Totals, per-year histogram and the most prolific authors; cached under
+    ``versions`` (``table_versions('author', 'book')``) until the next write.
+    """
+    def load():
+        authors, books = db.session.execute(
+            select(func.count(), func.coalesce(func.sum(Author.book_count), 0)).select_from(Author)).one()
+        histogram, undated = books_per_year()
+        top_authors = db.session.execute(
+            select(Author.id, Author.name, Author.book_count)
+            .order_by(Author.book_count.desc(), Author.id.desc()).limit(top)).all()
+        return {'authors': authors, 'books': int(books), 'books_per_year': histogram, 'undated': undated,
+                'top_authors': [{'id': id, 'name': name, 'book_count': count} for id, name, count in top_authors]}
+    return cache.get_or_set('stats:catalog:{}:{}:{}'.format(top, *versions), load)
@@ -0,0 +1,44 @@
+from flask import Response, current_app, request, stream_with_context
+
+from app.pagination import decode_cursor
+from app.serializers import iter_rows
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_stream(args=None, accept_mimetypes=None):
+    """True when the client asked for NDJSON via ?stream=1 or the Accept header."""
+    args = request.args if args is None else args
+    accept_mimetypes = request.accept_mimetypes if accept_mimetypes is None else accept_mimetypes
+    if args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    best = accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def stream_ndjson(query, id_column, serialize):
+    """
+    Stream every row of ``query`` as newline-delimited JSON.
+
+    Rows are pulled with ``yield_per`` (a server-side cursor on PostgreSQL) as
+    compact rows when ``query`` selects columns (``iter_rows``) and written out
+    one batch per chunk, so memory stays flat whatever the table size. An ?after= cursor resumes an interrupted export.
+    """
+    batch_size = current_app.config['STREAM_BATCH_SIZE']
+    after = request.args.get('after')
+    if after:
+        query = query.filter(id_column > decode_cursor(after)['id'])
+    query = query.order_by(id_column)
+
+    def generate():
+        dumps = current_app.json.dumps
+        lines = []
+        for row in iter_rows(query, batch_size):
+            lines.append(dumps(serialize(row)))
+            if len(lines) >= batch_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
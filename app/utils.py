@@ -0,0 +1,126 @@
+import json
+from datetime import date
+
+from flask import abort, request
+from sqlalchemy import insert
+
+
+def parse_include(allowed, args=None):
+    """Parse ?include=a,b against an allow-list of expandable relations."""
+    raw = (request.args if args is None else args).get('include', '')
+    include = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = include - set(allowed)
+    if unknown:
+        abort(400, description='Unknown include: {}'.format(', '.join(sorted(unknown))))
+    return include
+
+
+def parse_date(value):
+    """Accept a date or an ISO-8601 string (YYYY-MM-DD); None passes through."""
+    if value is None or isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        raise ValueError('must be a date string (YYYY-MM-DD)')
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError('must be a date string (YYYY-MM-DD)')
+
+
+def read_bulk_payload():
+    """
+    Read a bulk request body: a JSON array, or NDJSON when the request is sent
+    as application/x-ndjson. Returns (items, errors); lines that are not valid
+    JSON are reported as per-item errors instead of failing the whole batch.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        items, errors = [], []
+        lines = request.get_data(as_text=True).splitlines()
+        for index, line in enumerate(line for line in lines if line.strip()):
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+                errors.append({'index': index, 'errors': {'_line': 'invalid JSON'}})
+        return items, errors
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        abort(400, description='Expected a JSON array or application/x-ndjson body')
+    return data, []
+
+
+def insert_returning_ids(session, model, rows):
+    """
+    Multi-row INSERT ... RETURNING id for ``rows``, ids in parameter order.
+
+    PostgreSQL batches the rows and sorts RETURNING with a sentinel. SQLite
+    would fall back to one statement per row for that, so there the ids are
+    sorted instead; a single writer assigns rowids in insertion order.
+    """
+    ordered = session.get_bind().dialect.name != 'sqlite'
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=ordered)
+    ids = session.scalars(stmt.execution_options(render_nulls=True), rows).all()
+    return ids if ordered else sorted(ids)
+
+
+def parse_fields(allowed, default, required=('id',), args=None):
+    """
+    Parse ?fields=a,b into a tuple of column names checked against
+    ``allowed``; ``required`` fields are always returned first.
+    """
+    raw = (request.args if args is None else args).get('fields')
+    if not raw:
+        return default
+    requested = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        abort(400, description='Unknown field: {}'.format(', '.join(unknown)))
+    fields = tuple(dict.fromkeys(list(required) + requested))
+    return default if fields == default else fields
+
+
+def parse_sort(allowed, default='id', args=None):
+    """Parse ?sort=field or ?sort=-field (descending); returns (field, descending)."""
+    raw = (request.args if args is None else args).get('sort', default).strip()
+    descending = raw.startswith('-')
+    field = raw.lstrip('-')
+    if field not in allowed:
+        abort(400, description='Cannot sort by: {}'.format(field))
+    return field, descending
+
+
+# Largest value of the Integer primary and foreign keys; bigger ones overflow in the driver
+MAX_ID = 2 ** 31 - 1
+
+
+def parse_ids(raw, limit):
+    """
+    Ids for a multi-get: a comma-separated string (?ids=1,2,3) or a JSON
+    array. Order and duplicates are kept; at most ``limit`` ids.
+    """
+    values = raw.split(',') if isinstance(raw, str) else raw
+    if not isinstance(values, list) or not values:
+        abort(400, description='ids must be a non-empty list of integers')
+    ids = []
+    for value in values:
+        # isdigit() alone also accepts characters such as '²' that int() rejects
+        if isinstance(value, str) and value.strip().isascii() and value.strip().isdigit():
+            value = int(value)
+        if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= MAX_ID:
+            abort(400, description='Invalid id: {}'.format(value))
+        ids.append(value)
+    if len(ids) > limit:
+        abort(400, description='At most {} ids per request'.format(limit))
+    return ids
+
+
+def chunked(values, size):
+    """Split ``values`` into lists of at most ``size`` items (bounded IN lists)."""
+    values = list(values)
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+
+def ordered_results(ids, found):
+    """Records in request order; ids without a record get an explicit not-found marker."""
+    return [found[id] if id in found else {'id': id, 'found': False} for id in ids]
+
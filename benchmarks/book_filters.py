@@ -0,0 +1,105 @@
+"""
+Check that filtered / sorted GET /books/ queries are served by indexes.
+
+    python -m benchmarks.book_filters --rows 1000000
+    python -m benchmarks.book_filters --database-url postgresql://... --rows 1000000
+
+Seeds ``--rows`` books (skipped when the table is already that large), runs
+each scenario through the real route, captures the SQL it issued and prints
+its plan (EXPLAIN ANALYZE on PostgreSQL, EXPLAIN QUERY PLAN on SQLite) with
+the median request latency. Exits non-zero if a scenario needs a full scan
+or sorts its matching rows, which makes deep pages cost as much as the filter
+matches.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+SCENARIOS = [
+    '/books/?author_id=42',
+    '/books/?author_id=42&sort=-publish_date',
+    '/books/?published_after=1990-01-01&published_before=1990-12-31&sort=publish_date',
+    '/books/?sort=title&fields=id,title',
+    '/books/?title_prefix=Book%2012345',
+    '/books/?title_prefix=Book',  # matches every row: must still stop after one page
+    '/books/?author_id=42&published_after=1980-01-01',
+]
+
+
+def seed(db, Author, Book, rows, batch=50000):
+    from sqlalchemy import func, insert
+    existing = db.session.scalar(db.select(func.count()).select_from(Book))
+    if existing >= rows:
+        return
+    authors = max(rows // 100, 1)
+    db.session.execute(insert(Author), [{'name': 'Author {}'.format(i)} for i in range(authors)])
+    first_author = db.session.scalar(db.select(func.min(Author.id)))
+    start = date(1900, 1, 1)
+    for offset in range(existing, rows, batch):
+        db.session.execute(insert(Book), [
+            {'title': 'Book {}'.format(i), 'publish_date': start + timedelta(days=(i * 7919) % 45000),
+             'author_id': first_author + i % authors}
+            for i in range(offset, min(offset + batch, rows))
+        ])
+        db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', default='sqlite:////tmp/library_bench.db')
+    args = parser.parse_args()
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from sqlalchemy import event
+    from app import create_app, db
+    from app.models import Author, Book
+
+    app = create_app()
+    app.config['CACHE_TYPE'] = 'null'
+    client = app.test_client()
+    failures = 0
+    with app.app_context():
+        db.create_all()
+        seed(db, Author, Book, args.rows)
+        engine = db.engine
+        dialect = engine.dialect.name
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if 'FROM book' in statement:
+                captured.append((statement, parameters))
+
+        event.listen(engine, 'before_cursor_execute', capture)
+        for url in SCENARIOS:
+            timings = []
+            for _ in range(args.repeat):
+                captured.clear()
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - start)
+                assert response.status_code == 200, (url, response.status_code)
+            statement, parameters = captured[-1]
+            prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if dialect == 'postgresql' else 'EXPLAIN QUERY PLAN '
+            with engine.connect() as conn:
+                plan = [' '.join(str(col) for col in row) for row in conn.exec_driver_sql(prefix + statement, parameters)]
+            text = '\n'.join(plan)
+            full_scan = ('Seq Scan on book' in text) if dialect == 'postgresql' else ('SCAN book' in text and 'INDEX' not in text)
+            sorted_ = ('Sort Key' in text) if dialect == 'postgresql' else ('TEMP B-TREE FOR ORDER BY' in text)
+            failures += full_scan or sorted_
+            print('{}  median {:.1f} ms{}{}'.format(url, statistics.median(timings) * 1000,
+                                                   '  FULL SCAN' if full_scan else '', '  SORT' if sorted_ else ''))
+            for line in plan:
+                print('    ' + line)
+        event.remove(engine, 'before_cursor_execute', capture)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Generate a benchmark-sized library: 10k, 1M or 10M books.
+
+    python -m benchmarks.datagen --scale 1m
+    python -m benchmarks.datagen --scale 10m --database-url postgresql://...
+
+Authors and books are written with multi-row INSERTs in batches of
+``--batch`` rows (one commit per batch), from a fixed random seed so every
+run produces the same catalogue. There is one author per ``--books-per-author``
+books, ids are contiguous from 1. The table versions used for ETags are
+bumped, Author.book_count recomputed and the planner statistics refreshed
+at the end. A database that already holds at least that many books is left
+untouched unless --reset.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+SCALES = {'10k': 10000, '100k': 100000, '1m': 1000000, '10m': 10000000}
+
+WORDS = ('shadow', 'river', 'empire', 'garden', 'winter', 'secret', 'stone', 'city', 'light', 'storm', 'house',
+         'night', 'glass', 'fire', 'ocean', 'crown', 'silent', 'last', 'lost', 'golden', 'iron', 'wild', 'dark',
+         'song', 'road', 'star', 'history', 'memory', 'journey', 'kingdom', 'machine', 'mountain', 'island')
+FIRST_NAMES = ('Ada', 'Alan', 'Grace', 'Jane', 'Mary', 'George', 'Virginia', 'Leo', 'Toni', 'Ursula', 'Italo',
+               'Chinua', 'Haruki', 'Isabel', 'Jorge', 'Doris', 'Gabriel', 'Zadie', 'Kazuo', 'Octavia')
+LAST_NAMES = ('Austen', 'Orwell', 'Woolf', 'Tolstoy', 'Morrison', 'Le Guin', 'Calvino', 'Achebe', 'Murakami',
+              'Allende', 'Borges', 'Lessing', 'Marquez', 'Smith', 'Ishiguro', 'Butler', 'Eco', 'Atwood')
+
+
+def phrase(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def author_rows(rng, start, stop):
+    epoch = date(1850, 1, 1)
+    return [{'id': i, 'name': '{} {} {}'.format(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), i),
+             'bio': 'Writes about {}.'.format(phrase(rng, 6)),
+             'birth_date': epoch + timedelta(days=rng.randrange(55000))}
+            for i in range(start, stop)]
+
+
+def book_rows(rng, start, stop, authors):
+    epoch = date(1900, 1, 1)
+    return [{'id': i, 'title': '{} {}'.format(phrase(rng, rng.randint(1, 4)).title(), i),
+             'description': phrase(rng, rng.randint(10, 40)).capitalize() + '.',
+             'publish_date': epoch + timedelta(days=rng.randrange(45000)),
+             'author_id': rng.randint(1, authors)}
+            for i in range(start, stop)]
+
+
+def insert_batches(db, model, rows_for, total, batch):
+    from sqlalchemy import insert
+    for offset in range(1, total + 1, batch):
+        db.session.execute(insert(model), rows_for(offset, min(offset + batch, total + 1)))
+        db.session.commit()
+
+
+def generate(db, books, books_per_author=20, batch=10000, seed=42, reset=False):
+    """Fill the current app's database with ``books`` books; returns False if it was already populated."""
+    from sqlalchemy import func
+    from app.conditional import bump_versions
+    from app.models import Author, Book
+    from app.stats.services import refresh_book_counts
+    if reset:
+        db.session.execute(db.delete(Book))
+        db.session.execute(db.delete(Author))
+        db.session.commit()
+    elif (db.session.scalar(db.select(func.count()).select_from(Book)) or 0) >= books:
+        return False
+    elif db.session.scalar(db.select(func.count()).select_from(Author)):
+        raise RuntimeError('The database already holds data; pass --reset to replace it')
+    rng = random.Random(seed)
+    authors = max(books // books_per_author, 1)
+    insert_batches(db, Author, lambda start, stop: author_rows(rng, start, stop), authors, batch)
+    insert_batches(db, Book, lambda start, stop: book_rows(rng, start, stop, authors), books, batch)
+    if db.engine.dialect.name == 'postgresql':
+        # Explicit ids leave the sequences behind; later inserts would collide
+        for table in ('author', 'book'):
+            db.session.execute(db.text("SELECT setval(pg_get_serial_sequence('{0}', 'id'), "
+                                       "(SELECT max(id) FROM {0}))".format(table)))
+    refresh_book_counts()
+    bump_versions('author', 'book')
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='10k')
+    parser.add_argument('--books-per-author', type=int, default=20)
+    parser.add_argument('--batch', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='Delete existing authors and books first')
+    parser.add_argument('--database-url', default='sqlite:////tmp/library_bench.db')
+    args = parser.parse_args(argv)
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('SLOW_QUERY_THRESHOLD_MS', '0')  # every batch insert would be logged
+
+    from app import create_app, db
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        books = SCALES[args.scale]
+        if generate(db, books, args.books_per_author, args.batch, args.seed, args.reset):
+            elapsed = time.perf_counter() - start
+            print('{} books, {} authors in {:.1f}s ({:.0f} rows/s)'.format(
+                books, max(books // args.books_per_author, 1), elapsed,
+                books * (1 + 1 / args.books_per_author) / elapsed))
+        else:
+            print('Database already holds {} books or more; nothing to do'.format(books))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Headless Locust run of benchmarks/scenarios.py with JSON results and thresholds.
+
+    python -m benchmarks.load --output results.json
+    python -m benchmarks.load --scenario read --users 500 --run-time 2m --baseline baseline.json
+    python -m benchmarks.load --host http://staging:8000 --database-url postgresql://... --max-p99-ms 500
+
+Unless --host is given, the app is started with ``python -m app.serve`` on
+--database-url (generate it first with benchmarks.datagen). The highest
+author and book ids are read from that database and passed to the scenarios.
+
+Per request name (and the aggregate) the results file holds the request and
+failure counts, req/s and the p50/p95/p99/max latencies in ms. Exits
+non-zero when the failure ratio or p99 exceeds --max-failure-ratio /
+--max-p99-ms, or when compared with --baseline a p50/p99 grew or req/s
+dropped by more than --tolerance.
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.serving import ROOT, free_port, wait_until_up
+
+SCENARIOS = {'mixed': ['Reader', 'Writer'], 'read': ['Reader'], 'write': ['Writer']}
+LOCUSTFILE = os.path.join(ROOT, 'benchmarks', 'scenarios.py')
+
+
+def catalogue_size(database_url):
+    from sqlalchemy import create_engine, text
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        authors = conn.execute(text('SELECT max(id) FROM author')).scalar() or 0
+        books = conn.execute(text('SELECT max(id) FROM book')).scalar() or 0
+    engine.dispose()
+    if not books:
+        raise SystemExit('No books in {}; run python -m benchmarks.datagen first'.format(database_url))
+    return authors, books
+
+
+def read_stats(csv_prefix):
+    results = {}
+    with open(csv_prefix + '_stats.csv', newline='') as handle:
+        for row in csv.DictReader(handle):
+            name = row['Name'] if row['Name'] == 'Aggregated' else '{} {}'.format(row['Type'], row['Name'])
+            requests = int(row['Request Count'])
+            results[name] = {
+                'requests': requests,
+                'failures': int(row['Failure Count']),
+                'rps': round(float(row['Requests/s']), 2),
+                'p50': float(row['50%']),
+                'p95': float(row['95%']),
+                'p99': float(row['99%']),
+                'max': round(float(row['Max Response Time']), 1),
+            }
+    return results
+
+
+def check(results, args, baseline=None):
+    """Return a list of threshold violations."""
+    problems = []
+    total = results['Aggregated']
+    if total['requests'] and total['failures'] / total['requests'] > args.max_failure_ratio:
+        problems.append('failure ratio {:.2%} > {:.2%}'.format(total['failures'] / total['requests'],
+                                                               args.max_failure_ratio))
+    if args.max_p99_ms and total['p99'] > args.max_p99_ms:
+        problems.append('p99 {:.0f} ms > {:.0f} ms'.format(total['p99'], args.max_p99_ms))
+    for name, stats in (baseline or {}).get('endpoints', {}).items():
+        current = results.get(name)
+        if current is None or not stats['requests']:
+            continue
+        for metric in ('p50', 'p99'):
+            if current[metric] > stats[metric] * (1 + args.tolerance):
+                problems.append('{}: {} {:.0f} ms (baseline {:.0f} ms)'.format(name, metric, current[metric],
+                                                                              stats[metric]))
+        if current['rps'] < stats['rps'] * (1 - args.tolerance):
+            problems.append('{}: {:.1f} req/s (baseline {:.1f})'.format(name, current['rps'], stats['rps']))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--spawn-rate', type=int, default=20)
+    parser.add_argument('--run-time', default='60s')
+    parser.add_argument('--host', help='Benchmark a running server instead of starting one')
+    parser.add_argument('--workers', default='2', help='Worker processes when starting the server')
+    parser.add_argument('--database-url', default='sqlite:////tmp/library_bench.db')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='Results file of a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed regression against the baseline')
+    parser.add_argument('--max-p99-ms', type=float, default=0, help='Fail if the aggregate p99 is higher (0: off)')
+    parser.add_argument('--max-failure-ratio', type=float, default=0.01)
+    args = parser.parse_args()
+
+    authors, books = catalogue_size(args.database_url)
+    server = None
+    host = args.host
+    if host is None:
+        port = free_port()
+        env = dict(os.environ, DATABASE_URL=args.database_url)
+        server = subprocess.Popen([sys.executable, '-m', 'app.serve', '--bind', '127.0.0.1:{}'.format(port),
+                                   '--workers', args.workers], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        host = 'http://127.0.0.1:{}'.format(port)
+    try:
+        wait_until_up(host)
+        csv_prefix = os.path.join(tempfile.mkdtemp(), args.scenario)
+        env = dict(os.environ, BENCH_AUTHORS=str(authors), BENCH_BOOKS=str(books))
+        subprocess.run(['locust', '-f', LOCUSTFILE, *SCENARIOS[args.scenario], '--headless', '--only-summary',
+                        '-u', str(args.users), '-r', str(args.spawn_rate), '--run-time', args.run_time,
+                        '--host', host, '--csv', csv_prefix], cwd=ROOT, env=env,  # exits 1 on any failure
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        results = read_stats(csv_prefix)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+    report = {
+        'scenario': args.scenario,
+        'users': args.users,
+        'run_time': args.run_time,
+        'catalogue': {'authors': authors, 'books': books},
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'aggregated': results.pop('Aggregated'),
+        'endpoints': results,
+    }
+    with open(args.output, 'w') as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+
+    print('{:<48} {:>8} {:>8} {:>8} {:>8} {:>8}'.format('request', 'count', 'fail', 'req/s', 'p50', 'p99'))
+    for name, stats in sorted(results.items()) + [('Aggregated', report['aggregated'])]:
+        print('{:<48} {:>8} {:>8} {:>8.1f} {:>8.0f} {:>8.0f}'.format(
+            name[:48], stats['requests'], stats['failures'], stats['rps'], stats['p50'], stats['p99']))
+    problems = check(dict(results, Aggregated=report['aggregated']), args, baseline)
+    for problem in problems:
+        print('FAIL ' + problem)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
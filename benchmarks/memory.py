@@ -0,0 +1,99 @@
+"""
+Memory benchmark for the read-only book list and export paths.
+
+    python -m benchmarks.memory --rows 1000000
+    python -m benchmarks.memory --database-url postgresql://... --rows 1000000 --reset
+
+orm:     Book.query.all(), one ORM instance per row
+rows:    books_query().all(), SQLAlchemy Row objects through the ORM Query
+compact: fetch_rows(books_query()), namedtuples from Core execution (list pages)
+stream:  iter_rows(books_query(), STREAM_BATCH_SIZE), rows dropped as they go (NDJSON)
+export:  export_books(..., 'ndjson') to a temporary file (flask catalog export)
+
+Each path runs under tracemalloc; "held" is what the materialized result
+keeps alive, "peak" the high-water mark while producing it. By default a
+throwaway SQLite file is seeded with benchmarks.datagen. A --database-url
+that already holds fewer than ``--rows`` books is left untouched unless
+--reset is passed, which deletes its authors and books first.
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, held, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--database-url')
+    parser.add_argument('--reset', action='store_true', help='Delete existing authors and books before seeding')
+    parser.add_argument('--skip', action='append', default=[], help='path to leave out (repeatable), e.g. --skip orm')
+    args = parser.parse_args(argv)
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///{}'.format(
+        os.path.join(tempfile.gettempdir(), 'library_memory_{}.db'.format(args.rows)))
+    os.environ.setdefault('SLOW_QUERY_THRESHOLD_MS', '0')
+
+    from app import create_app, db
+    from app.books.services import books_query
+    from app.catalog.exporter import export_books
+    from app.models import Book
+    from app.serializers import fetch_rows, iter_rows
+    from benchmarks.datagen import generate
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Book.id).count() < args.rows:
+            try:
+                # The throwaway file is ours to refill; anything else only with --reset
+                generate(db, args.rows, reset=args.reset or args.database_url is None)
+            except RuntimeError as error:
+                parser.error('{} (holds fewer than --rows books)'.format(error))
+        db.session.commit()
+        batch_size = app.config['STREAM_BATCH_SIZE']
+
+        def stream():
+            count = 0
+            for _ in iter_rows(books_query().order_by(Book.id), batch_size):
+                count += 1
+            return count
+
+        def export():
+            with tempfile.TemporaryDirectory() as directory:
+                return export_books(os.path.join(directory, 'books.ndjson'), 'ndjson', engine=db.engine)[0]
+
+        paths = [
+            ('orm', lambda: Book.query.all()),
+            ('rows', lambda: books_query().all()),
+            ('compact', lambda: fetch_rows(books_query())),
+            ('stream', stream),
+            ('export', export),
+        ]
+        print('rows: {}  database: {}'.format(args.rows, db.engine.url.render_as_string(hide_password=True)))
+        print('{:<8} {:>10} {:>10} {:>12} {:>12}'.format('path', 'rows', 'seconds', 'held (MB)', 'peak (MB)'))
+        for name, fn in paths:
+            if name in args.skip:
+                continue
+            result, elapsed, held, peak = measure(fn)
+            count = result if isinstance(result, int) else len(result)
+            print('{:<8} {:>10} {:>10.2f} {:>12.1f} {:>12.1f}'.format(name, count, elapsed, held / 1e6, peak / 1e6))
+            del result
+            db.session.expunge_all()
+            db.session.rollback()
+
+
+if __name__ == '__main__':
+    main()
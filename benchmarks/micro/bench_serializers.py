@@ -0,0 +1,33 @@
+import pytest
+
+from app.authors.services import author_to_dict, authors_query
+from app.books.services import books_query
+from app.pagination import decode_cursor, encode_cursor
+from app.serializers import BOOK_FIELDS, serialize_rows
+
+
+@pytest.fixture(scope='module')
+def book_rows(app):
+    return books_query().limit(1000).all()
+
+
+def test_serialize_rows(benchmark, book_rows):
+    result = benchmark(serialize_rows, book_rows, BOOK_FIELDS)
+    assert len(result) == 1000
+
+
+def test_author_to_dict_with_books(benchmark, app):
+    authors = authors_query(include={'books'}).limit(100).all()
+    result = benchmark(lambda: [author_to_dict(author, {'books'}) for author in authors])
+    assert 'books' in result[0]
+
+
+def test_json_encode_page(benchmark, app, book_rows):
+    """The configured JSON provider (orjson when installed) on a 1000-book page."""
+    page = serialize_rows(book_rows, BOOK_FIELDS)
+    assert benchmark(app.json.dumps, page).startswith('[')
+
+
+def test_cursor_round_trip(benchmark, app):
+    with app.test_request_context():
+        assert benchmark(lambda: decode_cursor(encode_cursor({'id': 123456, 'k': '2001-01-01'})))['id'] == 123456
@@ -0,0 +1,34 @@
+from werkzeug.datastructures import MultiDict
+
+from app.authors.services import get_authors_byid, get_books_by_author_id
+from app.books.services import books_query, filter_books, get_book_by_id
+from app.pagination import paginate
+from app.search.services import search
+
+
+def test_get_book_by_id(benchmark, app):
+    assert benchmark(get_book_by_id, 42)['id'] == 42
+
+
+def test_get_author_by_id_with_books(benchmark, app):
+    assert 'books' in benchmark(get_authors_byid, 7, {'books'})
+
+
+def test_get_books_by_author_id(benchmark, app):
+    assert benchmark(get_books_by_author_id, 7)
+
+
+def test_filter_books_by_author(benchmark, app):
+    args = MultiDict({'author_id': '7', 'sort': '-publish_date'})
+    assert benchmark(lambda: filter_books(books_query(), args).all())
+
+
+def test_paginate_books_by_title(benchmark, app):
+    from app.models import Book
+    with app.test_request_context('/books/?sort=title&limit=100'):
+        rows, cursor = benchmark(paginate, books_query(), Book.id, Book.title)
+    assert len(rows) == 100 and cursor
+
+
+def test_search(benchmark, app):
+    assert benchmark(search, 'shadow river', ('book', 'author'), 20, 0)
@@ -0,0 +1,35 @@
+"""
+Fixtures for the pytest-benchmark microbenchmarks.
+
+    pip install pytest-benchmark
+    python -m pytest benchmarks/micro/bench_*.py --benchmark-json=micro.json
+    python -m pytest benchmarks/micro/bench_*.py --benchmark-autosave --benchmark-compare --benchmark-compare-fail=median:10%
+
+The files are named bench_*.py so the regular test run does not collect
+them; list them explicitly as above. The app uses TestingConfig (in-memory
+SQLite unless TEST_DATABASE_URL is set) with the response cache off, seeded
+by benchmarks.datagen.
+"""
+import pytest
+
+from app import create_app, db
+from benchmarks.datagen import generate
+from config import TestingConfig
+
+BOOKS = 10000
+
+
+class BenchmarkConfig(TestingConfig):
+    CACHE_TYPE = 'null'
+    INSTRUMENTATION_ENABLED = False
+    SLOW_QUERY_THRESHOLD_MS = 0
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        generate(db, BOOKS)
+        yield app
+        db.drop_all()
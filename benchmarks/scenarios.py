@@ -0,0 +1,180 @@
+"""
+Locust scenarios covering every route with realistic read/write mixes.
+
+    locust -f benchmarks/scenarios.py --headless -u 200 -r 20 --run-time 2m --host http://127.0.0.1:8000
+    locust -f benchmarks/scenarios.py Reader --headless ...     # read-only traffic
+
+Run through ``python -m benchmarks.load`` to get JSON results and pass/fail
+thresholds. Ids are drawn from the catalogue generated by benchmarks.datagen;
+BENCH_AUTHORS and BENCH_BOOKS give the highest ids (benchmarks.load sets
+them from the database). Reads of rows another user deleted count as
+successes, every other non-2xx/304 answer as a failure.
+
+Reader (weight 8) browses: pages of authors and books with filters, sorts,
+sparse fieldsets and cursors, single records with and without expansions,
+ETag revalidation, NDJSON streams and search. Writer (weight 2) creates,
+updates and deletes its own authors and books, singly and in bulk; its books
+go to generated authors so deleting its own authors never orphans them.
+Its creates carry an Idempotency-Key and are retried once with the same key
+when the answer is lost or a server error.
+"""
+import os
+import random
+import uuid
+
+from locust import HttpUser, between, task
+
+AUTHORS = int(os.getenv('BENCH_AUTHORS', 500))
+BOOKS = int(os.getenv('BENCH_BOOKS', 10000))
+SEARCH_TERMS = ('shadow', 'river empire', 'winter garden', 'secret', 'golden crown', 'storm')
+BOOK_FILTERS = (
+    'author_id={author}',
+    'author_id={author}&sort=-publish_date',
+    'published_after={year}-01-01&published_before={year}-12-31&sort=publish_date',
+    'sort=title&fields=id,title',
+    'title_prefix=Shadow',
+    'sort=-id&limit=20',
+)
+
+
+def random_author():
+    return random.randint(1, AUTHORS)
+
+
+def random_book():
+    return random.randint(1, BOOKS)
+
+
+class LibraryUser(HttpUser):
+    abstract = True
+    wait_time = between(0.5, 2)
+
+    def read(self, url, name, **kwargs):
+        """GET that treats 404 (deleted by a Writer) and 304 as success."""
+        with self.client.get(url, name=name, catch_response=True, **kwargs) as response:
+            if response.status_code in (304, 404):
+                response.success()
+            return response
+
+
+class Reader(LibraryUser):
+    weight = 8
+
+    def on_start(self):
+        self.etags = {}
+
+    @task(6)
+    def list_books(self):
+        query = random.choice(BOOK_FILTERS).format(author=random_author(), year=random.randint(1900, 2020))
+        response = self.read('/books/?' + query, '/books/?[filter]')
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor and random.random() < 0.3:
+            self.read('/books/?{}&after={}'.format(query, cursor), '/books/?[filter]&after=')
+
+    @task(6)
+    def get_book(self):
+        self.read('/books/{}'.format(random_book()), '/books/[id]')
+
+    @task(3)
+    def list_authors(self):
+        response = self.read('/authors/?limit=50', '/authors/')
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor:
+            self.read('/authors/?limit=50&after=' + cursor, '/authors/?after=')
+
+    @task(1)
+    def list_authors_with_books(self):
+        self.read('/authors/?limit=20&include=books', '/authors/?include=books')
+
+    @task(5)
+    def get_author(self):
+        self.read('/authors/{}'.format(random_author()), '/authors/[id]')
+
+    @task(2)
+    def get_author_with_books(self):
+        self.read('/authors/{}?include=books'.format(random_author()), '/authors/[id]?include=books')
+
+    @task(4)
+    def get_books_by_author(self):
+        self.read('/authors/{}/books'.format(random_author()), '/authors/[id]/books')
+
+    @task(3)
+    def revalidate_book(self):
+        """Conditional GET with the ETag from an earlier read of the same book."""
+        id = random.randint(1, min(BOOKS, 100))
+        headers = {'If-None-Match': self.etags[id]} if id in self.etags else {}
+        response = self.read('/books/{}'.format(id), '/books/[id] (If-None-Match)', headers=headers)
+        if response.headers.get('ETag'):
+            self.etags[id] = response.headers['ETag']
+
+    @task(1)
+    def stream_books(self):
+        self.read('/books/?author_id={}'.format(random_author()), '/books/?author_id= (ndjson)',
+                  headers={'Accept': 'application/x-ndjson'})
+
+    @task(3)
+    def search(self):
+        self.read('/search?q={}'.format(random.choice(SEARCH_TERMS)), '/search')
+
+
+class Writer(LibraryUser):
+    weight = 2
+
+    def on_start(self):
+        self.authors = []
+        self.books = []
+
+    def create(self, url, payload):
+        headers = {'Idempotency-Key': str(uuid.uuid4())}
+        response = self.client.post(url, name=url, json=payload, headers=headers)
+        if response.status_code == 0 or response.status_code >= 500:
+            response = self.client.post(url, name=url, json=payload, headers=headers)
+        return response
+
+    @task(3)
+    def create_author(self):
+        response = self.create('/authors/', {
+            'name': 'Bench Author', 'bio': 'Created by the benchmark', 'birth_date': '1970-01-01'})
+        if response.status_code == 201:
+            self.authors.append(response.json()['id'])
+
+    @task(2)
+    def update_author(self):
+        if self.authors:
+            self.client.put('/authors/{}'.format(random.choice(self.authors)), name='/authors/[id]',
+                            json={'name': 'Bench Author (edited)', 'bio': 'Updated', 'birth_date': '1971-01-01'})
+
+    @task(5)
+    def create_book(self):
+        response = self.create('/books/', {
+            'title': 'Bench Book', 'description': 'Created by the benchmark', 'publish_date': '2000-01-01',
+            'author_id': random_author()})
+        if response.status_code == 201:
+            self.books.append(response.json()['id'])
+
+    @task(3)
+    def update_book(self):
+        if self.books:
+            self.client.put('/books/{}'.format(random.choice(self.books)), name='/books/[id]', json={
+                'title': 'Bench Book (edited)', 'description': 'Updated', 'publish_date': '2001-01-01',
+                'author_id': random_author()})
+
+    @task(2)
+    def delete_book(self):
+        if self.books:
+            self.client.delete('/books/{}'.format(self.books.pop()), name='/books/[id]')
+
+    @task(1)
+    def delete_author(self):
+        if self.authors:
+            self.client.delete('/authors/{}'.format(self.authors.pop()), name='/authors/[id]')
+
+    @task(1)
+    def create_books_bulk(self):
+        self.client.post('/books/bulk', name='/books/bulk', json=[
+            {'title': 'Bulk Book {}'.format(i), 'author_id': random_author()} for i in range(50)])
+
+    @task(1)
+    def create_authors_bulk(self):
+        self.client.post('/authors/bulk', name='/authors/bulk', json=[
+            {'name': 'Bulk Author {}'.format(i)} for i in range(20)])
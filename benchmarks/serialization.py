@@ -0,0 +1,79 @@
+"""
+Microbenchmark for the GET /books/ serialization path.
+
+    python -m benchmarks.serialization --rows 100000 --repeat 5
+
+legacy: Book.query.all() -> dict per ORM instance -> stdlib json (Flask default)
+fast:   with_entities column tuples -> dict(zip) -> app JSON provider
+        (orjson when installed)
+
+Each stage (fetch + build dicts, encode) is timed separately; the best of
+``--repeat`` runs is reported. Uses a throwaway in-memory SQLite database
+unless --database-url points somewhere else.
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', default='sqlite://')
+    args = parser.parse_args()
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.books.services import books_query
+    from app.models import Author, Book
+    from app.serializers import BOOK_FIELDS, serialize_rows
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        author_id = db.session.execute(insert(Author).returning(Author.id), {'name': 'Benchmark'}).scalar_one()
+        start = date(1900, 1, 1)
+        db.session.execute(insert(Book), [
+            {'title': 'Book {}'.format(i), 'description': 'Description of book {}'.format(i) * 4,
+             'publish_date': start + timedelta(days=i % 40000), 'author_id': author_id}
+            for i in range(args.rows)
+        ])
+        db.session.commit()
+
+        stdlib = DefaultJSONProvider(app)
+
+        def legacy_fetch():
+            db.session.expunge_all()
+            return [{'id': book.id, 'title': book.title, 'description': book.description,
+                     'publish_date': book.publish_date, 'author_id': book.author_id,
+                     'updated_at': book.updated_at} for book in Book.query.all()]
+
+        def fast_fetch():
+            return serialize_rows(books_query().all(), BOOK_FIELDS)
+
+        legacy_fetch_s, legacy_rows = best_of(args.repeat, legacy_fetch)
+        legacy_encode_s, _ = best_of(args.repeat, lambda: stdlib.dumps(legacy_rows, separators=(',', ':')))
+        fast_fetch_s, fast_rows = best_of(args.repeat, fast_fetch)
+        fast_encode_s, _ = best_of(args.repeat, lambda: app.json.dumps(fast_rows))
+
+    print('rows: {}  json backend: {}'.format(args.rows, type(app.json).__name__))
+    print('{:<8} {:>12} {:>12} {:>12}'.format('path', 'fetch (ms)', 'encode (ms)', 'total (ms)'))
+    for name, fetch_s, encode_s in (('legacy', legacy_fetch_s, legacy_encode_s), ('fast', fast_fetch_s, fast_encode_s)):
+        print('{:<8} {:>12.1f} {:>12.1f} {:>12.1f}'.format(name, fetch_s * 1000, encode_s * 1000, (fetch_s + encode_s) * 1000))
+
+
+if __name__ == '__main__':
+    main()
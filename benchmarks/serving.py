@@ -0,0 +1,120 @@
+"""
+Side-by-side Locust run of the serving modes: the dev server (run.py),
+gunicorn (python -m app.serve) and ASGI (asgi.py).
+
+    python -m benchmarks.serving --users 500 --run-time 60s
+    python -m benchmarks.serving --modes gunicorn --workers 1,2,4,8 --users 1000
+    python -m benchmarks.serving --database-url postgresql://... --workers 4
+
+Starts each server in turn on the same database (gunicorn and ASGI once per
+worker count), drives it with locustFile/locustfile.py in headless mode and
+prints throughput, median and p99 latency and the failure count of each
+from Locust's CSV stats.
+"""
+import argparse
+import csv
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCUSTFILE = os.path.join(ROOT, 'locustFile', 'locustfile.py')
+
+SERVERS = {
+    'wsgi': ['{python}', '-m', 'flask', '--app', 'run', 'run', '--port', '{port}', '--with-threads'],
+    'gunicorn': ['{python}', '-m', 'app.serve', '--bind', '127.0.0.1:{port}', '--workers', '{workers}',
+                 '--threads', '{threads}'],
+    'asgi': ['{python}', '-m', 'uvicorn', 'asgi:app', '--port', '{port}', '--workers', '{workers}',
+             '--log-level', 'warning'],
+}
+
+
+def seed(database_url, books=1000):
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app, db
+    from app.conditional import bump_versions
+    from app.models import Author, Book
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if db.session.get(Author, 1) is None:
+            db.session.add(Author(id=1, name='Author 1'))
+            db.session.flush()
+            db.session.add_all(Book(title='Book {}'.format(i), author_id=1) for i in range(books))
+            bump_versions('author', 'book')
+            db.session.commit()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/books/?limit=1', timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('Server at {} did not start'.format(url))
+
+
+def aggregated_stats(csv_prefix):
+    with open(csv_prefix + '_stats.csv', newline='') as handle:
+        for row in csv.DictReader(handle):
+            if row['Name'] == 'Aggregated':
+                return row
+    raise RuntimeError('No aggregated row in Locust stats')
+
+
+def run(mode, workers, args):
+    port = free_port()
+    command = [part.format(python=sys.executable, port=port, workers=workers, threads=args.threads)
+               for part in SERVERS[mode]]
+    env = dict(os.environ, DATABASE_URL=args.database_url, FLASK_ENV='production')
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        host = 'http://127.0.0.1:{}'.format(port)
+        wait_until_up(host)
+        csv_prefix = os.path.join(tempfile.mkdtemp(), mode)
+        subprocess.run(['locust', '-f', LOCUSTFILE, '--headless', '--only-summary', '-u', str(args.users),
+                        '-r', str(args.spawn_rate), '--run-time', args.run_time, '--host', host,
+                        '--csv', csv_prefix], cwd=ROOT,  # exits 1 when any request failed
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return aggregated_stats(csv_prefix)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--spawn-rate', type=int, default=50)
+    parser.add_argument('--run-time', default='60s')
+    parser.add_argument('--workers', default='1', help='Comma-separated worker process counts (gunicorn, asgi)')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker')
+    parser.add_argument('--modes', default='wsgi,gunicorn,asgi')
+    parser.add_argument('--database-url', default='sqlite:////tmp/library_serving.db')
+    args = parser.parse_args()
+    seed(args.database_url)
+
+    print('{:<9} {:>8} {:>10} {:>12} {:>10} {:>10}'.format('mode', 'workers', 'req/s', 'median ms', 'p99 ms', 'failures'))
+    for mode in args.modes.split(','):
+        # The dev server is a single process whatever --workers says
+        for workers in ['1'] if mode == 'wsgi' else args.workers.split(','):
+            stats = run(mode, workers, args)
+            print('{:<9} {:>8} {:>10.1f} {:>12} {:>10} {:>10}'.format(
+                mode, workers, float(stats['Requests/s']), stats['Median Response Time'], stats['99%'],
+                stats['Failure Count']))
+
+
+if __name__ == '__main__':
+    main()
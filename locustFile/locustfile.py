@@ -1,3 +1,5 @@
+import uuid
+
 from locust import HttpUser, TaskSet, task, between
 
 class AuthorTasks(TaskSet):
@@ -8,8 +10,8 @@ class AuthorTasks(TaskSet):
 
     @task(2)
     def create_author(self):
-        """Simulate creating a new author."""
-        self.client.post("/authors/", json={
+        """Simulate creating a new author (one Idempotency-Key per logical create)."""
+        self.client.post("/authors/", headers={"Idempotency-Key": str(uuid.uuid4())}, json={
             "name": "Test Author",
             "bio": "This is a test author",
             "birth_date": "1980-01-01"
@@ -22,8 +24,8 @@ class AuthorTasks(TaskSet):
 
     @task(2)
     def create_book(self):
-        """Simulate creating a new book."""
-        self.client.post("/books/", json={
+        """Simulate creating a new book (one Idempotency-Key per logical create)."""
+        self.client.post("/books/", headers={"Idempotency-Key": str(uuid.uuid4())}, json={
             "title": "Test Book",
             "description": "This is a test book",
             "publish_date": "2000-01-01",
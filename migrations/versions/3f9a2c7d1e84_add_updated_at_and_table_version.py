@@ -0,0 +1,39 @@
+"""Add updated_at columns and table_version counters
+
+Revision ID: 3f9a2c7d1e84
+Revises: 01790fcadaa5
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a2c7d1e84'
+down_revision = '01790fcadaa5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add the columns as nullable, backfill existing rows, then tighten.
+    for table in ('author', 'book'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute('UPDATE {} SET updated_at = CURRENT_TIMESTAMP'.format(table))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+    table_version = op.create_table('table_version',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(table_version, [{'name': 'author', 'version': 0}, {'name': 'book', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('table_version')
+    for table in ('book', 'author'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,33 @@
+"""Add indexes for book filtering and sorting
+
+Revision ID: b7e41d0c5a93
+Revises: 3f9a2c7d1e84
+Create Date: 2026-10-18 11:47:03.552918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e41d0c5a93'
+down_revision = '3f9a2c7d1e84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_book_author_id_publish_date', 'book', ['author_id', 'publish_date', 'id'], unique=False)
+    op.create_index('ix_book_publish_date', 'book', ['publish_date', 'id'], unique=False)
+    op.create_index('ix_book_title', 'book', ['title', 'id'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_book_title_pattern', 'book', ['title'], unique=False,
+                        postgresql_ops={'title': 'varchar_pattern_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_book_title_pattern', table_name='book')
+    op.drop_index('ix_book_title', table_name='book')
+    op.drop_index('ix_book_publish_date', table_name='book')
+    op.drop_index('ix_book_author_id_publish_date', table_name='book')
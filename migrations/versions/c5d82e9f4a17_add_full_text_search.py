@@ -0,0 +1,60 @@
+"""Add full-text search index
+
+Revision ID: c5d82e9f4a17
+Revises: b7e41d0c5a93
+Create Date: 2026-10-18 13:05:41.207316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d82e9f4a17'
+down_revision = 'b7e41d0c5a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("""ALTER TABLE book ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED""")
+        op.execute("""ALTER TABLE author ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(bio, '')), 'B')) STORED""")
+        op.create_index('ix_book_search_vector', 'book', ['search_vector'], unique=False, postgresql_using='gin')
+        op.create_index('ix_author_search_vector', 'author', ['search_vector'], unique=False, postgresql_using='gin')
+    elif dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE search_index USING fts5(kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize='porter unicode61')")
+        for table, kind, offset, title, body in (('book', 'book', 0, 'title', 'description'),
+                                                 ('author', 'author', 1, 'name', 'bio')):
+            op.execute("""CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO search_index (rowid, kind, ref_id, title, body)
+                VALUES (new.id * 2 + {offset}, '{kind}', new.id, new.{title}, coalesce(new.{body}, ''));
+            END""".format(**locals()))
+            op.execute("""CREATE TRIGGER {table}_search_update AFTER UPDATE OF {title}, {body} ON {table} BEGIN
+                UPDATE search_index SET title = new.{title}, body = coalesce(new.{body}, '')
+                WHERE rowid = new.id * 2 + {offset};
+            END""".format(**locals()))
+            op.execute("""CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM search_index WHERE rowid = old.id * 2 + {offset};
+            END""".format(**locals()))
+            op.execute("""INSERT INTO search_index (rowid, kind, ref_id, title, body)
+                SELECT id * 2 + {offset}, '{kind}', id, {title}, coalesce({body}, '') FROM {table}""".format(**locals()))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_author_search_vector', table_name='author')
+        op.drop_index('ix_book_search_vector', table_name='book')
+        op.drop_column('author', 'search_vector')
+        op.drop_column('book', 'search_vector')
+    elif dialect == 'sqlite':
+        for table in ('book', 'author'):
+            for event in ('insert', 'update', 'delete'):
+                op.execute('DROP TRIGGER {}_search_{}'.format(table, event))
+        op.execute('DROP TABLE search_index')
@@ -0,0 +1,28 @@
+"""Add denormalized author book_count
+
+Revision ID: d41e8b2f9c63
+Revises: c5d82e9f4a17
+Create Date: 2026-10-18 18:02:16.480215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41e8b2f9c63'
+down_revision = 'c5d82e9f4a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN: a batch (copy-and-move) rebuild on SQLite would drop the search triggers
+    op.add_column('author', sa.Column('book_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute('UPDATE author SET book_count = (SELECT count(*) FROM book WHERE book.author_id = author.id)')
+    op.create_index('ix_author_book_count', 'author', ['book_count', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_author_book_count', table_name='author')
+    op.execute('ALTER TABLE author DROP COLUMN book_count')  # SQLite 3.35+
@@ -0,0 +1,24 @@
+"""Add (author_id, id) index on book
+
+Revision ID: f2a9c4e7b318
+Revises: e6f0a3b91c27
+Create Date: 2026-10-18 21:02:37.418260
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a9c4e7b318'
+down_revision = 'e6f0a3b91c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_book_author_id_id', 'book', ['author_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_book_author_id_id', table_name='book')
@@ -1,5 +1,10 @@
+import argparse
+
 from app import create_app, db
+from app.conditional import bump_versions
 from app.models import Author, Book
+from app.stats.services import refresh_book_counts
+from config import get_config
 
 
 def seed_data():
@@ -11,6 +16,7 @@ def seed_data():
         author_3 = Author(name="J.R.R. Tolkien", bio="Author of The Lord of the Rings", birth_date="1892-01-03")
 
         db.session.add_all([author_1, author_2, author_3])
+        bump_versions('author')
         db.session.commit()
 
         # Add books
@@ -21,10 +27,21 @@ def seed_data():
                       publish_date="1954-07-29", author_id=author_3.id)
 
         db.session.add_all([book_1, book_2, book_3])
+        db.session.flush()
+        refresh_book_counts()
+        bump_versions('book')
         db.session.commit()
 
         print("Database seeded successfully!")
 
 
 if __name__ == '__main__':
-    seed_data()
+    parser = argparse.ArgumentParser(description='Seed the database')
+    parser.add_argument('--scale', help='Generate a benchmark catalogue instead (10k, 100k, 1m, 10m); '
+                                        'see python -m benchmarks.datagen --help')
+    args = parser.parse_args()
+    if args.scale:
+        from benchmarks import datagen
+        datagen.main(['--scale', args.scale, '--database-url', get_config().SQLALCHEMY_DATABASE_URI])
+    else:
+        seed_data()
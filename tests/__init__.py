@@ -0,0 +1,4 @@
+import os
+
+# create_app() picks its config from FLASK_ENV; never let the suite run against a real database
+os.environ['FLASK_ENV'] = 'testing'
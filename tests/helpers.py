@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import db
+
+
+@contextmanager
+def count_queries():
+    """Collect every SQL statement sent to the database inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@contextmanager
+def assert_num_queries(testcase, expected):
+    """Fail ``testcase`` if the block does not issue exactly ``expected`` queries."""
+    with count_queries() as statements:
+        yield statements
+    testcase.assertEqual(
+        len(statements), expected,
+        'Expected {} queries, got {}:\n{}'.format(expected, len(statements), '\n'.join(statements)))
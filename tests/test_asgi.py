@@ -0,0 +1,134 @@
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from app import db
+from app.models import Author, Book
+from config import TestingConfig
+
+try:
+    import aiosqlite  # noqa: F401
+    import quart
+except ImportError:  # optional dependencies of the ASGI serving mode
+    quart = None
+
+@unittest.skipIf(quart is None, 'quart and aiosqlite are not installed')
+class AsgiTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """Seed a SQLite file through the sync app; the async app reads it with aiosqlite."""
+        from app.asgi import create_asgi_app
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+
+        class FileConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + self.path
+
+        self.asgi = create_asgi_app(FileConfig)
+        self.sync_app = self.asgi.flask_app
+        with self.sync_app.app_context():
+            db.create_all()
+            orwell = Author(name='George Orwell', bio='English novelist')
+            db.session.add(orwell)
+            db.session.flush()
+            db.session.add_all([
+                Book(title='Animal Farm', publish_date=date(1945, 8, 17), author_id=orwell.id),
+                Book(title='1984', publish_date=date(1949, 6, 8), author_id=orwell.id),
+                Book(title='Burmese Days', publish_date=date(1934, 10, 25), author_id=orwell.id),
+            ])
+            db.session.commit()
+        self.client = self.asgi.async_app.test_client()
+
+    async def asyncTearDown(self):
+        await self.asgi.async_app.extensions['async_db'].kw['bind'].dispose()
+
+    def tearDown(self):
+        with self.sync_app.app_context():
+            db.engine.dispose()
+        os.remove(self.path)
+
+    async def test_get_books_paginated(self):
+        """Test async GET /books - keyset pages, filters and sort match the sync app."""
+        response = await self.client.get('/books/?sort=-publish_date&limit=2&fields=title')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book['title'] for book in await response.get_json()], ['1984', 'Animal Farm'])
+        cursor = response.headers['X-Next-Cursor']
+        response = await self.client.get(f'/books/?sort=-publish_date&limit=2&fields=title&after={cursor}')
+        self.assertEqual(await response.get_json(), [{'id': 3, 'publish_date': '1934-10-25', 'title': 'Burmese Days'}])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+        response = await self.client.get('/books/?title_prefix=An')
+        self.assertEqual([book['title'] for book in await response.get_json()], ['Animal Farm'])
+
+    async def test_get_book_and_etag(self):
+        """Test async GET /books/{id} - ISO dates, ETag revalidation and 404."""
+        response = await self.client.get('/books/2')
+        book = await response.get_json()
+        self.assertEqual(book['title'], '1984')
+        self.assertRegex(book['updated_at'], r'^\d{4}-\d{2}-\d{2}T')
+        response = await self.client.get('/books/2', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual((await self.client.get('/books/99')).status_code, 404)
+
+    async def test_compression(self):
+        """Test async GET /books - gzip when accepted and over the size threshold."""
+        self.asgi.async_app.config['COMPRESSION_MIN_SIZE'] = 0
+        response = await self.client.get('/books/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(await response.get_data()))), 3)
+        response = await self.client.get('/books/')
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    async def test_get_authors_with_books(self):
+        """Test async GET /authors?include=books and /authors/{id}/books."""
+        response = await self.client.get('/authors/?include=books')
+        authors = await response.get_json()
+        self.assertCountEqual([book['title'] for book in authors[0]['books']], ['Animal Farm', '1984', 'Burmese Days'])
+        response = await self.client.get('/authors/1/books')
+        self.assertEqual(len(await response.get_json()), 3)
+        self.assertEqual((await self.client.get('/authors/5')).status_code, 404)
+
+    async def call(self, method, path, body=b'', query_string=b''):
+        """Drive the dispatcher directly as an ASGI server would."""
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+                 'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query_string,
+                 'root_path': '', 'server': ('localhost', 80), 'client': ('127.0.0.1', 1234),
+                 'headers': [(b'host', b'localhost'), (b'content-type', b'application/json'),
+                             (b'content-length', str(len(body)).encode())]}
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()  # the client stays connected
+
+        async def send(message):
+            sent.append(message)
+
+        await self.asgi(scope, receive, send)
+        status = sent[0]['status']
+        return status, b''.join(message.get('body', b'') for message in sent[1:])
+
+    async def test_dispatcher_routes_writes_to_flask(self):
+        """Test the ASGI entry point - writes and streams are served by the Flask app."""
+        self.assertTrue(self.asgi.handles({'method': 'GET', 'path': '/books/', 'query_string': b'', 'headers': []}))
+        self.assertFalse(self.asgi.handles({'method': 'GET', 'path': '/books/', 'query_string': b'stream=1', 'headers': []}))
+        self.assertFalse(self.asgi.handles({'method': 'GET', 'path': '/search/', 'query_string': b'q=x', 'headers': []}))
+
+        status, body = await self.call('POST', '/authors/', json.dumps({'name': 'Aldous Huxley'}).encode())
+        self.assertEqual(status, 201)
+        author = json.loads(body)
+        status, body = await self.call('GET', '/authors/{}'.format(author['id']))
+        self.assertEqual((status, json.loads(body)['name']), (200, 'Aldous Huxley'))
+        status, body = await self.call('GET', '/books/', query_string=b'stream=1')
+        self.assertEqual(len(body.splitlines()), 3)
+        status, body = await self.call('DELETE', '/authors/{}'.format(author['id']))
+        self.assertEqual((status, body), (204, b''))
+
+if __name__ == '__main__':
+    unittest.main()
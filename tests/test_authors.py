@@ -1,6 +1,9 @@
+import json
 import unittest
 from app import create_app, db
-from app.models import Author
+from app.models import Author, Book
+from app.authors.services import update_author
+from tests.helpers import assert_num_queries, count_queries
 
 class AuthorTestCase(unittest.TestCase):
 
@@ -68,5 +71,146 @@ class AuthorTestCase(unittest.TestCase):
         response = self.client.get(f'/authors/{author.id}')
         self.assertEqual(response.status_code, 404)
 
+    def test_get_authors_paginated(self):
+        """Test GET /authors?limit= - pages follow the next cursor."""
+        for i in range(3):
+            db.session.add(Author(name=f'Author {i}'))
+        db.session.commit()
+
+        response = self.client.get('/authors/?limit=2')
+        self.assertEqual([author['name'] for author in response.json], ['Author 0', 'Author 1'])
+
+        response = self.client.get(f"/authors/?limit=2&after={response.headers['X-Next-Cursor']}")
+        self.assertEqual([author['name'] for author in response.json], ['Author 2'])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_stream_authors_ndjson(self):
+        """Test GET /authors with Accept: application/x-ndjson - stream all authors."""
+        for i in range(3):
+            db.session.add(Author(name=f'Author {i}'))
+        db.session.commit()
+
+        response = self.client.get('/authors/', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Author 0', 'Author 1', 'Author 2'])
+
+    def _create_authors_with_books(self, authors, books_per_author):
+        for i in range(authors):
+            author = Author(name=f'Author {i}')
+            author.books = [Book(title=f'Book {i}.{j}') for j in range(books_per_author)]
+            db.session.add(author)
+        db.session.commit()
+
+    def test_get_authors_include_books(self):
+        """Test GET /authors?include=books - query count does not grow with the page."""
+        # version lookup + one page of authors + one SELECT ... IN for their books
+        self._create_authors_with_books(3, 2)
+        with assert_num_queries(self, 3):
+            response = self.client.get('/authors/?include=books')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book['title'] for book in response.json[2]['books']], ['Book 2.0', 'Book 2.1'])
+
+        self._create_authors_with_books(10, 3)
+        with assert_num_queries(self, 3):
+            response = self.client.get('/authors/?include=books')
+        self.assertEqual(len(response.json), 13)
+
+    def test_get_author_include_books(self):
+        """Test GET /authors/{id}?include=books - embed the author's books."""
+        self._create_authors_with_books(1, 3)
+        author = Author.query.first()
+        with assert_num_queries(self, 3):
+            response = self.client.get(f'/authors/{author.id}?include=books')
+        self.assertEqual(len(response.json['books']), 3)
+
+        response = self.client.get(f'/authors/{author.id}?include=reviews')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_books_by_author(self):
+        """Test GET /authors/{id}/books - two queries however many books."""
+        self._create_authors_with_books(1, 5)
+        author = Author.query.first()
+        db.session.expunge_all()
+        with assert_num_queries(self, 2):
+            response = self.client.get(f'/authors/{author.id}/books')
+        self.assertEqual([book['title'] for book in response.json], [f'Book 0.{j}' for j in range(5)])
+
+        response = self.client.get('/authors/999/books')
+        self.assertEqual(response.status_code, 404)
+
+    def test_create_authors_bulk(self):
+        """Test POST /authors/bulk - insert a batch, report bad NDJSON lines."""
+        response = self.client.post('/authors/bulk', json=[{'name': 'A'}, {'name': 'B', 'birth_date': '1900-01-01'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['count'], 2)
+
+        body = '{"name": "C"}\nnot json\n{"bio": "no name"}\n'
+        response = self.client.post('/authors/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json['errors']], [1, 2])
+        self.assertEqual(Author.query.count(), 2)
+
+    def test_get_author_cached_and_invalidated(self):
+        """Test GET /authors/{id} - cached until the author is updated."""
+        author = Author(name='Ursula K. Le Guin')
+        db.session.add(author)
+        db.session.commit()
+        author_id = author.id
+
+        self.client.get(f'/authors/{author_id}')
+        with assert_num_queries(self, 0):
+            response = self.client.get(f'/authors/{author_id}')
+        self.assertEqual(response.json['name'], 'Ursula K. Le Guin')
+
+        with self.app.test_request_context():
+            update_author(author_id, {'name': 'Ursula Le Guin'})
+        self.assertEqual(self.client.get(f'/authors/{author_id}').json['name'], 'Ursula Le Guin')
+
+    def test_multi_get_authors(self):
+        """Test GET /authors?ids= and POST /authors/_mget - request order, expansions, not-found markers."""
+        authors = [Author(name='Author {}'.format(i)) for i in range(2)]
+        db.session.add_all(authors)
+        db.session.flush()
+        db.session.add(Book(title='Book', author_id=authors[1].id))
+        db.session.commit()
+        response = self.client.get('/authors/?ids={},{},0'.format(authors[1].id, authors[0].id))
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/authors/?ids={},{},12345'.format(authors[1].id, authors[0].id))
+        self.assertEqual([author.get('name') for author in response.json], ['Author 1', 'Author 0', None])
+        self.assertEqual(response.json[2], {'id': 12345, 'found': False})
+        with assert_num_queries(self, 2):  # authors, then their books
+            response = self.client.post('/authors/_mget?include=books', json={'ids': [authors[1].id]})
+        self.assertEqual(response.json[0]['books'], [{'id': 1, 'title': 'Book'}])
+
+    def test_get_authors_etag(self):
+        """Test GET /authors with If-None-Match - 304 until an author is written."""
+        db.session.add(Author(name='Author 0'))
+        db.session.commit()
+        etag = self.client.get('/authors/').headers['ETag']
+
+        response = self.client.get('/authors/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get('/authors/?include=books').headers['ETag'], etag)
+
+        self.client.post('/authors/bulk', json=[{'name': 'Author 1'}])
+        response = self.client.get('/authors/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 2)
+
+    def test_get_authors_sparse_fields(self):
+        """Test GET /authors?fields= - projection applies with and without include."""
+        self._create_authors_with_books(2, 1)
+        with count_queries() as statements:
+            response = self.client.get('/authors/?fields=name')
+        self.assertEqual(response.json[0], {'id': 1, 'name': 'Author 0'})
+        self.assertNotIn('bio', statements[-1])
+
+        response = self.client.get('/authors/?fields=name&include=books')
+        self.assertEqual(response.json[1], {'id': 2, 'name': 'Author 1', 'books': [{'id': 2, 'title': 'Book 1.0'}]})
+
+        response = self.client.get('/authors/1/books?fields=title,publish_date')
+        self.assertEqual(response.json, [{'id': 1, 'title': 'Book 0.0', 'publish_date': None}])
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,12 @@
+import json
 import unittest
+from datetime import date
 from app import create_app, db
+from app.json_provider import JSONProvider, OrjsonProvider, orjson
+from app.books.services import books_query
 from app.models import Author, Book
+from app.serializers import fetch_rows, iter_rows
+from tests.helpers import assert_num_queries, count_queries
 
 class BookTestCase(unittest.TestCase):
 
@@ -73,5 +79,285 @@ class BookTestCase(unittest.TestCase):
         response = self.client.get(f'/books/{book.id}')
         self.assertEqual(response.status_code, 404)
 
+    def test_get_books_paginated(self):
+        """Test GET /books?limit= - walk the collection with the next cursor."""
+        for i in range(5):
+            db.session.add(Book(title=f'Book {i}', author_id=self.author.id))
+        db.session.commit()
+
+        response = self.client.get('/books/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book['title'] for book in response.json], ['Book 0', 'Book 1'])
+        self.assertIn('rel="next"', response.headers['Link'])
+
+        titles = []
+        cursor = None
+        while True:
+            url = '/books/?limit=2' + (f'&after={cursor}' if cursor else '')
+            response = self.client.get(url)
+            titles.extend(book['title'] for book in response.json)
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        self.assertEqual(titles, [f'Book {i}' for i in range(5)])
+        self.assertNotIn('Link', response.headers)
+
+    def test_get_books_page_size_capped(self):
+        """Test GET /books?limit= - the server caps the page size."""
+        self.app.config['PAGE_SIZE_MAX'] = 3
+        for i in range(5):
+            db.session.add(Book(title=f'Book {i}', author_id=self.author.id))
+        db.session.commit()
+
+        response = self.client.get('/books/?limit=1000')
+        self.assertEqual(len(response.json), 3)
+
+    def test_get_books_invalid_limit(self):
+        """Test GET /books?limit= - anything but a positive integer is rejected."""
+        for limit in ('abc', '0', '-1', '1.5', ''):
+            response = self.client.get('/books/?limit=' + limit)
+            self.assertEqual(response.status_code, 400, limit)
+
+    def test_get_books_invalid_cursor(self):
+        """Test GET /books?after= - a malformed cursor is rejected."""
+        response = self.client.get('/books/?after=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_books_ndjson(self):
+        """Test GET /books?stream=1 - every book is streamed as NDJSON."""
+        self.app.config['STREAM_BATCH_SIZE'] = 2
+        for i in range(5):
+            db.session.add(Book(title=f'Book {i}', author_id=self.author.id))
+        db.session.commit()
+
+        response = self.client.get('/books/?stream=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], [f'Book {i}' for i in range(5)])
+
+        response = self.client.get('/books/', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 5)
+
+    def test_create_books_bulk(self):
+        """Test POST /books/bulk - insert a batch in one transaction."""
+        payload = [{'title': f'Book {i}', 'publish_date': '2000-01-01', 'author_id': self.author.id} for i in range(50)]
+        response = self.client.post('/books/bulk', json=payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['count'], 50)
+        self.assertEqual(Book.query.count(), 50)
+        ids = response.json['ids']
+        self.assertEqual(db.session.get(Book, ids[7]).title, 'Book 7')
+
+    def test_create_books_bulk_ndjson(self):
+        """Test POST /books/bulk with NDJSON - one book per line."""
+        body = '\n'.join(json.dumps({'title': f'Book {i}', 'author_id': self.author.id}) for i in range(3))
+        response = self.client.post('/books/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['count'], 3)
+
+    def test_create_books_bulk_reports_errors(self):
+        """Test POST /books/bulk - invalid items are reported and nothing is written."""
+        payload = [
+            {'title': 'Good', 'author_id': self.author.id},
+            {'author_id': self.author.id},
+            {'title': 'Bad date', 'publish_date': 'yesterday', 'author_id': self.author.id},
+            {'title': 'No author', 'author_id': 999},
+        ]
+        response = self.client.post('/books/bulk', json=payload)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json['errors']
+        self.assertEqual([error['index'] for error in errors], [1, 2, 3])
+        self.assertIn('title', errors[0]['errors'])
+        self.assertIn('publish_date', errors[1]['errors'])
+        self.assertEqual(errors[2]['errors'], {'author_id': 'author not found'})
+        self.assertEqual(Book.query.count(), 0)
+
+    def test_get_book_cached_and_invalidated(self):
+        """Test GET /books/{id} - repeat reads hit the cache, writes invalidate it."""
+        book = Book(title='Animal Farm', author_id=self.author.id)
+        db.session.add(book)
+        db.session.commit()
+        book_id = book.id
+
+        self.client.get(f'/books/{book_id}')
+        with assert_num_queries(self, 0):
+            response = self.client.get(f'/books/{book_id}')
+        self.assertEqual(response.json['title'], 'Animal Farm')
+        self.assertEqual(self.client.get('/metrics/cache').json['hits'], 1)
+
+        self.client.put(f'/books/{book_id}', json={'title': 'Animal Farm (2nd ed.)'})
+        self.assertEqual(self.client.get(f'/books/{book_id}').json['title'], 'Animal Farm (2nd ed.)')
+
+        self.client.delete(f'/books/{book_id}')
+        self.assertEqual(self.client.get(f'/books/{book_id}').status_code, 404)
+
+    def test_multi_get_books(self):
+        """Test GET /books?ids= and POST /books/_mget - one IN query, request order, not-found markers."""
+        books = [Book(title='Book {}'.format(i), author_id=self.author.id) for i in range(3)]
+        db.session.add_all(books)
+        db.session.commit()
+        ids = [books[2].id, 999, books[0].id, books[2].id]
+        with assert_num_queries(self, 2):  # table version (ETag), one IN query
+            response = self.client.get('/books/?ids=' + ','.join(map(str, ids)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book.get('title') for book in response.json], ['Book 2', None, 'Book 0', 'Book 2'])
+        self.assertEqual(response.json[1], {'id': 999, 'found': False})
+        self.assertEqual(set(response.json[0]), {'id', 'title', 'description', 'updated_at'})
+
+        # The single-record cache was fed: the same ids by POST need no query at all
+        with assert_num_queries(self, 0):
+            response = self.client.post('/books/_mget', json={'ids': [books[0].id, books[2].id]})
+        self.assertEqual([book['title'] for book in response.json], ['Book 0', 'Book 2'])
+        with assert_num_queries(self, 0):
+            self.client.get(f'/books/{books[0].id}')
+
+        self.app.config['MGET_CHUNK_SIZE'] = 2
+        response = self.client.post('/books/_mget?fields=title', json={'ids': [book.id for book in books]})
+        self.assertEqual([set(book) for book in response.json], [{'id', 'title', 'updated_at'}] * 3)
+
+    def test_multi_get_books_invalid(self):
+        """Malformed, empty or too many ids are rejected."""
+        self.assertEqual(self.client.get('/books/?ids=1,x').status_code, 400)
+        self.assertEqual(self.client.get('/books/?ids=%C2%B2').status_code, 400)
+        self.assertEqual(self.client.get('/books/?ids=99999999999999999999').status_code, 400)
+        self.assertEqual(self.client.post('/books/_mget', json={'ids': [2 ** 31]}).status_code, 400)
+        self.assertEqual(self.client.post('/books/_mget', json={'ids': ['\u0663']}).status_code, 400)
+        self.assertEqual(self.client.post('/books/_mget', json={'ids': []}).status_code, 400)
+        self.assertEqual(self.client.post('/books/_mget', json=[1, 2]).status_code, 400)
+        self.app.config['MGET_MAX_IDS'] = 2
+        self.assertEqual(self.client.get('/books/?ids=1,2,3').status_code, 400)
+
+    def test_get_books_etag(self):
+        """Test GET /books with If-None-Match - 304 without reading any book rows."""
+        db.session.add(Book(title='Animal Farm', author_id=self.author.id))
+        db.session.commit()
+        response = self.client.get('/books/')
+        etag = response.headers['ETag']
+
+        with assert_num_queries(self, 1):
+            response = self.client.get('/books/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+        self.client.post('/books/bulk', json=[{'title': '1984', 'author_id': self.author.id}])
+        response = self.client.get('/books/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_get_book_etag(self):
+        """Test GET /books/{id} with If-None-Match - cached 304, new ETag after update."""
+        book = Book(title='Animal Farm', author_id=self.author.id)
+        db.session.add(book)
+        db.session.commit()
+        book_id = book.id
+        etag = self.client.get(f'/books/{book_id}').headers['ETag']
+
+        with assert_num_queries(self, 0):
+            response = self.client.get(f'/books/{book_id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.client.put(f'/books/{book_id}', json={'title': 'Animal Farm (2nd ed.)'})
+        response = self.client.get(f'/books/{book_id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_dates_serialized_as_iso(self):
+        """Test GET /books - dates are ISO-8601 with either JSON backend."""
+        db.session.add(Book(title='1984', publish_date=date(1949, 6, 8), author_id=self.author.id))
+        db.session.commit()
+        for provider in (JSONProvider, OrjsonProvider):
+            if provider is OrjsonProvider and orjson is None:
+                continue
+            self.app.json = provider(self.app)
+            book = self.client.get('/books/').json[0]
+            self.assertEqual(book['publish_date'], '1949-06-08')
+            self.assertRegex(book['updated_at'], r'^\d{4}-\d{2}-\d{2}T')
+
+    def test_get_books_sparse_fields(self):
+        """Test GET /books?fields= - only the requested columns are selected."""
+        db.session.add(Book(title='1984', description='A dystopian novel', author_id=self.author.id))
+        db.session.commit()
+
+        with count_queries() as statements:
+            response = self.client.get('/books/?fields=title')
+        self.assertEqual(response.json, [{'id': 1, 'title': '1984'}])
+        self.assertNotIn('description', statements[-1])
+
+        response = self.client.get('/books/1?fields=title')
+        self.assertEqual(set(response.json), {'id', 'updated_at', 'title'})
+
+        response = self.client.get('/books/?fields=title,isbn')
+        self.assertEqual(response.status_code, 400)
+
+    def _walk(self, url):
+        items, cursor = [], None
+        while True:
+            response = self.client.get(url + (f'&after={cursor}' if cursor else ''))
+            self.assertEqual(response.status_code, 200)
+            items.extend(response.json)
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                return items
+
+    def test_get_books_filtered(self):
+        """Test GET /books with author_id, published_after/before and title_prefix."""
+        other = Author(name='Aldous Huxley')
+        db.session.add(other)
+        db.session.flush()
+        db.session.add_all([
+            Book(title='1984', publish_date=date(1949, 6, 8), author_id=self.author.id),
+            Book(title='Animal Farm', publish_date=date(1945, 8, 17), author_id=self.author.id),
+            Book(title='Brave New World', publish_date=date(1932, 1, 1), author_id=other.id),
+            Book(title='100% Orwell', author_id=self.author.id),
+        ])
+        db.session.commit()
+
+        def titles(query):
+            return [book['title'] for book in self.client.get('/books/?' + query).json]
+
+        self.assertEqual(titles(f'author_id={other.id}'), ['Brave New World'])
+        self.assertEqual(titles('published_after=1940-01-01'), ['1984', 'Animal Farm'])
+        self.assertEqual(titles('published_before=1945-08-17'), ['Animal Farm', 'Brave New World'])
+        self.assertEqual(titles(f'author_id={self.author.id}&published_after=1946-01-01'), ['1984'])
+        self.assertEqual(titles('title_prefix=100%25'), ['100% Orwell'])
+        # Prefix matches default to title order, the order of ix_book_title
+        self.assertEqual(titles('title_prefix=1'), ['100% Orwell', '1984'])
+        self.assertEqual(titles('title_prefix=1&sort=id'), ['1984', '100% Orwell'])
+        self.assertEqual(titles('title_prefix=animal'), [])
+        self.assertEqual(self.client.get('/books/?published_after=someday').status_code, 400)
+        self.assertEqual(self.client.get('/books/?author_id=99999999999999999999').status_code, 400)
+
+    def test_get_books_sorted_keyset(self):
+        """Test GET /books?sort= - keyset pages follow the sort order, NULL dates sort highest."""
+        dates = [date(2001, 1, 1), None, date(1999, 5, 5), date(2001, 1, 1), None, date(1980, 1, 1), date(1999, 5, 5)]
+        for i, publish_date in enumerate(dates):
+            db.session.add(Book(title=f'Book {i % 3}', publish_date=publish_date, author_id=self.author.id))
+        db.session.commit()
+        books = [(i + 1, publish_date) for i, publish_date in enumerate(dates)]
+
+        ascending = sorted(books, key=lambda b: (b[1] is None, b[1] or date.min, b[0]))
+        items = self._walk('/books/?sort=publish_date&limit=2')
+        self.assertEqual([item['id'] for item in items], [b[0] for b in ascending])
+
+        items = self._walk('/books/?sort=-publish_date&limit=2')
+        self.assertEqual([item['id'] for item in items], [b[0] for b in reversed(ascending)])
+
+        items = self._walk('/books/?sort=-title&limit=3&fields=id')
+        self.assertEqual([(item['title'], item['id']) for item in items],
+                         sorted(((f'Book {i % 3}', i + 1) for i in range(7)), reverse=True))
+
+        self.assertEqual(self.client.get('/books/?sort=description').status_code, 400)
+
+    def test_compact_rows(self):
+        """Test fetch_rows / iter_rows - column queries give plain tuples, entity queries ORM instances."""
+        db.session.add_all([Book(title=f'Book {i}', author_id=self.author.id) for i in range(3)])
+        db.session.commit()
+        rows = fetch_rows(books_query(('id', 'title')).order_by(Book.id))
+        self.assertEqual([row.title for row in rows], ['Book 0', 'Book 1', 'Book 2'])
+        self.assertEqual(type(rows[0]).__bases__, (tuple,))
+        self.assertEqual(list(iter_rows(books_query(('id',)).order_by(Book.id), 2)), [(1,), (2,), (3,)])
+        self.assertIsInstance(fetch_rows(Book.query)[0], Book)
+
 if __name__ == '__main__':
     unittest.main()
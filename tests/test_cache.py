@@ -0,0 +1,102 @@
+import unittest
+from app import create_app
+from app.cache import LocalStore, MemoryBackend, SharedBackend, cache
+from config import TestingConfig
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class MemoryBackendTestCase(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted past maxsize."""
+        backend = MemoryBackend(maxsize=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.evictions, 1)
+
+    def test_ttl_expiry(self):
+        """Entries expire once their TTL has passed."""
+        clock = FakeClock()
+        backend = MemoryBackend(clock=clock)
+        backend.set('a', 1, ttl=10)
+        clock.now = 9
+        self.assertEqual(backend.get('a'), 1)
+        clock.now = 10
+        self.assertIsNone(backend.get('a'))
+
+
+class SharedBackendTestCase(unittest.TestCase):
+
+    def test_round_trip_through_local_store(self):
+        """Values survive serialization and honour the TTL in the store."""
+        clock = FakeClock()
+        backend = SharedBackend(LocalStore(clock=clock))
+        backend.set('book:1', {'id': 1, 'title': '1984'}, ttl=5)
+        self.assertEqual(backend.get('book:1'), {'id': 1, 'title': '1984'})
+        backend.delete('book:1')
+        self.assertIsNone(backend.get('book:1'))
+        backend.set('book:2', {'id': 2}, ttl=5)
+        clock.now = 6
+        self.assertIsNone(backend.get('book:2'))
+
+    def test_many(self):
+        """get_many returns only the hits; set_many stores every entry."""
+        for backend in (SharedBackend(LocalStore()), MemoryBackend()):
+            backend.set_many({'book:1': {'id': 1}, 'book:2': {'id': 2}}, ttl=5)
+            self.assertEqual(backend.get_many(['book:2', 'book:3', 'book:1']),
+                             {'book:1': {'id': 1}, 'book:2': {'id': 2}})
+
+
+    def test_add_only_fills_absent_keys(self):
+        """add() (SET NX) stores nothing over a live entry, but does over an expired one."""
+        clock = FakeClock()
+        for backend in (SharedBackend(LocalStore(clock=clock)), MemoryBackend(clock=clock)):
+            self.assertTrue(backend.add('book:1', {'id': 1}, ttl=5))
+            self.assertFalse(backend.add('book:1', {'id': 'stale'}, ttl=5))
+            backend.add_many({'book:1': {'id': 'stale'}, 'book:2': {'id': 2}}, ttl=5)
+            self.assertEqual(backend.get_many(['book:1', 'book:2']), {'book:1': {'id': 1}, 'book:2': {'id': 2}})
+            clock.now += 5
+            self.assertTrue(backend.add('book:1', {'id': 'new'}, ttl=5))
+            self.assertEqual(backend.get('book:1'), {'id': 'new'})
+
+
+class CacheInvalidationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_fill_racing_a_write_is_dropped(self):
+        """A row loaded before a write's invalidation is not cached after it."""
+        def load_then_write():
+            cache.invalidate('book:1')  # the writer commits while this reader is loading
+            return {'id': 1, 'title': 'old'}
+        self.assertEqual(cache.get_or_set('book:1', load_then_write), {'id': 1, 'title': 'old'})
+        self.assertIsNone(cache.get('book:1'))
+        self.assertEqual(cache.get_or_set('book:1', lambda: {'id': 1, 'title': 'new'})['title'], 'new')
+
+        def load_many_then_write(ids):
+            cache.invalidate('book:2')
+            return {id: {'id': id} for id in ids}
+        cache.get_or_set_many([2, 3], 'book:{}'.format, load_many_then_write)
+        self.assertEqual(cache.get_many(['book:2', 'book:3']), {'book:3': {'id': 3}})
+
+
+if __name__ == '__main__':
+    unittest.main()
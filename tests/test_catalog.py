@@ -0,0 +1,159 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from app import create_app, db
+from app.catalog import exporter
+from app.catalog.importer import AuthorIndex
+from app.models import Author, Book, utcnow
+from config import TestingConfig
+
+class CatalogImportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add(Author(id=1, name='George Orwell'))
+        db.session.commit()
+        self.directory = tempfile.mkdtemp()
+        self.runner = self.app.test_cli_runner()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as handle:
+            handle.write(content)
+        return path
+
+    def test_import_csv_and_ndjson(self):
+        """Authors from CSV, books from NDJSON referencing authors by name, source id and existing id."""
+        authors = self.write('authors.csv', 'id,name,bio,birth_date\n'
+                                            '500,Ursula Le Guin,"Wrote, a lot",1929-10-21\n'
+                                            '501,Italo Calvino,,1923-10-15\n')
+        books = self.write('books.ndjson', '{"title": "The Dispossessed", "author": "Ursula Le Guin"}\n'
+                                           '{"title": "Invisible Cities", "author_id": 501, "publish_date": "1972-01-01"}\n'
+                                           '\n'
+                                           '{"title": "1984", "author_id": 1}\n')
+        result = self.runner.invoke(args=['catalog', 'import', '--authors', authors, '--books', books,
+                                          '--batch-size', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 2 authors, 3 books; 0 rows rejected', result.output)
+        calvino = Author.query.filter_by(name='Italo Calvino').one()
+        self.assertIsNone(calvino.bio)
+        titles = {book.title: book.author.name for book in Book.query}
+        self.assertEqual(titles, {'The Dispossessed': 'Ursula Le Guin', 'Invisible Cities': 'Italo Calvino',
+                                  '1984': 'George Orwell'})
+        self.assertEqual(Book.query.filter_by(title='Invisible Cities').one().publish_date.year, 1972)
+        self.assertEqual(calvino.book_count, 1)
+
+    def test_invalid_rows_are_reported(self):
+        """Invalid rows are skipped and reported by line; too many of them abort the import."""
+        books = self.write('books.csv', 'title,author\nGood,George Orwell\n,George Orwell\nOrphan,Nobody\n')
+        result = self.runner.invoke(args=['catalog', 'import', '--books', books])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('book line 3: {"title": "required"}', result.output)
+        self.assertIn('book line 4: {"author_id": "author not found"}', result.output)
+        self.assertEqual(Book.query.count(), 1)
+        result = self.runner.invoke(args=['catalog', 'import', '--books', books, '--max-errors', '1'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('More than 1 invalid rows', result.output)
+
+    def test_malformed_ids_are_row_errors(self):
+        """Ids int() cannot parse (e.g. '²') reject the row instead of aborting the import."""
+        authors = self.write('authors.csv', 'id,name\n²,Superscript\n7,Seven\n')
+        books = self.write('books.csv', 'title,author_id\nBad,²\nGood,7\n')
+        result = self.runner.invoke(args=['catalog', 'import', '--authors', authors, '--books', books])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('author line 2: {"id": "must be a non-negative integer"}', result.output)
+        self.assertIn('book line 2: {"author_id": "author not found"}', result.output)
+        self.assertEqual([book.title for book in Book.query], ['Good'])
+
+    def test_usage_errors(self):
+        """Missing files or an unknown extension are reported as usage errors."""
+        self.assertEqual(self.runner.invoke(args=['catalog', 'import']).exit_code, 2)
+        path = self.write('books.txt', '')
+        result = self.runner.invoke(args=['catalog', 'import', '--books', path])
+        self.assertIn('pass --format', result.output)
+
+    def test_author_index(self):
+        """Duplicate names resolve to the lowest id; source ids are translated."""
+        index = AuthorIndex()
+        index.add(3, 'Same')
+        index.add(7, 'Same', source_id=70)
+        self.assertEqual(index.resolve({'author': 'Same'}), 3)
+        self.assertEqual(index.resolve({'author_id': '70'}), 7)
+        self.assertIsNone(index.resolve({'author_id': 70.5}))
+
+class CatalogExportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        author = Author(name='George Orwell')
+        db.session.add(author)
+        db.session.flush()
+        db.session.add_all(Book(title='Book {}'.format(i), publish_date='1949-06-08', author_id=author.id)
+                           for i in range(5))
+        db.session.commit()
+        self.directory = tempfile.mkdtemp()
+        self.runner = self.app.test_cli_runner()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.directory)
+
+    def export(self, *args):
+        result = self.runner.invoke(args=['catalog', 'export', '--batch-size', '2'] + list(args))
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result
+
+    def test_export_csv(self):
+        """Every book with its author name, in id order, and the resume point on stderr."""
+        path = os.path.join(self.directory, 'books.csv')
+        result = self.export('--output', path)
+        with open(path, newline='') as handle:
+            rows = list(csv.DictReader(handle))
+        self.assertEqual([row['title'] for row in rows], ['Book {}'.format(i) for i in range(5)])
+        self.assertEqual(rows[0]['author_name'], 'George Orwell')
+        self.assertEqual(rows[0]['publish_date'], '1949-06-08')
+        self.assertIn('Exported 5 books; last id 5', result.output)
+
+    def test_incremental_ndjson(self):
+        """--since-id and --updated-since select only new or changed books."""
+        path = os.path.join(self.directory, 'books.ndjson')
+        self.export('--format', 'ndjson', '--output', path, '--since-id', '3')
+        with open(path) as handle:
+            self.assertEqual([json.loads(line)['id'] for line in handle], [4, 5])
+        watermark = utcnow() + timedelta(seconds=1)
+        db.session.get(Book, 2).updated_at = watermark + timedelta(seconds=1)
+        db.session.commit()
+        self.export('--format', 'ndjson', '--output', path, '--updated-since', watermark.strftime('%Y-%m-%d %H:%M:%S'))
+        with open(path) as handle:
+            self.assertEqual([json.loads(line)['id'] for line in handle], [2])
+
+    @unittest.skipIf(exporter.pyarrow is None, 'pyarrow is not installed')
+    def test_export_parquet(self):
+        """Parquet output has typed columns and one row group per batch."""
+        path = os.path.join(self.directory, 'books.parquet')
+        self.export('--format', 'parquet', '--output', path)
+        parquet = exporter.pyarrow.parquet.ParquetFile(path)
+        self.assertEqual(parquet.metadata.num_rows, 5)
+        self.assertEqual(parquet.num_row_groups, 3)
+        self.assertEqual(str(parquet.schema_arrow.field('publish_date').type), 'date32[day]')
+
+if __name__ == '__main__':
+    unittest.main()
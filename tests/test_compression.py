@@ -0,0 +1,104 @@
+import gzip
+import unittest
+from unittest import mock
+from flask import request
+from app import compression, create_app, db
+from app.cache import cache
+from app.models import Author, Book
+from config import TestingConfig
+
+class CompressionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        config = type('Config', (TestingConfig,), {'COMPRESSION_MIN_SIZE': 512})
+        self.app = create_app(config)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        author = Author(name='Author')
+        db.session.add(author)
+        db.session.flush()
+        db.session.add_all([Book(title=f'Book {i}', description='A long description ' * 5, author_id=author.id)
+                            for i in range(50)])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_gzip(self):
+        """Test GET /books - gzip when accepted, identity otherwise, Vary either way."""
+        plain = self.client.get('/books/')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+        response = self.client.get('/books/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertLess(len(response.data), len(plain.data) / 4)
+        # A strong validator per coding: the identity ETag with the encoding appended
+        self.assertEqual(response.headers['ETag'], plain.headers['ETag'][:-1] + '-gzip"')
+
+    def test_conditional_requests(self):
+        """Test GET /books - If-None-Match accepts the identity and the coded ETag; 304 echoes the one sent."""
+        headers = {'Accept-Encoding': 'gzip'}
+        identity_etag = self.client.get('/books/').headers['ETag']
+        gzip_etag = self.client.get('/books/', headers=headers).headers['ETag']
+        for etag in (identity_etag, gzip_etag):
+            response = self.client.get('/books/', headers=dict(headers, **{'If-None-Match': etag}))
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers['ETag'], etag)
+        stale = self.client.get('/books/', headers=dict(headers, **{'If-None-Match': '"0123-gzip"'}))
+        self.assertEqual(stale.status_code, 200)
+
+    def test_negotiation(self):
+        """Test negotiate() - q-values win, ties go to the configured order, q=0 refuses."""
+        with self.app.test_request_context(headers={'Accept-Encoding': 'gzip;q=1.0, br;q=0.5'}):
+            self.assertEqual(compression.negotiate(request.accept_encodings, ('br', 'gzip')), 'gzip')
+        with self.app.test_request_context(headers={'Accept-Encoding': 'gzip, br'}):
+            self.assertEqual(compression.negotiate(request.accept_encodings, ('br', 'gzip')), 'br')
+        with self.app.test_request_context(headers={'Accept-Encoding': '*;q=0'}):
+            self.assertIsNone(compression.negotiate(request.accept_encodings, ('br', 'gzip')))
+
+    @unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        """Test GET /books - br is preferred when the client accepts both."""
+        response = self.client.get('/books/', headers={'Accept-Encoding': 'gzip, deflate, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.data), self.client.get('/books/').data)
+
+    def test_threshold_and_streams(self):
+        """Small bodies and NDJSON streams are sent as is."""
+        headers = {'Accept-Encoding': 'gzip'}
+        self.assertNotIn('Content-Encoding', self.client.get('/books/1', headers=headers).headers)
+        self.assertNotIn('Content-Encoding', self.client.get('/books/?stream=1', headers=headers).headers)
+
+    def test_precompressed_cache(self):
+        """Test GET /books - compressed once per ETag, then served from the cache until a write."""
+        headers = {'Accept-Encoding': 'gzip'}
+        compress = mock.Mock(wraps=compression.gzip_compress)
+        with mock.patch.dict(compression.COMPRESSORS, {'gzip': (compress, 'COMPRESSION_GZIP_LEVEL')}):
+            first = self.client.get('/books/', headers=headers)
+            second = self.client.get('/books/', headers=headers)
+            self.assertEqual(compress.call_count, 1)
+            self.assertEqual(second.data, first.data)
+            etag = first.headers['ETag'].strip('"').rpartition('-')[0]
+            self.assertIsNotNone(self.app.extensions['compression'].bodies.get('gzip:{}'.format(etag)))
+            # Kept apart from the record cache and its counters
+            self.assertEqual(cache.stats()['misses'], 0)
+            self.assertEqual((compression.cache_stats()['hits'], compression.cache_stats()['misses']), (1, 1))
+            self.client.post('/books/', json={'title': 'New', 'author_id': 1})
+            third = self.client.get('/books/', headers=headers)
+            self.assertEqual(compress.call_count, 2)
+            self.assertNotEqual(third.headers['ETag'], first.headers['ETag'])
+
+    def test_instrumented(self):
+        """Compression time in Server-Timing; time and ratio histograms at GET /metrics."""
+        response = self.client.get('/books/', headers={'Accept-Encoding': 'gzip'})
+        self.assertRegex(response.headers['Server-Timing'], r'compress;dur=[\d.]+')
+        metrics = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('library_request_compress_seconds_count{endpoint="books.get_books",method="GET"} 1', metrics)
+        self.assertIn('library_response_compression_ratio_count{endpoint="books.get_books",method="GET"} 1', metrics)
+        self.assertIn('library_compression_cache_misses_total 1', metrics)
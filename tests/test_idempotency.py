@@ -0,0 +1,123 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from app import create_app, db
+from app.models import Author, Book, IdempotencyKey, utcnow
+from tests.helpers import assert_num_queries
+
+class IdempotencyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config.from_object('config.TestingConfig')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.payload = {'name': 'Test Author', 'bio': 'This is a test author', 'birth_date': '1980-01-01'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def post(self, url, payload, key):
+        return self.client.post(url, json=payload, headers={'Idempotency-Key': key})
+
+    def forget_cached(self):
+        self.app.extensions['idempotency'].responses.clear()
+
+    def test_repeat_replays_response(self):
+        """Test POST /authors - a repeated key returns the stored response and creates nothing."""
+        first = self.post('/authors/', self.payload, 'key-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+        with assert_num_queries(self, 0):  # answered from the in-memory front cache
+            second = self.post('/authors/', self.payload, 'key-1')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json, first.json)
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.forget_cached()
+        with assert_num_queries(self, 1):  # one primary-key lookup in idempotency_key
+            third = self.post('/authors/', self.payload, 'key-1')
+        self.assertEqual(third.json, first.json)
+        self.assertEqual(Author.query.count(), 1)
+        self.assertEqual(self.post('/authors/', self.payload, 'key-2').status_code, 201)
+        self.assertEqual(self.client.post('/authors/', json=self.payload).status_code, 201)
+        self.assertEqual(Author.query.count(), 3)
+
+    def test_keys_are_scoped_per_endpoint(self):
+        """Test POST /books - the same key on another endpoint is a different request."""
+        author_id = self.post('/authors/', self.payload, 'shared').json['id']
+        book = {'title': 'Test Book', 'author_id': author_id}
+        self.assertEqual(self.post('/books/', book, 'shared').status_code, 201)
+        self.assertEqual(self.post('/books/', book, 'shared').headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(Book.query.count(), 1)
+
+    def test_key_reused_with_different_body(self):
+        """Test POST /authors - 422 when a key comes back with another payload; reordering is not a change."""
+        self.post('/authors/', self.payload, 'key-1')
+        response = self.post('/authors/', dict(self.payload, name='Someone else'), 'key-1')
+        self.assertEqual(response.status_code, 422)
+        reordered = self.client.post('/authors/', data='{"birth_date": "1980-01-01", "bio": "This is a test author", '
+                                     '"name": "Test Author"}', content_type='application/json',
+                                     headers={'Idempotency-Key': 'key-1'})
+        self.assertEqual(reordered.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(Author.query.count(), 1)
+
+    def test_failed_request_does_not_use_up_key(self):
+        """Test POST /authors - an error response stores nothing, so the key can be retried."""
+        response = self.client.post('/authors/', data='not json', content_type='application/json',
+                                    headers={'Idempotency-Key': 'key-1'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(IdempotencyKey.query.count(), 0)
+        self.assertEqual(self.post('/authors/', self.payload, 'key-1').status_code, 201)
+        self.assertEqual(self.post('/authors/', {'name': ''}, 'x' * 256).status_code, 400)
+
+    def test_expired_key(self):
+        """Expired keys are ignored, replaced and purged."""
+        first = self.post('/authors/', self.payload, 'key-1')
+        IdempotencyKey.query.update({'expires_at': datetime(2000, 1, 1)})
+        db.session.commit()
+        self.forget_cached()
+        second = self.post('/authors/', self.payload, 'key-1')
+        self.assertNotIn('Idempotent-Replayed', second.headers)
+        self.assertNotEqual(second.json['id'], first.json['id'])
+        self.assertEqual(IdempotencyKey.query.count(), 1)
+
+    def test_abandoned_claim_is_reclaimed(self):
+        """A claim whose response was never stored holds the key only for IDEMPOTENCY_WAIT_SECONDS."""
+        self.app.extensions['idempotency'].wait_seconds = 0.1
+        # As if the worker died after committing the record, before storing the response
+        with mock.patch('app.idempotency.update', side_effect=RuntimeError('worker died')):
+            with self.assertRaises(RuntimeError):
+                self.post('/authors/', self.payload, 'key-1')
+        self.assertIsNone(IdempotencyKey.query.one().status_code)
+        self.assertLess(IdempotencyKey.query.one().expires_at, utcnow() + timedelta(seconds=1))
+        db.session.rollback()
+        time.sleep(0.1)
+        retry = self.post('/authors/', self.payload, 'key-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', retry.headers)
+        self.assertGreater(IdempotencyKey.query.one().expires_at, utcnow() + timedelta(hours=23))
+        self.assertEqual(self.post('/authors/', self.payload, 'key-1').headers['Idempotent-Replayed'], 'true')
+
+    def test_concurrent_requests_coalesce(self):
+        """Concurrent requests with one key create a single record and all get its response."""
+        responses = []
+
+        def post():
+            with self.app.test_client() as client:
+                responses.append(client.post('/authors/', json=self.payload, headers={'Idempotency-Key': 'key-1'}))
+
+        threads = [threading.Thread(target=post) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({response.status_code for response in responses}, {201})
+        self.assertEqual(len({response.json['id'] for response in responses}), 1)
+        self.assertEqual(sum('Idempotent-Replayed' in response.headers for response in responses), 7)
+        self.assertEqual(Author.query.count(), 1)
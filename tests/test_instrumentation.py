@@ -0,0 +1,90 @@
+import unittest
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from app.instrumentation import Histogram
+from config import TestingConfig
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def make_app(self, **settings):
+        config = type('Config', (TestingConfig,), settings)
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+        return app
+
+    def test_server_timing_header(self):
+        """Every response carries db/serialize/app/total timings and the query count."""
+        app = self.make_app()
+        with app.app_context():
+            response = app.test_client().get('/books/')
+            db.drop_all()
+        self.assertEqual(response.status_code, 200)
+        timing = response.headers['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="2 queries"')
+        for name in ('serialize', 'app', 'total'):
+            self.assertRegex(timing, name + r';dur=[\d.]+')
+
+    def test_prometheus_metrics(self):
+        """Test GET /metrics - per-endpoint histograms in the Prometheus text format."""
+        app = self.make_app()
+        with app.app_context():
+            client = app.test_client()
+            client.get('/books/')
+            client.get('/books/999')
+            response = client.get('/metrics')
+            db.drop_all()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+        self.assertIn('library_requests_total{endpoint="books.get_books",method="GET",status="200"} 1', body)
+        self.assertIn('library_requests_total{endpoint="books.get_book",method="GET",status="404"} 1', body)
+        self.assertIn('library_request_duration_seconds_count{endpoint="books.get_books",method="GET"} 1', body)
+        self.assertIn('library_request_db_queries_bucket{endpoint="books.get_books",method="GET",le="2"} 1', body)
+        self.assertIn('# TYPE library_cache_misses_total counter', body)
+        self.assertIn('# TYPE library_cache_size gauge', body)
+        self.assertNotIn('# TYPE library_cache_misses gauge', body)
+
+    def test_disabled(self):
+        """With instrumentation off no header is added and nothing is recorded."""
+        app = self.make_app(INSTRUMENTATION_ENABLED=False, SLOW_QUERY_THRESHOLD_MS=0)
+        with app.app_context():
+            client = app.test_client()
+            response = client.get('/books/')
+            metrics = client.get('/metrics').get_data(as_text=True)
+            db.drop_all()
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertNotIn('books.get_books', metrics)
+
+    def test_slow_query_log(self):
+        """Statements at or above the threshold are logged with the endpoint."""
+        app = self.make_app(SLOW_QUERY_THRESHOLD_MS=0.000001)
+        with app.app_context():
+            with self.assertLogs('app.slow_queries', level='WARNING') as logs:
+                app.test_client().get('/authors/')
+            db.drop_all()
+        self.assertIn('authors.get_authors', logs.output[0])
+
+    def test_failed_statement_leaves_connection_clean(self):
+        """A statement that raises leaves no start time behind on the pooled connection."""
+        app = self.make_app()
+        with app.app_context():
+            with db.engine.connect() as conn:
+                for _ in range(3):
+                    with self.assertRaises(OperationalError):
+                        conn.exec_driver_sql('SELECT * FROM missing_table')
+                    conn.rollback()
+                conn.exec_driver_sql('SELECT 1')
+                self.assertNotIn('query_start', conn.info)
+            db.drop_all()
+
+    def test_histogram_buckets(self):
+        """Buckets are cumulative and end with +Inf."""
+        histogram = Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.cumulative()), [(1, 2), (5, 3), ('+Inf', 4)])
+        self.assertEqual(histogram.sum, 14.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from flask import g
+from werkzeug.exceptions import NotFound
+from app import create_app, db
+from app.loaders import author_loader, book_loader
+from app.models import Author, Book
+from tests.helpers import assert_num_queries
+
+class LoaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config.from_object('config.TestingConfig')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.authors = [Author(name=f'Author {i}') for i in range(3)]
+        db.session.add_all(self.authors)
+        db.session.commit()
+        self.ids = [author.id for author in self.authors]
+        db.session.expunge_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_primed_keys_resolve_in_one_query(self):
+        """Test prime() + load() - queued keys and misses cost a single IN query, then nothing."""
+        with self.app.test_request_context():
+            with assert_num_queries(self, 1):
+                author_loader.prime(self.ids + [999])
+                author = author_loader.load(self.ids[0])
+                self.assertEqual(author.name, 'Author 0')
+                self.assertIsNone(author_loader.load(999))
+                self.assertEqual(set(author_loader.load_many(self.ids)), set(self.ids))
+                self.assertIs(author_loader.get_or_404(self.ids[0]), author)
+            with self.assertRaises(NotFound):
+                author_loader.get_or_404(999)
+
+    def test_relationship_uses_loaded_author(self):
+        """Test Book.author - answered from the identity map once the author was loaded."""
+        db.session.add(Book(title='Book', author_id=self.ids[1]))
+        db.session.commit()
+        db.session.expunge_all()
+        with self.app.test_request_context():
+            book = book_loader.load(1)
+            with assert_num_queries(self, 1):
+                author_loader.load_many(self.ids)
+                self.assertEqual(book.author.name, 'Author 1')
+
+    def test_memo_ends_with_request(self):
+        """Test reset_loaders - memoized objects do not leak into the next request."""
+        self.client.delete('/authors/{}'.format(self.ids[0]))
+        self.assertNotIn('loaders', g)
+        self.assertEqual(self.client.get('/authors/{}/books'.format(self.ids[0])).status_code, 404)
+        self.assertEqual(self.client.get('/authors/{}/books'.format(self.ids[1])).status_code, 200)
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import threading
+import unittest
+from sqlalchemy import create_engine, exc
+from app import create_app
+from app.pool import InstrumentedQueuePool, instrument_engine_options, pool_stats
+from config import TestingConfig, engine_options
+
+class PoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.engine = create_engine('sqlite:///' + self.path, poolclass=InstrumentedQueuePool,
+                                    pool_size=1, max_overflow=0, pool_timeout=0.05)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_checkout_wait_and_saturation(self):
+        """Checkouts are timed; a full pool reports saturation 1 and counts timeouts."""
+        with self.engine.connect():
+            stats = pool_stats(self.engine)
+            self.assertEqual(stats['checked_out'], 1)
+            self.assertEqual(stats['saturation'], 1.0)
+            with self.assertRaises(exc.TimeoutError):
+                self.engine.connect()
+        stats = pool_stats(self.engine)
+        self.assertEqual((stats['checkouts'], stats['timeouts']), (1, 1))
+        self.assertGreaterEqual(stats['wait_seconds_max'], 0.05)
+        self.assertEqual(stats['saturation'], 0.0)
+
+    def test_waiting_checkout_is_timed(self):
+        """A checkout that queues behind a busy connection records the time it waited."""
+        engine = create_engine('sqlite:///' + self.path, poolclass=InstrumentedQueuePool,
+                               pool_size=1, max_overflow=0, pool_timeout=5)
+        connection = engine.connect()
+        timer = threading.Timer(0.1, connection.close)
+        timer.start()
+        with engine.connect():
+            pass
+        timer.join()
+        self.assertGreaterEqual(pool_stats(engine)['wait_seconds_max'], 0.09)
+        engine.dispose()
+
+    def test_engine_options(self):
+        """Pool options come from the environment; SQLite and PgBouncer mode get no queue pool."""
+        self.assertEqual(TestingConfig.SQLALCHEMY_ENGINE_OPTIONS, {})
+        os.environ['DB_POOL_SIZE'] = '7'
+        os.environ['DB_STATEMENT_TIMEOUT_MS'] = '5000'
+        try:
+            options = engine_options('postgresql://localhost/library', pool_size=3)
+            self.assertEqual(options['pool_size'], 7)
+            self.assertTrue(options['pool_pre_ping'])
+            self.assertEqual(options['connect_args'], {'options': '-c statement_timeout=5000'})
+            self.assertIs(instrument_engine_options(options)['poolclass'], InstrumentedQueuePool)
+            os.environ['DB_PGBOUNCER'] = '1'
+            self.assertNotIn('pool_size', engine_options('postgresql://localhost/library'))
+        finally:
+            for name in ('DB_POOL_SIZE', 'DB_STATEMENT_TIMEOUT_MS', 'DB_PGBOUNCER'):
+                os.environ.pop(name, None)
+
+    def test_pool_metrics_endpoint(self):
+        """Test GET /metrics/pool - reports the pool of the app's engine."""
+        app = create_app()
+        with app.app_context():
+            response = app.test_client().get('/metrics/pool')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pool', response.json)
+
+    def test_prometheus_pool_metrics(self):
+        """Test GET /metrics - checkouts, timeouts and wait time as counters, occupancy as gauges."""
+        uri = 'sqlite:///' + self.path
+        config = type('Config', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': uri,
+                                                   'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 2}})
+        app = create_app(config)
+        with app.app_context():
+            body = app.test_client().get('/metrics').get_data(as_text=True)
+        for name in ('checkouts_total', 'timeouts_total', 'wait_seconds_total'):
+            self.assertIn('# TYPE library_db_pool_{} counter'.format(name), body)
+        for name in ('checked_out', 'overflow'):
+            self.assertIn('# TYPE library_db_pool_{} gauge'.format(name), body)
+        self.assertNotIn('library_db_pool_checkouts ', body)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from app.models import Author, Book
+from config import ProductionConfig, TestingConfig
+
+class ProfilingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_app(self, **settings):
+        settings = dict({'PROFILING_ENABLED': True, 'PROFILING_DIR': self.directory}, **settings)
+        app = create_app(type('Config', (TestingConfig,), settings))
+        with app.app_context():
+            db.create_all()
+            author = Author(name='Author')
+            db.session.add(author)
+            db.session.flush()
+            db.session.add(Book(title='Book', author_id=author.id))
+            db.session.commit()
+        return app
+
+    def test_pstats_profile(self):
+        """Test ?__profile=1 - cProfile report with the request's SQL, files kept in PROFILING_DIR."""
+        app = self.make_app()
+        with app.app_context():
+            response = app.test_client().get('/authors/1/books?__profile=1')
+            db.drop_all()
+        self.assertEqual(response.status_code, 200)
+        report = response.json
+        self.assertEqual((report['endpoint'], report['status'], report['format']),
+                         ('authors.get_books_by_author', 200, 'pstats'))
+        self.assertEqual(report['queries'], len(report['sql']))
+        self.assertTrue(any('FROM book' in query['statement'] for query in report['sql']))
+        self.assertTrue(report['top'])
+        self.assertTrue(os.path.exists(report['profile']))
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_failed_statement_leaves_connection_clean(self):
+        """A statement that raises leaves no start time behind on the pooled connection."""
+        app = self.make_app()
+        with app.app_context():
+            with db.engine.connect() as conn:
+                with self.assertRaises(OperationalError):
+                    conn.exec_driver_sql('SELECT * FROM missing_table')
+                conn.rollback()
+                self.assertNotIn('profile_start', conn.info)
+            db.drop_all()
+
+    def test_speedscope_profile(self):
+        """The X-Profile header selects the sampling profiler and a speedscope file."""
+        app = self.make_app(PROFILING_SAMPLE_INTERVAL_MS=0.1)
+        with app.app_context():
+            response = app.test_client().get('/books/', headers={'X-Profile': 'speedscope'})
+            db.drop_all()
+        with open(response.json['profile']) as handle:
+            profile = json.load(handle)
+        self.assertEqual(profile['profiles'][0]['type'], 'sampled')
+        self.assertEqual(len(profile['profiles'][0]['samples']), len(profile['profiles'][0]['weights']))
+
+    def test_token_required(self):
+        """With PROFILING_TOKEN set, requests without the matching X-Profile-Token are served normally."""
+        app = self.make_app(PROFILING_TOKEN='secret')
+        with app.app_context():
+            client = app.test_client()
+            plain = client.get('/books/?__profile=1', headers={'X-Profile-Token': 'wrong'})
+            profiled = client.get('/books/?__profile=1', headers={'X-Profile-Token': 'secret'})
+            db.drop_all()
+        self.assertIsInstance(plain.json, list)
+        self.assertEqual(profiled.json['format'], 'pstats')
+
+    def test_off_by_default(self):
+        """Profiling is off in TestingConfig and ProductionConfig; the flag is then ignored."""
+        self.assertFalse(ProductionConfig.PROFILING_ENABLED)
+        app = self.make_app(PROFILING_ENABLED=False)
+        with app.app_context():
+            response = app.test_client().get('/books/?__profile=1')
+            db.drop_all()
+        self.assertIsInstance(response.json, list)
+        self.assertEqual(os.listdir(self.directory), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import functools
+import os
+import shutil
+import tempfile
+import unittest
+from app import create_app, db
+from app.models import Author
+from sqlalchemy import event
+from app.replicas import READ_PRIMARY_COOKIE, replicas
+from config import TestingConfig
+
+class ReplicaTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Primary and replica are two SQLite files; the replica is a copy of the primary."""
+        self.dir = tempfile.mkdtemp()
+        self.primary = os.path.join(self.dir, 'primary.db')
+        self.replica = os.path.join(self.dir, 'replica.db')
+
+        class ReplicaConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + self.primary
+            SQLALCHEMY_REPLICA_URIS = ['sqlite:///' + self.replica]
+            REPLICA_LAG_CHECK_INTERVAL = 0
+            CACHE_TYPE = 'null'
+
+        self.app = create_app(ReplicaConfig)
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Author(name='George Orwell'))
+            db.session.commit()
+        self.sync()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.dispose()
+        shutil.rmtree(self.dir)
+
+    def dispose(self):
+        db.engine.dispose()
+        for engine in replicas.engines().values():
+            engine.dispose()
+
+    def sync(self):
+        """Bring the replica up to date with the primary."""
+        with self.app.app_context():
+            self.dispose()
+        shutil.copyfile(self.primary, self.replica)
+
+    def rename_on_replica(self, name):
+        """Change a row on the replica only, so reads show which database served them."""
+        with self.app.app_context():
+            with replicas.engines()['replica_0'].begin() as connection:
+                connection.exec_driver_sql('UPDATE author SET name = ? WHERE id = 1', (name,))
+
+    def test_get_reads_from_replica(self):
+        """Test GET /authors/{id} - served by an up-to-date replica."""
+        self.rename_on_replica('Replica Orwell')
+        self.assertEqual(self.client.get('/authors/1').json['name'], 'Replica Orwell')
+        self.assertEqual(self.client.get('/metrics/replicas').json['replica_reads'], 1)
+
+    def test_writes_and_lagging_replica_use_primary(self):
+        """Test writes go to the primary, and reads fall back while the replica lags."""
+        self.rename_on_replica('Replica Orwell')
+        response = self.client.post('/authors/', json={'name': 'Aldous Huxley'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(READ_PRIMARY_COOKIE, response.headers['Set-Cookie'])
+
+        # The writer reads its own write from the primary
+        self.assertEqual(self.client.get('/authors/2').json['name'], 'Aldous Huxley')
+
+        # Other clients fall back to the primary while the replica is behind...
+        other = self.app.test_client()
+        self.assertEqual(other.get('/authors/1').json['name'], 'George Orwell')
+        stats = other.get('/metrics/replicas').json
+        self.assertEqual(stats['primary_fallbacks'], 1)
+        self.assertFalse(stats['replicas']['replica_0']['healthy'])
+
+        # ...and return to it once it has caught up
+        self.sync()
+        self.rename_on_replica('Replica Orwell')
+        self.assertEqual(other.get('/authors/1').json['name'], 'Replica Orwell')
+
+    def test_unreachable_replica_falls_back(self):
+        """Test reads use the primary when the replica cannot be queried."""
+        os.remove(self.replica)
+        with self.app.app_context():
+            self.dispose()
+        os.makedirs(self.replica)  # a directory cannot be opened as a database
+        self.assertEqual(self.client.get('/authors/1').json['name'], 'George Orwell')
+
+    def test_request_reads_one_replica(self):
+        """Test GET /books - the version lookup and the rows come from the same replica."""
+        second = os.path.join(self.dir, 'replica_1.db')
+        shutil.copyfile(self.replica, second)
+
+        class TwoReplicas(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + self.primary
+            SQLALCHEMY_REPLICA_URIS = ['sqlite:///' + self.replica, 'sqlite:///' + second]
+            REPLICA_LAG_CHECK_INTERVAL = 3600
+
+        app = create_app(TwoReplicas)
+        used = []
+
+        def record(conn, cursor, statement, *args, key=None):
+            used.append(key)
+
+        with app.app_context():
+            for key, engine in replicas.engines().items():
+                event.listen(engine, 'before_cursor_execute', functools.partial(record, key=key))
+        client = app.test_client()
+        for _ in range(2):  # first lag probe of each replica
+            client.get('/books/')
+        for _ in range(4):
+            del used[:]
+            self.assertEqual(client.get('/books/').status_code, 200)
+            self.assertEqual(len(used), 2)
+            self.assertEqual(len(set(used)), 1, used)
+        with app.app_context():
+            for engine in replicas.engines().values():
+                engine.dispose()
+            db.engine.dispose()
+
+    def test_cache_misses_read_primary(self):
+        """Test GET /authors/{id} - cached records are loaded from the primary, never a replica."""
+        self.app.config['CACHE_TYPE'] = 'memory'
+        from app.cache import cache
+        cache.init_app(self.app)
+        self.rename_on_replica('Replica Orwell')
+        self.assertEqual(self.client.get('/authors/1').json['name'], 'George Orwell')
+        self.assertEqual(self.client.get('/authors/?ids=1').json[0]['name'], 'George Orwell')
+        self.assertEqual(self.client.get('/authors/').json[0]['name'], 'Replica Orwell')
+
+if __name__ == '__main__':
+    unittest.main()
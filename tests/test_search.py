@@ -0,0 +1,95 @@
+import unittest
+from datetime import date
+from app import create_app, db
+from app.models import Author, Book
+
+class SearchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Set up the test context and create the database tables."""
+        self.app = create_app()
+        self.app.config.from_object('config.TestingConfig')  # Use TestingConfig
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.orwell = Author(name='George Orwell', bio='English essayist who wrote a novel about a farm')
+        self.huxley = Author(name='Aldous Huxley', bio='Wrote a dystopian novel about a world state')
+        db.session.add_all([self.orwell, self.huxley])
+        db.session.flush()
+        self.farm = Book(title='Animal Farm', description='A farm run by pigs', author_id=self.orwell.id)
+        self.nineteen = Book(title='Nineteen Eighty-Four', description='A dystopian novel of surveillance',
+                             publish_date=date(1949, 6, 8), author_id=self.orwell.id)
+        self.brave = Book(title='Brave New World', description=None, author_id=self.huxley.id)
+        db.session.add_all([self.farm, self.nineteen, self.brave])
+        db.session.commit()
+
+    def tearDown(self):
+        """Tear down the database and remove the app context."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_search_ranks_and_highlights(self):
+        """Test GET /search?q= - hits from both tables, title matches ranked first."""
+        response = self.client.get('/search?q=dystopian')
+        self.assertEqual(response.status_code, 200)
+        hits = [(hit['type'], hit['id']) for hit in response.json]
+        self.assertCountEqual(hits, [('book', self.nineteen.id), ('author', self.huxley.id)])
+        self.assertIn('<mark>dystopian</mark>', response.json[0]['snippet'])
+
+        response = self.client.get('/search?q=farm')
+        self.assertEqual(response.json[0]['id'], self.farm.id)
+        self.assertEqual(response.json[0]['title'], 'Animal Farm')
+        self.assertGreater(response.json[0]['score'], 0)
+
+    def test_search_snippet_is_escaped(self):
+        """Test GET /search - stored text is escaped; only the match markers are markup."""
+        author = Author.query.first()
+        db.session.add(Book(title='<img src=x onerror=alert(1)> shadow', author_id=author.id))
+        db.session.commit()
+        snippet = self.client.get('/search?q=shadow').json[0]['snippet']
+        self.assertEqual(snippet, '&lt;img src=x onerror=alert(1)&gt; <mark>shadow</mark>')
+
+    def test_search_type_filter(self):
+        """Test GET /search?type= - only hits of the requested type."""
+        response = self.client.get('/search?q=novel&type=author')
+        self.assertEqual([hit['type'] for hit in response.json], ['author', 'author'])
+        response = self.client.get('/search?q=novel&type=publisher')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_follows_writes(self):
+        """Test the search index is kept in sync with inserts, updates and deletes."""
+        self.brave.description = 'A genetically engineered society'
+        db.session.commit()
+        self.assertEqual(self.client.get('/search?q=genetically').json[0]['id'], self.brave.id)
+        db.session.delete(self.brave)
+        db.session.commit()
+        self.assertEqual(self.client.get('/search?q=genetically').json, [])
+
+    def test_search_pagination(self):
+        """Test GET /search?limit= - pages follow the next cursor without repeats."""
+        seen, cursor = [], None
+        for _ in range(3):
+            url = '/search?q=novel&limit=1' + ('&after=' + cursor if cursor else '')
+            response = self.client.get(url)
+            seen.extend((hit['type'], hit['id']) for hit in response.json)
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(len(set(seen)), 3)
+        self.assertIsNone(cursor)
+
+    def test_search_rejects_bad_input(self):
+        """Test GET /search - blank q and malformed cursors are rejected."""
+        self.assertEqual(self.client.get('/search').status_code, 400)
+        self.assertEqual(self.client.get('/search?q=%20').status_code, 400)
+        self.assertEqual(self.client.get('/search?q=novel&after=bogus').status_code, 400)
+        response = self.client.get('/search?q="unbalanced AND (')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/search?q=!!!').json, [])
+
+if __name__ == '__main__':
+    unittest.main()
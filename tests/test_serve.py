@@ -0,0 +1,35 @@
+import os
+import unittest
+from unittest import mock
+from app.serve import build_app, gunicorn_options, parse_args
+from config import ProductionConfig
+
+class ServeTestCase(unittest.TestCase):
+
+    def test_defaults(self):
+        """python -m app.serve - preloaded gthread workers recycled with jitter."""
+        options = gunicorn_options(parse_args([]))
+        self.assertGreaterEqual(options['workers'], 1)
+        self.assertEqual(options['worker_class'], 'gthread')
+        self.assertTrue(options['preload_app'])
+        self.assertGreater(options['max_requests_jitter'], 0)
+
+    def test_single_threaded_workers(self):
+        """python -m app.serve --threads 1 --no-preload - plain sync workers loaded after fork."""
+        options = gunicorn_options(parse_args(['--threads', '1', '--no-preload', '--workers', '3']))
+        self.assertEqual((options['worker_class'], options['workers']), ('sync', 3))
+        self.assertFalse(options['preload_app'])
+
+    def test_production_config_without_flask_env(self):
+        """build_app() - production settings even though .env says FLASK_ENV=development."""
+        environ = {key: value for key, value in os.environ.items() if key != 'FLASK_ENV'}
+        with mock.patch.dict(os.environ, environ, clear=True), \
+                mock.patch.multiple(ProductionConfig, SQLALCHEMY_DATABASE_URI='sqlite://', SQLALCHEMY_ENGINE_OPTIONS={}):
+            app = build_app()
+        self.assertFalse(app.debug)
+        self.assertFalse(app.config['DEBUG'])
+        self.assertFalse(app.config['PROFILING_ENABLED'])
+        self.assertEqual(app.config['FLASK_ENV'], 'production')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from app import create_app, db
+from app.cache import cache
+from app.models import Author, Book
+from app.stats.services import refresh_book_counts
+from config import TestingConfig
+from tests.helpers import assert_num_queries
+
+class StatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.orwell = self.client.post('/authors/', json={'name': 'George Orwell'}).json['id']
+        self.huxley = self.client.post('/authors/', json={'name': 'Aldous Huxley'}).json['id']
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_book(self, title, author_id, publish_date=None):
+        response = self.client.post('/books/', json={'title': title, 'author_id': author_id, 'publish_date': publish_date})
+        self.assertEqual(response.status_code, 201)
+        return response.json['id']
+
+    def test_book_count_is_maintained(self):
+        """Single, bulk and delete writes keep Author.book_count in step without touching updated_at."""
+        updated_at = db.session.get(Author, self.orwell).updated_at
+        first = self.add_book('Burmese Days', self.orwell, '1934-10-25')
+        self.client.post('/books/bulk', json=[{'title': 'Animal Farm', 'author_id': self.orwell},
+                                              {'title': '1984', 'author_id': self.orwell},
+                                              {'title': 'Brave New World', 'author_id': self.huxley}])
+        self.client.delete('/books/{}'.format(first))
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Author, self.orwell).book_count, 2)
+        self.assertEqual(db.session.get(Author, self.huxley).book_count, 1)
+        self.assertEqual(db.session.get(Author, self.orwell).updated_at, updated_at)
+
+    def test_author_stats(self):
+        """Test GET /authors/<id>/stats - book count and one grouped query for books per year."""
+        self.add_book('Animal Farm', self.orwell, '1945-08-17')
+        self.add_book('1984', self.orwell, '1949-06-08')
+        self.add_book('Nineteen Eighty-Four (2nd ed.)', self.orwell, '1949-12-01')
+        self.add_book('Essays', self.orwell)
+        with assert_num_queries(self, 3):  # table versions, author row, histogram
+            response = self.client.get('/authors/{}/stats'.format(self.orwell))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {
+            'id': self.orwell, 'name': 'George Orwell', 'book_count': 4, 'undated': 1,
+            'books_per_year': [{'year': 1945, 'count': 1}, {'year': 1949, 'count': 2}]})
+        cached = self.client.get('/authors/{}/stats'.format(self.orwell), headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get('/authors/999/stats').status_code, 404)
+
+    def test_catalog_stats(self):
+        """Test GET /stats/catalog - totals, histogram and top authors, recomputed only after writes."""
+        self.add_book('Animal Farm', self.orwell, '1945-08-17')
+        self.add_book('1984', self.orwell, '1949-06-08')
+        self.add_book('Brave New World', self.huxley, '1932-01-01')
+        response = self.client.get('/stats/catalog?top=1')
+        self.assertEqual(response.json, {
+            'authors': 2, 'books': 3, 'undated': 0,
+            'books_per_year': [{'year': 1932, 'count': 1}, {'year': 1945, 'count': 1}, {'year': 1949, 'count': 1}],
+            'top_authors': [{'id': self.orwell, 'name': 'George Orwell', 'book_count': 2}]})
+        with assert_num_queries(self, 1):  # served from cache: only the table versions
+            self.assertEqual(self.client.get('/stats/catalog?top=1').json, response.json)
+        self.add_book('Island', self.huxley, '1962-01-01')
+        self.assertEqual(self.client.get('/stats/catalog?top=1').json['books'], 4)
+        etag = self.client.get('/stats/catalog?top=1').headers['ETag']
+        cache.clear()
+        with assert_num_queries(self, 1):  # a current ETag is answered before the stats are loaded
+            self.assertEqual(self.client.get('/stats/catalog?top=1', headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_refresh_book_counts(self):
+        """Rows loaded behind the services' back are counted after a refresh."""
+        db.session.add_all([Book(title='One', author_id=self.huxley), Book(title='Two', author_id=self.huxley)])
+        db.session.commit()
+        refresh_book_counts([self.huxley])
+        db.session.commit()
+        self.assertEqual(db.session.get(Author, self.huxley).book_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()